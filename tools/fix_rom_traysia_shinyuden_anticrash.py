@@ -21,11 +21,12 @@ No se modifica ninguna otra logica del juego. Ver README.md para el
 analisis tecnico completo.
 """
 
-from pathlib import Path
 import argparse
-import hashlib
 import sys
 
+import instrument
+from rom_image import RomImage
+
 # Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
 try:
     sys.stdout.reconfigure(errors="replace")
@@ -50,42 +51,97 @@ PATCHES = [
 IPS_DEFAULT = "patches/Traysia_Shinyuden_anticrash_SRAM_patch.ips"
 
 
-def build_ips(patches, output_path):
-    ips = b"PATCH"
+# Un registro IPS admite como maximo 0xFFFF bytes de datos
+IPS_MAX_RECORD = 0xFFFF
+
+
+def ips_bytes(patches):
+    """Serializa una lista de (offset, old, new) en formato IPS."""
+    ips = bytearray(b"PATCH")
     for offset, _old, new in sorted(patches):
-        ips += offset.to_bytes(3, "big") + len(new).to_bytes(2, "big") + new
+        for pos in range(0, len(new), IPS_MAX_RECORD):
+            chunk = new[pos:pos + IPS_MAX_RECORD]
+            ips += (offset + pos).to_bytes(3, "big") + len(chunk).to_bytes(2, "big") + chunk
     ips += b"EOF"
-    Path(output_path).write_bytes(ips)
+    return bytes(ips)
+
+
+def diff_patches(original, patched, chunk=4096):
+    """Devuelve los tramos que difieren entre dos ROMs como (offset, old, new)."""
+    patches = []
+    limit = min(len(original), len(patched))
+    start = None
+    for base in range(0, limit, chunk):
+        stop = min(base + chunk, limit)
+        # Los bloques identicos (la inmensa mayoria) se descartan en C
+        if start is None and original[base:stop] == patched[base:stop]:
+            continue
+        for pos in range(base, stop):
+            same = original[pos] == patched[pos]
+            if start is None and not same:
+                start = pos
+            elif start is not None and same:
+                patches.append((start, bytes(original[start:pos]), bytes(patched[start:pos])))
+                start = None
+    if start is not None:
+        patches.append((start, bytes(original[start:limit]), bytes(patched[start:limit])))
+    if len(patched) > limit:
+        patches.append((limit, b"", bytes(patched[limit:])))
+    return patches
+
+
+def build_ips(patches, output_path):
+    instrument.write_bytes(output_path, ips_bytes(patches))
     print(f"✅ Parche IPS generado: {output_path}")
 
 
-def generate_anticrash_rom(input_rom_path, output_rom_path, ips_path=None):
-    data = Path(input_rom_path).read_bytes()
-
-    md5_hash = hashlib.md5(data).hexdigest()
-    if md5_hash != EXPECTED_MD5:
-        print(f"⚠️  MD5 diferente al esperado.\n  Esperado: {EXPECTED_MD5}\n  Obtenido: {md5_hash}")
-        cont = input("¿Continuar de todos modos? [y/N]: ")
-        if cont.lower() != "y":
-            print("Abortando.")
-            return
-
-    rom = bytearray(data)
-    for offset, old, new in PATCHES:
+def apply_patches(rom, patches=PATCHES):
+    """Aplica los parches sobre `rom` (bytearray o RomImage) verificando los bytes originales.
+
+    Lanza ValueError sin modificar nada si algun punto no coincide.
+    """
+    for offset, old, _new in patches:
         actual = bytes(rom[offset:offset + len(old)])
         if actual != old:
-            print(f"❌ Bytes inesperados en 0x{offset:06X}: {actual.hex(' ')} (se esperaba {old.hex(' ')}). Abortando.")
-            return
+            raise ValueError(
+                f"Bytes inesperados en 0x{offset:06X}: {actual.hex(' ')} (se esperaba {old.hex(' ')})"
+            )
+    for offset, _old, new in patches:
         rom[offset:offset + len(new)] = new
+    return rom
 
-    Path(output_rom_path).write_bytes(rom)
-    print(f"✅ ROM parcheada guardada como: {output_rom_path}")
-
-    if ips_path:
-        build_ips(PATCHES, ips_path)
 
-
-if __name__ == "__main__":
+def generate_anticrash_rom(input_rom_path, output_rom_path, ips_path=None):
+    # La ROM se mapea en memoria: los parches se guardan aparte y la
+    # salida se escribe por trozos, sin copiar la ROM entera
+    with RomImage.open(input_rom_path) as rom:
+        with instrument.phase("leer ROM"):
+            md5_hash = rom.digest("md5")
+            instrument.add_read(len(rom))
+        if md5_hash != EXPECTED_MD5:
+            print(f"⚠️  MD5 diferente al esperado.\n  Esperado: {EXPECTED_MD5}\n  Obtenido: {md5_hash}")
+            cont = input("¿Continuar de todos modos? [y/N]: ")
+            if cont.lower() != "y":
+                print("Abortando.")
+                return
+
+        with instrument.phase("parchear"):
+            try:
+                apply_patches(rom)
+            except ValueError as exc:
+                print(f"❌ {exc}. Abortando.")
+                return
+            instrument.count("parches", len(PATCHES))
+
+        with instrument.phase("escribir"):
+            instrument.add_written(rom.write_to(output_rom_path))
+            print(f"✅ ROM parcheada guardada como: {output_rom_path}")
+
+            if ips_path:
+                build_ips(PATCHES, ips_path)
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description="Aplica el parche Anticrash SRAM a la ROM de Traysia Shinyuden"
     )
@@ -109,6 +165,12 @@ if __name__ == "__main__":
         default=None,
         help=f"Genera además el parche IPS (por defecto en {IPS_DEFAULT})",
     )
-    args = parser.parse_args()
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with instrument.session(args, "anticrash"):
+        generate_anticrash_rom(args.input_rom, args.output_rom, args.ips)
 
-    generate_anticrash_rom(args.input_rom, args.output_rom, args.ips)
+
+if __name__ == "__main__":
+    main()
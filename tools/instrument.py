@@ -0,0 +1,234 @@
+"""Instrumentación común de los scripts: fases, contadores y perfil.
+
+Cada script añade las opciones con `add_arguments(parser)` y envuelve su
+trabajo en `session(args, "nombre")`:
+
+    --profile FILE     perfil de cProfile (se abre con `python -m pstats FILE`)
+                       y las 15 funciones con más tiempo acumulado en stderr
+    --trace-json FILE  JSON con el tiempo de cada fase, los bytes leídos y
+                       escritos y los elementos procesados
+    --metrics          resumen de lo anterior en stderr al terminar
+
+Dentro de la sesión el código marca sus fases y cuenta lo que procesa:
+
+    with instrument.phase("extraer"):
+        data = instrument.read_bytes(rom_path)
+        strings = extract_strings(data, ...)
+        instrument.count("cadenas", len(strings))
+
+Fuera de una sesión (cuando las funciones se usan como biblioteca desde otro
+script) `phase`, `count` y compañía no registran nada.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+PROFILE_TOP = 15
+
+
+class Trace:
+    """Fases y contadores de una ejecución."""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.phases: list[dict] = []
+        self.totals = self._new_counters()
+        self._open: list[dict] = []
+        self.seconds = 0.0
+        self.exit = None
+
+    @staticmethod
+    def _new_counters() -> dict:
+        return {"bytes_read": 0, "bytes_written": 0, "items": {}}
+
+    def _targets(self) -> list[dict]:
+        # Una fase anidada cuenta también para las fases que la contienen
+        return [self.totals, *self._open]
+
+    def add(self, key: str, n: int) -> None:
+        for target in self._targets():
+            target[key] += n
+
+    def count(self, name: str, n: int = 1) -> None:
+        for target in self._targets():
+            items = target["items"]
+            items[name] = items.get(name, 0) + n
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if self._open:
+            name = f"{self._open[-1]['name']}/{name}"
+        entry = {"name": name, "start": time.perf_counter() - self._t0, "seconds": 0.0,
+                 **self._new_counters()}
+        self.phases.append(entry)
+        self._open.append(entry)
+        try:
+            yield
+        finally:
+            self._open.remove(entry)
+            entry["seconds"] = time.perf_counter() - self._t0 - entry["start"]
+
+    def finish(self, exit_code) -> None:
+        self.seconds = time.perf_counter() - self._t0
+        self.exit = exit_code
+
+    def as_dict(self) -> dict:
+        return {
+            "tool": self.tool,
+            "argv": sys.argv[1:],
+            "python": platform.python_version(),
+            "started": self.started,
+            "seconds": self.seconds,
+            "exit": self.exit,
+            "phases": self.phases,
+            "totals": self.totals,
+        }
+
+
+# Sesión activa (None fuera de session())
+_TRACE: Optional[Trace] = None
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Mide el bloque como una fase de la sesión activa."""
+    if _TRACE is None:
+        yield
+        return
+    with _TRACE.phase(name):
+        yield
+
+
+def count(name: str, n: int = 1) -> None:
+    """Suma `n` elementos procesados de tipo `name` (cadenas, punteros...)."""
+    if _TRACE is not None:
+        _TRACE.count(name, n)
+
+
+def _size(what: Union[int, bytes, bytearray, str, os.PathLike]) -> int:
+    if isinstance(what, int):
+        return what
+    if isinstance(what, (bytes, bytearray, memoryview)):
+        return len(what)
+    try:
+        return os.path.getsize(what)
+    except OSError:
+        return 0
+
+
+def add_read(what: Union[int, bytes, str, os.PathLike]) -> None:
+    """Anota bytes leídos: un número, unos datos o la ruta de un archivo ya leído."""
+    if _TRACE is not None:
+        _TRACE.add("bytes_read", _size(what))
+
+
+def add_written(what: Union[int, bytes, str, os.PathLike]) -> None:
+    """Anota bytes escritos: un número, unos datos o la ruta de un archivo ya escrito."""
+    if _TRACE is not None:
+        _TRACE.add("bytes_written", _size(what))
+
+
+def read_bytes(path: Union[str, os.PathLike]) -> bytes:
+    data = Path(path).read_bytes()
+    add_read(len(data))
+    return data
+
+
+def write_bytes(path: Union[str, os.PathLike], data: bytes) -> None:
+    Path(path).write_bytes(data)
+    add_written(len(data))
+
+
+# ───────────────────────────────  CLI  ───────────────────────────────────────
+def add_arguments(parser) -> None:
+    """Añade --profile, --trace-json y --metrics a un ArgumentParser."""
+    group = parser.add_argument_group("instrumentación")
+    group.add_argument("--profile", metavar="FILE",
+                       help="guarda un perfil de cProfile (abrir con python -m pstats FILE)")
+    group.add_argument("--trace-json", metavar="FILE",
+                       help="guarda tiempos, bytes y elementos de cada fase en JSON")
+    group.add_argument("--metrics", action="store_true",
+                       help="muestra el resumen de tiempos y contadores al terminar")
+
+
+def _exit_code(exc: BaseException) -> int:
+    if isinstance(exc, SystemExit):
+        if exc.code is None or isinstance(exc.code, int):
+            return exc.code or 0
+        return 1            # SystemExit("mensaje")
+    if isinstance(exc, KeyboardInterrupt):
+        return 130
+    return 1
+
+
+def _fmt_bytes(n: int) -> str:
+    if n < 1024:
+        return f"{n} B"
+    if n < 1 << 20:
+        return f"{n / 1024:.1f} KiB"
+    return f"{n / (1 << 20):.1f} MiB"
+
+
+def _line(name: str, seconds: float, counters: dict) -> str:
+    parts = [f"  {name:<28} {seconds:9.3f} s"]
+    if counters["bytes_read"]:
+        parts.append(f"leídos {_fmt_bytes(counters['bytes_read'])}")
+    if counters["bytes_written"]:
+        parts.append(f"escritos {_fmt_bytes(counters['bytes_written'])}")
+    parts += [f"{k}={v}" for k, v in counters["items"].items()]
+    return "   ".join(parts)
+
+
+def summary(trace: Trace) -> str:
+    lines = [f"── métricas: {trace.tool} ──"]
+    lines += [_line(p["name"], p["seconds"], p) for p in trace.phases]
+    lines.append(_line("total", trace.seconds, trace.totals))
+    return "\n".join(lines)
+
+
+@contextmanager
+def session(args, tool: str) -> Iterator[Trace]:
+    """Activa la instrumentación pedida en `args` durante el bloque."""
+    global _TRACE
+    profile_path = getattr(args, "profile", None)
+    trace_path = getattr(args, "trace_json", None)
+    show = getattr(args, "metrics", False)
+
+    previous, _TRACE = _TRACE, Trace(tool)
+    trace = _TRACE
+    profiler = cProfile.Profile() if profile_path else None
+    code = 0
+    if profiler:
+        profiler.enable()
+    try:
+        yield trace
+    except BaseException as exc:
+        code = _exit_code(exc)
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        trace.finish(code)
+        _TRACE = previous
+        if profiler:
+            profiler.dump_stats(profile_path)
+            print(f"perfil → {profile_path}", file=sys.stderr)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        if trace_path:
+            path = Path(trace_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(trace.as_dict(), indent=2, ensure_ascii=False), "utf-8")
+        if show:
+            print(summary(trace), file=sys.stderr)
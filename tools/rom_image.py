@@ -0,0 +1,260 @@
+"""Imagen de ROM en memoria mapeada con los cambios en una capa aparte.
+
+Los scripts que modifican la ROM hacían `bytearray(Path(rom).read_bytes())`,
+es decir, copiaban la ROM entera solo para cambiar unos cientos de bytes.
+`RomImage` mapea el archivo original en solo lectura (mmap) y guarda cada
+escritura en una capa de tramos (offset, bytes) ordenados y sin solapes:
+
+  - leer un byte o un tramo busca en la capa con bisect (O(log n)) y el resto
+    sale directamente del mapeo;
+  - `find` busca en C sobre el mapeo y solo copia las ventanas alrededor
+    de los tramos modificados;
+  - `segments` recorre la ROM resultante por trozos sin materializarla, y
+    con ella se escribe a disco (`write_to`), se calculan hashes
+    (`digest`) y el checksum de la cabecera (`checksum`);
+  - `patches` devuelve los cambios como (offset, antiguo, nuevo), listos
+    para generar un IPS sin comparar las dos ROMs enteras.
+
+Admite la misma interfaz de bytearray que usan `repoint_text`,
+`ImportPlan.apply` y `apply_patches` (`len`, índices, slices, asignación de
+slices del mismo tamaño y `find`), así que esas funciones sirven igual para
+un bytearray que para una RomImage. Las escrituras nunca cambian el tamaño
+de la ROM.
+
+    with RomImage.open("roms/Traysia (W).bin") as rom:
+        rom[0x1504:0x150A] = b"\\x7e\\x00\\x60\\x04\\x4e\\x71"
+        rom.write_to("roms/Traysia (W)_patched.bin")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+CHUNK = 1 << 20
+# El checksum de Mega Drive suma las palabras a partir de la cabecera
+CHECKSUM_START = 0x200
+
+
+class RomImage:
+    """ROM de solo lectura (mmap o bytes) más una capa de escrituras."""
+
+    def __init__(self, base: Union[bytes, bytearray, mmap.mmap], path: Optional[Path] = None):
+        self._base = base
+        self.path = path
+        self.size = len(base)
+        # Tramos modificados: _starts[i] <= ... < _ends[i], con sus bytes
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        self._data: list[bytes] = []
+
+    @classmethod
+    def open(cls, path: Union[str, os.PathLike]) -> "RomImage":
+        path = Path(path)
+        with open(path, "rb") as f:
+            try:
+                base = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:         # archivo vacío: no se puede mapear
+                base = b""
+        return cls(base, path)
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray]) -> "RomImage":
+        return cls(bytes(data))
+
+    def close(self) -> None:
+        if isinstance(self._base, mmap.mmap):
+            self._base.close()
+
+    def __enter__(self) -> "RomImage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def modified(self) -> int:
+        """Bytes cubiertos por la capa de escrituras."""
+        return sum(e - s for s, e in zip(self._starts, self._ends))
+
+    # ───────────────────────────  Lectura  ───────────────────────────────────
+    def _first_span(self, offset: int) -> int:
+        """Índice del primer tramo que termina después de `offset`."""
+        i = bisect_right(self._starts, offset) - 1
+        if i < 0 or self._ends[i] <= offset:
+            i += 1
+        return i
+
+    def read(self, offset: int, length: int) -> bytes:
+        end = min(offset + length, self.size)
+        offset = max(offset, 0)
+        if offset >= end:
+            return b""
+        i = self._first_span(offset)
+        if i == len(self._starts) or self._starts[i] >= end:
+            return self._base[offset:end]
+        out = bytearray()
+        pos = offset
+        while i < len(self._starts) and self._starts[i] < end:
+            start, stop = self._starts[i], min(self._ends[i], end)
+            if pos < start:
+                out += self._base[pos:start]
+                pos = start
+            out += self._data[i][pos - start:stop - start]
+            pos = stop
+            i += 1
+        if pos < end:
+            out += self._base[pos:end]
+        return bytes(out)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step != 1:
+                raise ValueError("RomImage no admite slices con paso")
+            return self.read(start, stop - start)
+        if key < 0:
+            key += self.size
+        if not 0 <= key < self.size:
+            raise IndexError("offset fuera de la ROM")
+        i = self._first_span(key)
+        if i < len(self._starts) and self._starts[i] <= key:
+            return self._data[i][key - self._starts[i]]
+        return self._base[key]
+
+    def find(self, sub: bytes, start: int = 0, end: Optional[int] = None) -> int:
+        """Como bytes.find, sobre la ROM con las escrituras aplicadas."""
+        pos, end, _ = slice(start, end).indices(self.size)
+        base, starts, ends, data = self._base, self._starts, self._ends, self._data
+        reach = len(sub) - 1
+        i, n = self._first_span(pos), len(starts)
+        while i < n and starts[i] < end:
+            span_start, span_end = starts[i], ends[i]
+            # Coincidencias enteras antes del tramo: directamente en el original
+            hit = base.find(sub, pos, span_start if span_start < end else end)
+            if hit != -1:
+                return hit
+            # Coincidencias que tocan el tramo: en una ventana pequeña
+            w0 = span_start - reach if span_start - reach > pos else pos
+            w1 = span_end + reach if span_end + reach < end else end
+            if (span_start < pos or span_end > w1 or (i and ends[i - 1] > w0)
+                    or (i + 1 < n and starts[i + 1] < w1)):
+                window = self.read(w0, w1 - w0)      # tramo recortado o tramos muy próximos
+            else:
+                window = base[w0:span_start] + data[i] + base[span_end:w1]
+            hit = window.find(sub)
+            if hit != -1:
+                return w0 + hit
+            if span_end > pos:
+                pos = span_end
+            i += 1
+        return base.find(sub, pos, end) if pos < end else -1
+
+    # ───────────────────────────  Escritura  ─────────────────────────────────
+    def write(self, offset: int, data: bytes) -> None:
+        """Escribe `data` en `offset` (en la capa; el original no cambia)."""
+        data = bytes(data)
+        end = offset + len(data)
+        if not data:
+            return
+        if offset < 0 or end > self.size:
+            raise ValueError(f"Escritura 0x{offset:X}-0x{end:X} fuera de la ROM ({self.size} bytes)")
+        # Tramos que se solapan o son contiguos: se funden en uno
+        i = self._first_span(offset - 1) if offset else 0
+        j = i
+        while j < len(self._starts) and self._starts[j] <= end:
+            j += 1
+        if i < j:
+            merged_start = min(offset, self._starts[i])
+            merged_end = max(end, self._ends[j - 1])
+            buf = bytearray(self.read(merged_start, merged_end - merged_start))
+            buf[offset - merged_start:end - merged_start] = data
+            offset, end, data = merged_start, merged_end, bytes(buf)
+        self._starts[i:j] = [offset]
+        self._ends[i:j] = [end]
+        self._data[i:j] = [data]
+
+    def __setitem__(self, key, value) -> None:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step != 1 or len(value) != stop - start:
+                raise ValueError("RomImage solo admite asignar slices contiguos del mismo tamaño")
+            self.write(start, value)
+        else:
+            self.write(key if key >= 0 else key + self.size, bytes([value]))
+
+    # ─────────────────────────────  Salida  ──────────────────────────────────
+    def segments(self, start: int = 0, chunk: int = CHUNK) -> Iterator[Union[bytes, memoryview]]:
+        """Trozos consecutivos de la ROM resultante desde `start` (sin copiar el original)."""
+        with memoryview(self._base) as view:
+            pos = start
+            i = self._first_span(pos)
+            while pos < self.size:
+                stop = self._starts[i] if i < len(self._starts) else self.size
+                while pos < stop:
+                    step = min(chunk, stop - pos)
+                    yield view[pos:pos + step]
+                    pos += step
+                if i < len(self._starts):
+                    yield self._data[i][pos - self._starts[i]:]
+                    pos = self._ends[i]
+                    i += 1
+
+    def write_to(self, target: Union[str, os.PathLike]) -> int:
+        """Guarda la ROM resultante en `target` por trozos; devuelve los bytes escritos."""
+        target = Path(target)
+        onto_source = (self.path is not None and target.exists()
+                       and os.path.samefile(target, self.path))
+        # Archivo temporal + replace: nunca se trunca un archivo mapeado
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.writelines(self.segments())
+            if onto_source:
+                # En Windows no se puede reemplazar un archivo mapeado
+                self.close()
+            os.replace(tmp, target)
+        except BaseException:
+            # Sin rastro junto a la ROM si falla la escritura o el replace
+            tmp.unlink(missing_ok=True)
+            raise
+        if onto_source:
+            # El original pasa a ser el resultado: se vuelve a mapear sin capa
+            self._base = RomImage.open(target)._base
+            self._starts, self._ends, self._data = [], [], []
+        return self.size
+
+    def to_bytes(self) -> bytes:
+        return b"".join(self.segments())
+
+    def digest(self, name: str = "sha1") -> str:
+        h = hashlib.new(name)
+        for seg in self.segments():
+            h.update(seg)
+        return h.hexdigest()
+
+    def checksum(self) -> int:
+        """Checksum de la cabecera de Mega Drive: suma de palabras desde 0x200."""
+        total = 0
+        end = self.size & ~1
+        for pos in range(CHECKSUM_START, end, CHUNK):
+            words = array("H", self.read(pos, min(CHUNK, end - pos)))
+            if sys.byteorder == "little":
+                words.byteswap()
+            total += sum(words)
+        return total & 0xFFFF
+
+    def patches(self) -> list[tuple[int, bytes, bytes]]:
+        """Cambios como (offset, bytes originales, bytes nuevos), sin tramos idénticos."""
+        return [(start, bytes(self._base[start:end]), data)
+                for start, end, data in zip(self._starts, self._ends, self._data)
+                if self._base[start:end] != data]
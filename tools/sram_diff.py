@@ -0,0 +1,371 @@
+"""Mapa de escrituras en la SRAM a partir de una serie de instantaneas .srm.
+
+Para investigar el fallo de guardado hay que ver QUE bytes de la SRAM cambian
+entre una instantanea y la siguiente (exportadas del emulador tras cada paso
+de la prueba) y si alguno cae fuera de las zonas que escribe el juego. Este
+script recorre la serie en orden y, para cada par consecutivo:
+
+  1. Calcula el mapa de cambios byte a byte de los 8 KB de una vez: XOR de
+     las dos instantaneas como enteros grandes (en C, sin bucle por byte) y
+     busqueda de los tramos distintos de cero con `re`.
+  2. Asigna cada tramo a la zona documentada en el README (direcciones de
+     bus, bytes impares de $200001-$203FFF):
+       - firma " SRAM_save_data " x3 en $200011, $200031 y $200051;
+       - slot n (0-3) en $200081 + 0xF00*n, con tres copias separadas
+         +0x500/+0xA00 en el bus; cada copia son COPY_DATA bytes de datos
+         seguidos de la suma de verificacion (el resto de la ventana de
+         0x280 bytes de la copia; ajustable con --copy-data).
+     Lo que cae fuera de esas zonas se marca como escritura inesperada.
+  3. Comprueba que las tres copias de cada slot modificado quedan iguales
+     (el juego las escribe todas en cada guardado).
+
+Solo se tienen en memoria la instantanea anterior, la actual y un contador
+por byte de la SRAM, asi que miles de instantaneas de un directorio se
+procesan con memoria constante.
+
+Formatos de .srm admitidos (--layout auto los distingue por tamano):
+  - "packed": 8 KB, solo los bytes de la SRAM (bus $200001 + 2*i);
+  - "bus": ventana del bus desde $200000 (16 o 64 KB, segun el emulador o el
+    volcado de hardware). La SRAM son los bytes impares de los primeros
+    16 KB; los pares y lo que hay a partir de 0x4000 es bus abierto y sus
+    cambios se cuentan aparte como ruido, no como escrituras.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+import instrument
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+SRAM_BUS = 0x200001          # primer byte de la SRAM en el bus (impares)
+SRAM_SIZE = 0x2000           # 8 KB
+BUS_WINDOW = 2 * SRAM_SIZE   # bytes de la ventana de bus que cubren la SRAM
+
+SIGNATURE_BUS = (0x200011, 0x200031, 0x200051)
+SIGNATURE_LEN = 16           # " SRAM_save_data "
+SLOT_BUS = 0x200081
+SLOT_STRIDE = 0xF00          # en el bus
+SLOTS = 4
+COPY_STRIDE = 0x500          # en el bus: copias en +0x000, +0x500, +0xA00
+COPIES = 3
+COPY_DATA = 600              # bytes de datos de cada copia (~600 según el desensamblado)
+
+SUFFIXES = (".srm", ".sav", ".sram")
+_CHANGED = re.compile(rb"[^\x00]+")
+
+
+def bus_to_index(bus: int) -> int:
+    return (bus - SRAM_BUS) // 2
+
+
+def index_to_bus(index: int) -> int:
+    return SRAM_BUS + 2 * index
+
+
+class Region(NamedTuple):
+    start: int               # índice en la SRAM (no dirección de bus)
+    end: int
+    name: str
+    expected: bool
+    slot: Optional[int] = None
+    copy: Optional[int] = None
+
+    @property
+    def group(self) -> str:
+        """Zona sin el número de copia ("slot 2 datos")."""
+        return self.name if self.copy is None else self.name.replace(f" copia {self.copy}", "")
+
+
+def layout(copy_data: int = COPY_DATA) -> list[Region]:
+    """Zonas de la SRAM en orden, cubriendo los 8 KB sin huecos."""
+    zones: list[Region] = []
+    for k, bus in enumerate(SIGNATURE_BUS):
+        start = bus_to_index(bus)
+        zones.append(Region(start, start + SIGNATURE_LEN, f"firma {k}", True))
+    copy_span = COPY_STRIDE // 2
+    for n in range(SLOTS):
+        for c in range(COPIES):
+            start = bus_to_index(SLOT_BUS + SLOT_STRIDE * n + COPY_STRIDE * c)
+            split = start + min(copy_data, copy_span)
+            zones.append(Region(start, split, f"slot {n} copia {c} datos", True, n, c))
+            if split < start + copy_span:
+                zones.append(Region(split, start + copy_span, f"slot {n} copia {c} checksum", True, n, c))
+    # Huecos entre zonas conocidas: nada del juego debería escribir ahí
+    full: list[Region] = []
+    pos = 0
+    for zone in zones:
+        if zone.start > pos:
+            full.append(Region(pos, zone.start, "sin uso", False))
+        full.append(zone)
+        pos = zone.end
+    if pos < SRAM_SIZE:
+        full.append(Region(pos, SRAM_SIZE, "sin uso", False))
+    return full
+
+
+def copy_ranges(slot: int) -> list[tuple[int, int]]:
+    span = COPY_STRIDE // 2
+    starts = [bus_to_index(SLOT_BUS + SLOT_STRIDE * slot + COPY_STRIDE * c) for c in range(COPIES)]
+    return [(s, s + span) for s in starts]
+
+
+# ─────────────────────────────  Instantáneas  ─────────────────────────────────
+class Snapshot(NamedTuple):
+    name: str
+    sram: bytes              # los 8 KB, en orden de índice
+    noise: bytes             # bus abierto (solo formato "bus"), b"" si no hay
+
+
+def split_snapshot(data: bytes, fmt: str = "auto") -> tuple[bytes, bytes]:
+    if fmt == "auto":
+        fmt = "packed" if len(data) == SRAM_SIZE else "bus"
+    if fmt == "packed":
+        if len(data) < SRAM_SIZE:
+            raise ValueError(f"{len(data)} bytes: un .srm compacto ocupa {SRAM_SIZE}")
+        return data[:SRAM_SIZE], b""
+    if len(data) < BUS_WINDOW:
+        raise ValueError(f"{len(data)} bytes: la ventana de bus ocupa al menos {BUS_WINDOW}")
+    return data[1:BUS_WINDOW:2], data[0:BUS_WINDOW:2] + data[BUS_WINDOW:]
+
+
+def _natural_key(path: Path) -> list:
+    # "save_10" después de "save_9"
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", path.name)]
+
+
+def snapshot_paths(paths: Iterable[str], order: str = "name") -> Iterator[Path]:
+    """Archivos de la serie: los directorios se expanden a sus .srm ordenados."""
+    for raw in paths:
+        path = Path(raw)
+        if not path.is_dir():
+            yield path
+            continue
+        files = [Path(e.path) for e in os.scandir(path)
+                 if e.is_file() and e.name.lower().endswith(SUFFIXES)]
+        if order == "mtime":
+            files.sort(key=lambda p: (p.stat().st_mtime_ns, _natural_key(p)))
+        else:
+            files.sort(key=_natural_key)
+        yield from files
+
+
+def read_snapshots(paths: Iterable[Path], fmt: str = "auto") -> Iterator[Snapshot]:
+    for path in paths:
+        data = path.read_bytes()
+        instrument.add_read(len(data))
+        try:
+            sram, noise = split_snapshot(data, fmt)
+        except ValueError as exc:
+            raise ValueError(f"{path}: {exc}") from None
+        yield Snapshot(path.name, sram, noise)
+
+
+# ───────────────────────────  Mapa de cambios  ───────────────────────────────
+def change_runs(old: bytes, new: bytes) -> Iterator[tuple[int, int]]:
+    """Tramos [inicio, fin) donde `old` y `new` difieren."""
+    if old == new:
+        return
+    n = len(new)
+    xor = (int.from_bytes(old, "little") ^ int.from_bytes(new, "little")).to_bytes(n, "little")
+    for m in _CHANGED.finditer(xor):
+        yield m.start(), m.end()
+
+
+def count_changed(old: bytes, new: bytes) -> int:
+    if old == new:
+        return 0
+    n = min(len(old), len(new))
+    xor = (int.from_bytes(old[:n], "little") ^ int.from_bytes(new[:n], "little")).to_bytes(n, "little")
+    return n - xor.count(0) + abs(len(old) - len(new))
+
+
+class Change(NamedTuple):
+    start: int
+    end: int
+    region: Region
+
+
+class Transition(NamedTuple):
+    old: str
+    new: str
+    changes: list[Change]
+    noise: int               # bytes de bus abierto distintos
+    mismatched: list[int]    # slots tocados cuyas tres copias no coinciden
+
+    @property
+    def unexpected(self) -> list[Change]:
+        return [c for c in self.changes if not c.region.expected]
+
+
+class SramDiff:
+    """Compara instantáneas consecutivas y acumula estadísticas por zona y byte."""
+
+    def __init__(self, regions: list[Region]):
+        self.regions = regions
+        self.starts = [r.start for r in regions]
+        self.heat = array("I", bytes(4 * SRAM_SIZE))   # transiciones que cambian cada byte
+        # zona sin copia → [transiciones, bytes]
+        self.per_region: dict[str, list[int]] = {r.group: [0, 0] for r in regions}
+        self.saves = [0] * SLOTS
+        self.transitions = 0
+        self.unexpected = 0
+
+    def split(self, start: int, end: int) -> Iterator[Change]:
+        """Reparte el tramo [start, end) entre las zonas que toca."""
+        k = bisect_right(self.starts, start) - 1
+        while start < end:
+            region = self.regions[k]
+            stop = min(end, region.end)
+            yield Change(start, stop, region)
+            start = stop
+            k += 1
+
+    def compare(self, old: Snapshot, new: Snapshot) -> Transition:
+        self.transitions += 1
+        changes = [c for s, e in change_runs(old.sram, new.sram) for c in self.split(s, e)]
+        touched_regions: set[str] = set()
+        slots: set[int] = set()
+        heat = self.heat
+        for c in changes:
+            for i in range(c.start, c.end):
+                heat[i] += 1
+            stats = self.per_region[c.region.group]
+            stats[1] += c.end - c.start
+            if c.region.group not in touched_regions:
+                touched_regions.add(c.region.group)
+                stats[0] += 1
+            if c.region.slot is not None:
+                slots.add(c.region.slot)
+            if not c.region.expected:
+                self.unexpected += c.end - c.start
+        mismatched = []
+        for slot in sorted(slots):
+            self.saves[slot] += 1
+            copies = {new.sram[s:e] for s, e in copy_ranges(slot)}
+            if len(copies) > 1:
+                mismatched.append(slot)
+        return Transition(old.name, new.name, changes, count_changed(old.noise, new.noise), mismatched)
+
+    def run(self, snapshots: Iterable[Snapshot]) -> Iterator[Transition]:
+        previous: Optional[Snapshot] = None
+        for snap in snapshots:
+            if previous is not None:
+                yield self.compare(previous, snap)
+            previous = snap
+
+
+# ───────────────────────────────  Informe  ───────────────────────────────────
+def _span(start: int, end: int) -> str:
+    return f"${index_to_bus(start):06X}-${index_to_bus(end - 1):06X}"
+
+
+def describe(t: Transition, verbose: bool = False) -> list[str]:
+    if not t.changes:
+        if not verbose:
+            return []
+        return [f"{t.old} → {t.new}: sin cambios" + (f" (ruido de bus: {t.noise})" if t.noise else "")]
+    total = sum(c.end - c.start for c in t.changes)
+    # Bytes por zona y copia: "slot 2 datos: 598+598+598"
+    zones: dict[str, dict[Optional[int], int]] = {}
+    for c in t.changes:
+        per_copy = zones.setdefault(c.region.group, {})
+        per_copy[c.region.copy] = per_copy.get(c.region.copy, 0) + c.end - c.start
+    parts = []
+    for name, per_copy in zones.items():
+        if None in per_copy:
+            parts.append(f"{name}: {per_copy[None]}")
+        else:
+            parts.append(f"{name}: " + "+".join(str(per_copy.get(c, 0)) for c in range(COPIES)))
+    line = f"{t.old} → {t.new}: {total} bytes (" + ", ".join(parts) + ")"
+    if t.noise:
+        line += f"; ruido de bus: {t.noise}"
+    lines = [line]
+    for c in t.unexpected:
+        lines.append(f"  ⚠️ escritura fuera de zona: {_span(c.start, c.end)} ({c.end - c.start} bytes)")
+    for slot in t.mismatched:
+        lines.append(f"  ⚠️ slot {slot}: las tres copias no coinciden")
+    if verbose:
+        for c in t.changes:
+            if c.region.expected:
+                lines.append(f"    {_span(c.start, c.end)}  {c.region.name}")
+    return lines
+
+
+def write_heatmap(path: Path, diff: SramDiff) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        out = csv.writer(f)
+        out.writerow(["indice", "bus", "zona", "cambios"])
+        for region in diff.regions:
+            for i in range(region.start, region.end):
+                if diff.heat[i]:
+                    out.writerow([i, f"${index_to_bus(i):06X}", region.name, diff.heat[i]])
+    instrument.add_written(path)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compara instantáneas .srm consecutivas de Traysia y marca escrituras fuera de zona"
+    )
+    parser.add_argument("snapshots", nargs="+",
+                        help="Archivos .srm en orden, o directorios (se recorren sus .srm/.sav)")
+    parser.add_argument("--layout", choices=("auto", "packed", "bus"), default="auto",
+                        help="Formato del .srm: 8 KB compacto o ventana de bus (por defecto: según el tamaño)")
+    parser.add_argument("--order", choices=("name", "mtime"), default="name",
+                        help="Orden de los archivos de un directorio (por defecto: nombre, con números en orden natural)")
+    parser.add_argument("--copy-data", type=int, default=COPY_DATA, metavar="N",
+                        help=f"Bytes de datos de cada copia; el resto es checksum (por defecto: {COPY_DATA})")
+    parser.add_argument("--heatmap", metavar="CSV",
+                        help="Guarda cuántas transiciones cambian cada byte de la SRAM")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Lista también los tramos esperados y las transiciones sin cambios")
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    diff = SramDiff(layout(args.copy_data))
+    flagged = 0
+    with instrument.session(args, "sram_diff"):
+        with instrument.phase("comparar"):
+            snapshots = read_snapshots(snapshot_paths(args.snapshots, args.order), args.layout)
+            try:
+                for t in diff.run(snapshots):
+                    if t.unexpected or t.mismatched:
+                        flagged += 1
+                    for line in describe(t, args.verbose):
+                        print(line)
+            except (OSError, ValueError) as exc:
+                raise SystemExit(f"❌ {exc}")
+            instrument.count("transiciones", diff.transitions)
+        if args.heatmap:
+            with instrument.phase("mapa"):
+                write_heatmap(Path(args.heatmap), diff)
+
+    if not diff.transitions:
+        raise SystemExit("❌ Hacen falta al menos dos instantáneas")
+    print(f"\n── {diff.transitions + 1} instantáneas, {diff.transitions} transiciones ──")
+    for name, (times, nbytes) in diff.per_region.items():
+        if times:
+            print(f"  {name:<16} {times:>6} transiciones  {nbytes:>8} bytes")
+    print("  guardados por slot: " + ", ".join(f"{n}: {k}" for n, k in enumerate(diff.saves)))
+    if flagged:
+        print(f"⚠️ {flagged} transiciones con escrituras fuera de zona o copias distintas "
+              f"({diff.unexpected} bytes fuera de zona)")
+        raise SystemExit(1)
+    print("✔ Todas las escrituras caen en la firma o en los slots")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 # traysia_rom_analyzer.py
 
+import argparse
 import hashlib
 import os
 import sys
 
+import instrument
+
 # Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
 try:
     sys.stdout.reconfigure(errors="replace")
@@ -39,6 +42,7 @@ def parse_md_header(rom_path):
 def calculate_hashes(filepath):
     with open(filepath, "rb") as f:
         data = f.read()
+        instrument.add_read(data)
         md5 = hashlib.md5(data).hexdigest()
         sha1 = hashlib.sha1(data).hexdigest()
     return md5, sha1, len(data)
@@ -48,6 +52,7 @@ def compare_roms(path_a, path_b):
         data_a = f.read()
     with open(path_b, "rb") as f:
         data_b = f.read()
+    instrument.add_read(len(data_a) + len(data_b))
 
     size_a, size_b = len(data_a), len(data_b)
     min_size = min(size_a, size_b)
@@ -80,8 +85,13 @@ def summarize_rom(rom_path):
     summary["Size"] = size
     return summary
 
-# Example usage:
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Resume y compara las versiones de Traysia de la carpeta roms/"
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+
     roms = {
         "Japón": "roms/Minato no Traysia (Japan).md",
         "USA": "roms/Traysia (USA).md",
@@ -89,28 +99,37 @@ if __name__ == "__main__":
         "Español": "roms/Traysia (W).bin"
     }
 
-    print("--- ROM Summaries ---")
-    for name, path in roms.items():
-        if not os.path.exists(path):
-            print(f"\n{name}: (ROM no encontrada: {path})")
-            continue
-        info = summarize_rom(path)
-        print(f"\n{name}:")
-        for k, v in info.items():
-            print(f"  {k}: {v}")
-
-    print("\n--- Binary Comparisons ---")
-    comparisons = [
-        ("Japón", "USA"),
-        ("USA", "Evercade"),
-        ("Japón", "Español")
-    ]
-
-    for a, b in comparisons:
-        if not (os.path.exists(roms[a]) and os.path.exists(roms[b])):
-            print(f"\nComparando {a} vs {b}: (falta alguna ROM, se omite)")
-            continue
-        result = compare_roms(roms[a], roms[b])
-        print(f"\nComparando {a} vs {b}:")
-        for k, v in result.items():
-            print(f"  {k}: {v}")
+    with instrument.session(args, "traysia_rom_analyzer"):
+        print("--- ROM Summaries ---")
+        with instrument.phase("resúmenes"):
+            for name, path in roms.items():
+                if not os.path.exists(path):
+                    print(f"\n{name}: (ROM no encontrada: {path})")
+                    continue
+                info = summarize_rom(path)
+                instrument.count("roms")
+                print(f"\n{name}:")
+                for k, v in info.items():
+                    print(f"  {k}: {v}")
+
+        print("\n--- Binary Comparisons ---")
+        comparisons = [
+            ("Japón", "USA"),
+            ("USA", "Evercade"),
+            ("Japón", "Español")
+        ]
+
+        with instrument.phase("comparaciones"):
+            for a, b in comparisons:
+                if not (os.path.exists(roms[a]) and os.path.exists(roms[b])):
+                    print(f"\nComparando {a} vs {b}: (falta alguna ROM, se omite)")
+                    continue
+                result = compare_roms(roms[a], roms[b])
+                instrument.count("comparaciones")
+                print(f"\nComparando {a} vs {b}:")
+                for k, v in result.items():
+                    print(f"  {k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
-import json
 import sys
 from pathlib import Path
 
+from align_translations import align, report
+from entry_store import EntryStore
+
 # Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
 try:
     sys.stdout.reconfigure(errors="replace")
@@ -15,14 +17,37 @@ for p in (spanish_path, german_path):
     if not p.exists():
         raise SystemExit(f"❌ No se encuentra {p}. Ejecuta el script desde la raíz del repositorio.")
 
-es_data = json.loads(spanish_path.read_text(encoding="utf-8"))
-de_data = json.loads(german_path.read_text(encoding="utf-8"))
+es_data = EntryStore.load(spanish_path)
+de_data = EntryStore.load(german_path)
+
+# Emparejar por offset (índice O(1) del almacén). Las entradas cuyo offset ya
+# no existe (ROM revisada) se realinean por el contenido de su text_source con
+# las cadenas libres, y adoptan el offset y la longitud nuevos.
+taken = set()
+orphans = []
+missing = 0
+for i, j in de_data.join(es_data):
+    de = de_data[i]
+    if j is not None:
+        de["text_source"] = es_data.get_value(j, "text")
+        taken.add(es_data.offsets[j])
+    elif de.get("text_source"):
+        orphans.append(de)
+    else:
+        missing += 1
 
-if len(es_data) != len(de_data):
-    raise SystemExit("❌ Los archivos no tienen la misma cantidad de entradas.")
+if orphans:
+    free = [es for es in es_data if es["offset"] not in taken]
+    alignment = align(orphans, free)
+    for m in alignment.matches:
+        de, es = orphans[m.old], free[m.new]
+        de.update(offset=es["offset"], offset_hex=f"0x{es['offset']:X}",
+                  length=es["length"], text_source=es["text"], review=True)
+    report(alignment, orphans, free)
+    missing += len(alignment.unmatched_old)
 
-for es, de in zip(es_data, de_data):
-    de["text_source"] = es["text"]
+if missing:
+    print(f"⚠ {missing} entradas de german.json no tienen pareja en spanish.json")
 
-german_path.write_text(json.dumps(de_data, ensure_ascii=False, indent=2), encoding="utf-8")
-print(f"✔ Añadido 'text_source' a {len(de_data)} entradas en german.json")
+de_data.save(german_path)
+print(f"✔ Añadido 'text_source' a {len(de_data) - missing} entradas en german.json")
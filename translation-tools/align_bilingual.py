@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""Alinea el guion inglés y el castellano de la ROM de Shinyuden.
+
+La ROM conserva el guion inglés de la versión USA (DEFAULT_ENGLISH_OFFSET,
+0x07B706-0x0937C4) junto al castellano (0x100000). Este script extrae las
+cadenas de los dos bloques y las empareja para formar un corpus paralelo
+EN-ES, en dos fases:
+
+  1. Punteros: los valores de 32 bits de la ROM que apuntan al inicio de una
+     cadena se agrupan en tablas (entradas seguidas cada 4 bytes). Una tabla
+     al bloque castellano y otra al inglés con el mismo número de entradas
+     se emparejan posición a posición. De esas anclas solo se usan las
+     monótonas (crecientes en los dos bloques).
+  2. Longitud y puntuación: los huecos entre anclas se alinean con
+     programación dinámica al estilo Gale–Church. El coste de cada grupo
+     (1-1, 1-0, 0-1, 2-1, 1-2, 2-2 cadenas) sale de lo que se desvía la
+     longitud inglesa de la esperada, de la frecuencia de ese tipo de grupo
+     y de si la puntuación final ('.', '!', '?') no coincide. La DP se limita
+     a una banda alrededor de la diagonal.
+
+El resultado es un archivo de traducción (JSON o JSONL, ver translation_io)
+con una entrada por grupo:
+
+    {"offset": 1048576, "offset_hex": "0x100000", "en_offset": 505606,
+     "en_offset_hex": "0x7B706", "text_source": "EL REINO...",
+     "text": "THE KINGDOM...", "lang": "en", "method": "pointer",
+     "bead": "1-1", "cost": 0.0}
+
+Ese corpus sirve como memoria de traducción de translate_spanish_to_german.py
+(`--memory`): con `--target en` las frases con texto inglés oficial no se
+envían al motor.
+
+Uso:
+    python translation-tools/align_bilingual.py "roms/Traysia (W).bin" translations/en_es.json
+    python translation-tools/align_bilingual.py "roms/Traysia (W).bin" en_es.jsonl --band 200 --show 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import switch_to_english
+import translate_spanish
+from translation_io import save_entries
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+ENCODING = "latin-1"
+SPANISH_BLOCK = translate_spanish.BLOCKS[0]
+ENGLISH_BLOCK = (switch_to_english.DEFAULT_ENGLISH_OFFSET, switch_to_english.DEFAULT_ENGLISH_END)
+# Entradas seguidas mínimas para considerar un grupo de punteros una tabla
+MIN_TABLE = 4
+# Gale–Church: varianza de la longitud por carácter y frecuencia de cada grupo
+VARIANCE = 6.8
+BEADS = {
+    (1, 1): 0.89,
+    (1, 0): 0.0099 / 2,
+    (0, 1): 0.0099 / 2,
+    (2, 1): 0.089 / 2,
+    (1, 2): 0.089 / 2,
+    (2, 2): 0.011,
+}
+PUNCT_PENALTY = 2.0
+DEFAULT_BAND = 100
+
+
+class Bead(NamedTuple):
+    es: tuple[int, ...]        # índices de cadenas castellanas
+    en: tuple[int, ...]        # índices de cadenas inglesas
+    method: str                # "pointer" | "dp"
+    cost: float
+
+
+def block_strings(data: bytes, block: tuple[int, int]) -> list[dict]:
+    return translate_spanish.extract_strings(data, block[0], min(block[1], len(data)), ENCODING)
+
+
+# ─────────────────────────────  Punteros  ────────────────────────────────────
+def pointer_locations(data: bytes, targets: set[int]) -> dict[int, int]:
+    """offset de cada puntero de 32 bits (en offset par) → valor, para los valores de `targets`."""
+    found: set[int] = set()
+    for start in (0, 2):
+        usable = (len(data) - start) // 4 * 4
+        words = array("I", data[start:start + usable])
+        if words.itemsize != 4:          # plataformas con int de 8 bytes
+            words = array("L", data[start:start + usable])
+        if sys.byteorder == "little":
+            words.byteswap()
+        found.update(targets.intersection(words))
+    locations = {}
+    for value in found:
+        needle = value.to_bytes(4, "big")
+        pos = data.find(needle)
+        while pos != -1:
+            if pos % 2 == 0:
+                locations[pos] = value
+            pos = data.find(needle, pos + 1)
+    return locations
+
+
+def pointer_tables(locations: dict[int, int], index: dict[int, int]) -> list[list[int]]:
+    """Grupos de punteros seguidos (cada 4 bytes) a cadenas de `index`, como listas de índices."""
+    tables, run, last = [], [], None
+    for loc in sorted(loc for loc, value in locations.items() if value in index):
+        if last is not None and loc != last + 4:
+            if len(run) >= MIN_TABLE:
+                tables.append(run)
+            run = []
+        run.append(index[locations[loc]])
+        last = loc
+    if len(run) >= MIN_TABLE:
+        tables.append(run)
+    return tables
+
+
+def _monotonic(pairs: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Subsecuencia creciente más larga (en los dos índices) de las anclas."""
+    pairs = sorted(set(pairs))
+    tails: list[int] = []          # menor índice inglés final de cada longitud
+    tail_at: list[int] = []
+    parent = [-1] * len(pairs)
+    for k, (_, en) in enumerate(pairs):
+        pos = bisect_left(tails, en)
+        if pos == len(tails):
+            tails.append(en)
+            tail_at.append(k)
+        else:
+            tails[pos] = en
+            tail_at[pos] = k
+        parent[k] = tail_at[pos - 1] if pos else -1
+    chain, k = [], tail_at[-1] if tail_at else -1
+    while k != -1:
+        chain.append(pairs[k])
+        k = parent[k]
+    chain.reverse()
+    # Una cadena solo puede anclarse una vez en cada bloque
+    out, seen_es, seen_en = [], set(), set()
+    for es, en in chain:
+        if es not in seen_es and en not in seen_en:
+            out.append((es, en))
+            seen_es.add(es)
+            seen_en.add(en)
+    return out
+
+
+def pointer_anchors(data: bytes, es_strings: list[dict], en_strings: list[dict]) -> list[tuple[int, int]]:
+    """Parejas (índice ES, índice EN) sacadas de tablas de punteros paralelas."""
+    es_index = {s["offset"]: i for i, s in enumerate(es_strings)}
+    en_index = {s["offset"]: i for i, s in enumerate(en_strings)}
+    locations = pointer_locations(data, set(es_index) | set(en_index))
+    by_len: dict[int, tuple[list, list]] = defaultdict(lambda: ([], []))
+    for table in pointer_tables(locations, es_index):
+        by_len[len(table)][0].append(table)
+    for table in pointer_tables(locations, en_index):
+        by_len[len(table)][1].append(table)
+    pairs = []
+    for es_tables, en_tables in by_len.values():
+        # Solo si hay tantas tablas de un lado como del otro: se emparejan en orden
+        if len(es_tables) == len(en_tables):
+            for es_table, en_table in zip(es_tables, en_tables):
+                pairs.extend(zip(es_table, en_table))
+    return _monotonic(pairs)
+
+
+# ──────────────────────────  Gale–Church  ────────────────────────────────────
+def _length(text: str) -> int:
+    return len(text.replace("@", " ").strip())
+
+
+def _final_punct(text: str) -> str:
+    text = text.rstrip(" @\"'")
+    return text[-1] if text and text[-1] in ".!?" else ""
+
+
+class _Scorer:
+    def __init__(self, es_texts: list[str], en_texts: list[str]):
+        # Sumas prefijas de longitudes: el coste de un grupo es O(1)
+        self.es_sum = [0]
+        for t in es_texts:
+            self.es_sum.append(self.es_sum[-1] + _length(t))
+        self.en_sum = [0]
+        for t in en_texts:
+            self.en_sum.append(self.en_sum[-1] + _length(t))
+        self.es_punct = [_final_punct(t) for t in es_texts]
+        self.en_punct = [_final_punct(t) for t in en_texts]
+        # Caracteres ingleses por carácter castellano
+        self.ratio = self.en_sum[-1] / self.es_sum[-1] if self.es_sum[-1] else 1.0
+        self.prior = {bead: -math.log(p) for bead, p in BEADS.items()}
+
+    def cost(self, i: int, j: int, di: int, dj: int) -> float:
+        """Coste del grupo es[i-di:i] ↔ en[j-dj:j]."""
+        l1 = self.es_sum[i] - self.es_sum[i - di]
+        l2 = self.en_sum[j] - self.en_sum[j - dj]
+        cost = self.prior[(di, dj)]
+        if l1 or l2:
+            mean = (l1 + l2 / self.ratio) / 2 or 1
+            delta = abs(l2 - l1 * self.ratio) / math.sqrt(mean * VARIANCE)
+            cost -= math.log(max(math.erfc(delta / _SQRT2), 1e-300))
+        if di and dj and self.es_punct[i - 1] != self.en_punct[j - 1]:
+            cost += PUNCT_PENALTY
+        return cost
+
+
+_SQRT2 = math.sqrt(2)
+
+
+def align_gap(scorer: _Scorer, es0: int, es1: int, en0: int, en1: int, band: int) -> list[Bead]:
+    """Gale–Church sobre es[es0:es1] ↔ en[en0:en1], en una banda alrededor de la diagonal."""
+    n, m = es1 - es0, en1 - en0
+    if not n and not m:
+        return []
+    # La banda siempre cubre la esquina final aunque los huecos sean muy desiguales
+    width = band + abs(n - m)
+    # Fila i: columnas [lo[i], lo[i] + len(total[i])) con su coste y el grupo elegido
+    lo: list[int] = []
+    total: list[list[float]] = []
+    step: list[list[tuple[int, int]]] = []
+    inf = math.inf
+    beads = list(BEADS)
+    for i in range(n + 1):
+        center = int(i * m / n) if n else 0
+        row_lo, row_hi = max(0, center - width), min(m, center + width)
+        if i == 0:
+            row_lo = 0
+        if i == n:
+            row_hi = m
+        row = [inf] * (row_hi - row_lo + 1)
+        back = [(0, 0)] * len(row)
+        for j in range(row_lo, row_hi + 1):
+            if i == 0 and j == 0:
+                row[0] = 0.0
+                continue
+            best, choice = inf, (0, 0)
+            for di, dj in beads:
+                pi, pj = i - di, j - dj
+                if pi < 0 or pj < 0:
+                    continue
+                if pi == i:
+                    k = pj - row_lo
+                    prev = row[k] if 0 <= k < len(row) else inf
+                else:
+                    k = pj - lo[pi]
+                    prev = total[pi][k] if 0 <= k < len(total[pi]) else inf
+                if prev == inf:
+                    continue
+                cost = prev + scorer.cost(es0 + i, en0 + j, di, dj)
+                if cost < best:
+                    best, choice = cost, (di, dj)
+            row[j - row_lo] = best
+            back[j - row_lo] = choice
+        lo.append(row_lo)
+        total.append(row)
+        step.append(back)
+    out = []
+    i, j = n, m
+    while i or j:
+        di, dj = step[i][j - lo[i]]
+        if (di, dj) == (0, 0):
+            raise ValueError("banda de alineamiento demasiado estrecha")
+        cost = total[i][j - lo[i]] - total[i - di][j - dj - lo[i - di]]
+        out.append(Bead(tuple(range(es0 + i - di, es0 + i)), tuple(range(en0 + j - dj, en0 + j)), "dp", cost))
+        i, j = i - di, j - dj
+    out.reverse()
+    return out
+
+
+def align(es_texts: list[str], en_texts: list[str], anchors: list[tuple[int, int]],
+          band: int = DEFAULT_BAND) -> list[Bead]:
+    """Grupos que cubren todas las cadenas de los dos bloques, en orden."""
+    scorer = _Scorer(es_texts, en_texts)
+    beads: list[Bead] = []
+    es0 = en0 = 0
+    for es, en in [*anchors, (len(es_texts), len(en_texts))]:
+        beads.extend(align_gap(scorer, es0, es, en0, en, band))
+        if es < len(es_texts):
+            beads.append(Bead((es,), (en,), "pointer", 0.0))
+        es0, en0 = es + 1, en + 1
+    return beads
+
+
+# ───────────────────────────────  CLI  ───────────────────────────────────────
+def corpus_entries(beads: list[Bead], es_strings: list[dict], en_strings: list[dict]) -> list[dict]:
+    entries = []
+    for bead in beads:
+        es = [es_strings[i] for i in bead.es]
+        en = [en_strings[j] for j in bead.en]
+        entry: dict = {}
+        if es:
+            entry.update(offset=es[0]["offset"], offset_hex=f"0x{es[0]['offset']:X}")
+        if en:
+            entry.update(en_offset=en[0]["offset"], en_offset_hex=f"0x{en[0]['offset']:X}")
+        entry.update(
+            text_source=" ".join(s["text"] for s in es),
+            text=" ".join(s["text"] for s in en),
+            lang="en",
+            method=bead.method,
+            bead=f"{len(es)}-{len(en)}",
+            cost=round(bead.cost, 2),
+        )
+        entries.append(entry)
+    return entries
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Corpus paralelo EN-ES a partir de los dos guiones de la ROM")
+    parser.add_argument("rom", type=Path, help="ROM de Shinyuden con los dos guiones")
+    parser.add_argument("output", type=Path, help="corpus de salida (.json o .jsonl)")
+    parser.add_argument("--spanish", type=lambda x: int(x, 0), nargs=2, metavar=("START", "END"),
+                        default=SPANISH_BLOCK, help="rango del guion castellano (por defecto: bloque 1)")
+    parser.add_argument("--english", type=lambda x: int(x, 0), nargs=2, metavar=("START", "END"),
+                        default=ENGLISH_BLOCK, help="rango del guion inglés")
+    parser.add_argument("--band", type=int, default=DEFAULT_BAND,
+                        help=f"anchura de la banda de la DP en cadenas (por defecto: {DEFAULT_BAND})")
+    parser.add_argument("--no-pointers", action="store_true", help="alinear solo por longitud y puntuación")
+    parser.add_argument("--show", type=int, default=10, help="parejas de ejemplo a mostrar")
+    args = parser.parse_args(argv)
+
+    data = args.rom.read_bytes()
+    es_strings = block_strings(data, tuple(args.spanish))
+    en_strings = block_strings(data, tuple(args.english))
+    print(f"Cadenas: {len(es_strings)} en castellano, {len(en_strings)} en inglés")
+    anchors = [] if args.no_pointers else pointer_anchors(data, es_strings, en_strings)
+    print(f"Anclas por punteros: {len(anchors)}")
+
+    beads = align([s["text"] for s in es_strings], [s["text"] for s in en_strings], anchors, args.band)
+    entries = corpus_entries(beads, es_strings, en_strings)
+    save_entries(args.output, entries)
+
+    kinds = defaultdict(int)
+    for e in entries:
+        kinds[e["bead"]] += 1
+    print("Grupos: " + ", ".join(f"{k}:{v}" for k, v in sorted(kinds.items(), key=lambda kv: -kv[1])))
+    for e in entries[:args.show]:
+        print(f"  {e.get('offset_hex', '-'):>9} ↔ {e.get('en_offset_hex', '-'):<8} [{e['method']} {e['bead']}]"
+              f"  {e['text_source'][:34]!r} → {e['text'][:34]!r}")
+    print(f"✔ Corpus → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Realinea entradas de traducción entre dos revisiones de la ROM.
+
+Cuando una revisión de la ROM desplaza cadenas, emparejar por `offset` (o por
+posición en la lista) pierde o desordena todas las traducciones posteriores al
+desplazamiento. Este módulo empareja las entradas antiguas con las nuevas por
+el contenido de `text_source`, en tres fases:
+
+  1. Coincidencia exacta: índice hash del texto normalizado, O(n).
+  2. Coincidencia aproximada: MinHash sobre trigramas de caracteres con
+     bandas LSH, verificada con la similitud de Jaccard real. Solo se aplica
+     a las entradas que no emparejaron en la fase 1.
+  3. Alineamiento secuencial: los huecos que quedan entre dos anclas
+     consecutivas se alinean por programación dinámica (difflib como medida
+     de similitud), respetando el orden de las cadenas en la ROM.
+
+El resultado indica, para cada pareja, cómo se emparejó y si la cadena se ha
+movido, de modo que los scripts de mezcla puedan informar de ello.
+"""
+
+from __future__ import annotations
+
+import random
+import unicodedata
+import zlib
+from collections import defaultdict, deque
+from difflib import SequenceMatcher
+from typing import Callable, Iterable, Optional
+
+# Parámetros de MinHash/LSH: 8 bandas × 2 filas detectan con ~90 % de
+# probabilidad parejas con Jaccard 0.5, pero dejan pasar ~28 % de las de 0.2;
+# el filtro por tamaño de _near descarta la mayoría antes de intersecar. Con
+# 3 o 4 filas hay menos candidatas, pero la firma cuesta más y se pierden
+# parejas: en total no sale a cuenta.
+NGRAM = 3
+BANDS = 8
+ROWS = 2
+NEAR_THRESHOLD = 0.5
+# Por debajo de ~0.6 difflib acepta reescrituras sin relación con el original
+SEQUENCE_THRESHOLD = 0.6
+# Los huecos mayores se dejan sin alinear (la DP es cuadrática)
+MAX_GAP = 400
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x7A5)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+
+def source_text(entry: dict) -> str:
+    return entry.get("text_source", entry.get("text", ""))
+
+
+def normalize(text: str) -> str:
+    # Ignora diferencias de mayúsculas, espacios y saltos '@' al comparar
+    text = unicodedata.normalize("NFC", text).replace("@", " ").casefold()
+    return " ".join(text.split())
+
+
+def _grams(text: str) -> set[int]:
+    # crc32 y no hash(): hash() cambia con PYTHONHASHSEED y el alineamiento
+    # no sería reproducible
+    padded = f" {text} "
+    if len(padded) < NGRAM:
+        return {zlib.crc32(padded.encode("utf-8"))}
+    return set(map(zlib.crc32, [padded[i:i + NGRAM].encode("utf-8")
+                                for i in range(len(padded) - NGRAM + 1)]))
+
+
+def _signature(grams: set[int], cache: dict[int, tuple[int, ...]]) -> tuple[int, ...]:
+    # Los valores permutados de cada trigrama se calculan una vez por
+    # alineamiento; el mínimo por columna lo hacen zip/min en C.
+    for g in grams.difference(cache):
+        cache[g] = tuple([(a * g + b) % _PRIME for a, b in _PERMS])
+    rows = list(map(cache.__getitem__, grams))
+    return tuple(map(min, zip(*rows)))
+
+
+class Match:
+    __slots__ = ("old", "new", "kind", "score")
+
+    def __init__(self, old: int, new: int, kind: str, score: float):
+        self.old = old
+        self.new = new
+        self.kind = kind      # "exact" | "near" | "sequence"
+        self.score = score
+
+    def __repr__(self) -> str:
+        return f"Match(old={self.old}, new={self.new}, kind={self.kind!r}, score={self.score:.2f})"
+
+
+class Alignment:
+    """Resultado de align(): parejas ordenadas por índice nuevo y sobrantes."""
+
+    def __init__(self, matches: list[Match], old_count: int, new_count: int):
+        self.matches = sorted(matches, key=lambda m: m.new)
+        matched_old = {m.old for m in matches}
+        matched_new = {m.new for m in matches}
+        self.unmatched_old = [i for i in range(old_count) if i not in matched_old]
+        self.unmatched_new = [i for i in range(new_count) if i not in matched_new]
+
+    def by_new(self) -> dict[int, Match]:
+        return {m.new: m for m in self.matches}
+
+    def counts(self) -> dict[str, int]:
+        counts: dict[str, int] = defaultdict(int)
+        for m in self.matches:
+            counts[m.kind] += 1
+        return dict(counts)
+
+    def moved(self, old_entries: list[dict], new_entries: list[dict]) -> list[tuple[Match, int, int]]:
+        """Parejas cuyo offset ha cambiado: (match, offset antiguo, offset nuevo)."""
+        out = []
+        for m in self.matches:
+            old_off = old_entries[m.old].get("offset")
+            new_off = new_entries[m.new].get("offset")
+            if old_off != new_off:
+                out.append((m, old_off, new_off))
+        return out
+
+
+def _exact(old_keys: list[str], new_keys: list[str]) -> list[Match]:
+    # Los textos repetidos ("...", "¿Sí?") se emparejan en orden de aparición
+    queues: dict[str, deque[int]] = defaultdict(deque)
+    for i, key in enumerate(old_keys):
+        queues[key].append(i)
+    matches = []
+    for j, key in enumerate(new_keys):
+        queue = queues.get(key)
+        if queue:
+            matches.append(Match(queue.popleft(), j, "exact", 1.0))
+    return matches
+
+
+def _near(old_keys: list[str], new_keys: list[str],
+          old_free: list[int], new_free: list[int], threshold: float) -> list[Match]:
+    if not old_free or not new_free:
+        return []
+    cache: dict[int, tuple[int, ...]] = {}
+    old_grams = {i: _grams(old_keys[i]) for i in old_free}
+    buckets: dict[tuple, list[int]] = defaultdict(list)
+    for i, grams in old_grams.items():
+        sig = _signature(grams, cache)
+        for band in range(BANDS):
+            buckets[(band, sig[band * ROWS:(band + 1) * ROWS])].append(i)
+
+    scored = []
+    for j in new_free:
+        grams = _grams(new_keys[j])
+        sig = _signature(grams, cache)
+        candidates = set()
+        for band in range(BANDS):
+            candidates.update(buckets.get((band, sig[band * ROWS:(band + 1) * ROWS]), ()))
+        # Jaccard <= menor/mayor tamaño: descarta sin intersecar
+        size = len(grams)
+        low, high = size * threshold, size / threshold
+        for i in candidates:
+            other = old_grams[i]
+            if not low <= len(other) <= high:
+                continue
+            inter = len(other & grams)
+            score = inter / (size + len(other) - inter)
+            if score >= threshold:
+                scored.append((score, -abs(i - j), i, j))
+
+    # Emparejamiento voraz por puntuación (y cercanía en la lista en caso de empate)
+    scored.sort(reverse=True)
+    used_old, used_new, matches = set(), set(), []
+    for score, _dist, i, j in scored:
+        if i in used_old or j in used_new:
+            continue
+        used_old.add(i)
+        used_new.add(j)
+        matches.append(Match(i, j, "near", score))
+    return matches
+
+
+def _align_gap(old_keys: list[str], new_keys: list[str],
+               old_gap: list[int], new_gap: list[int], threshold: float) -> list[Match]:
+    """Needleman-Wunsch sobre un hueco entre anclas; los saltos no puntúan."""
+    n, m = len(old_gap), len(new_gap)
+    if not n or not m or n * m > MAX_GAP * MAX_GAP:
+        return []
+    sim = [[0.0] * m for _ in range(n)]
+    # difflib indexa seq2: cada texto nuevo se indexa una sola vez
+    matcher = SequenceMatcher(None, autojunk=False)
+    for b, j in enumerate(new_gap):
+        matcher.set_seq2(new_keys[j])
+        for a, i in enumerate(old_gap):
+            matcher.set_seq1(old_keys[i])
+            if matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold:
+                sim[a][b] = matcher.ratio()
+    score = [[0.0] * (m + 1) for _ in range(n + 1)]
+    for a in range(1, n + 1):
+        row, prev, s = score[a], score[a - 1], sim[a - 1]
+        for b in range(1, m + 1):
+            diag = prev[b - 1] + s[b - 1] if s[b - 1] >= threshold else -1.0
+            row[b] = max(diag, prev[b], row[b - 1])
+    matches = []
+    a, b = n, m
+    while a and b:
+        s = sim[a - 1][b - 1]
+        if s >= threshold and score[a][b] == score[a - 1][b - 1] + s:
+            matches.append(Match(old_gap[a - 1], new_gap[b - 1], "sequence", s))
+            a, b = a - 1, b - 1
+        elif score[a][b] == score[a - 1][b]:
+            a -= 1
+        else:
+            b -= 1
+    return matches
+
+
+def _sequence(old_keys: list[str], new_keys: list[str],
+              anchors: list[Match], threshold: float) -> list[Match]:
+    # Solo las anclas monótonas (orden creciente en ambas listas) delimitan huecos
+    chain: list[Match] = []
+    for m in sorted(anchors, key=lambda m: m.new):
+        if not chain or m.old > chain[-1].old:
+            chain.append(m)
+    used_old = {m.old for m in anchors}
+    used_new = {m.new for m in anchors}
+    bounds = [(-1, -1)] + [(m.old, m.new) for m in chain] + [(len(old_keys), len(new_keys))]
+    matches = []
+    for (o0, n0), (o1, n1) in zip(bounds, bounds[1:]):
+        old_gap = [i for i in range(o0 + 1, o1) if i not in used_old]
+        new_gap = [j for j in range(n0 + 1, n1) if j not in used_new]
+        matches.extend(_align_gap(old_keys, new_keys, old_gap, new_gap, threshold))
+    return matches
+
+
+def align(old_entries: list[dict], new_entries: list[dict],
+          key: Callable[[dict], str] = source_text,
+          near_threshold: float = NEAR_THRESHOLD,
+          sequence_threshold: Optional[float] = SEQUENCE_THRESHOLD) -> Alignment:
+    """Empareja `old_entries` con `new_entries` por contenido.
+
+    `sequence_threshold=None` desactiva la fase de alineamiento secuencial.
+    """
+    old_keys = [normalize(key(e)) for e in old_entries]
+    new_keys = [normalize(key(e)) for e in new_entries]
+
+    matches = _exact(old_keys, new_keys)
+    used_old = {m.old for m in matches}
+    used_new = {m.new for m in matches}
+    old_free = [i for i in range(len(old_keys)) if i not in used_old]
+    new_free = [j for j in range(len(new_keys)) if j not in used_new]
+    matches += _near(old_keys, new_keys, old_free, new_free, near_threshold)
+
+    if sequence_threshold is not None:
+        matches += _sequence(old_keys, new_keys, matches, sequence_threshold)
+    return Alignment(matches, len(old_entries), len(new_entries))
+
+
+def report(alignment: Alignment, old_entries: list[dict], new_entries: list[dict],
+           limit: int = 20, out: Callable[[str], None] = print) -> None:
+    """Resumen legible del alineamiento (qué se emparejó y qué se movió)."""
+    counts = alignment.counts()
+    detail = ", ".join(f"{k}:{v}" for k, v in sorted(counts.items()))
+    out(f"Emparejadas {len(alignment.matches)}/{len(new_entries)} entradas ({detail or 'ninguna'})")
+    moved = alignment.moved(old_entries, new_entries)
+    if moved:
+        out(f"  {len(moved)} cadenas han cambiado de offset:")
+        for m, old_off, new_off in moved[:limit]:
+            out(f"    0x{old_off:X} → 0x{new_off:X}  [{m.kind} {m.score:.2f}]  {source_text(new_entries[m.new])[:50]!r}")
+        if len(moved) > limit:
+            out(f"    … y {len(moved) - limit} más")
+    if alignment.unmatched_old:
+        out(f"  {len(alignment.unmatched_old)} entradas antiguas sin pareja")
+    if alignment.unmatched_new:
+        out(f"  {len(alignment.unmatched_new)} entradas nuevas sin traducción previa")
+
+
+def iter_pairs(alignment: Alignment, old_entries: list[dict],
+               new_entries: list[dict]) -> Iterable[tuple[dict, Optional[dict], Optional[Match]]]:
+    """Recorre las entradas nuevas junto con su pareja antigua (o None)."""
+    by_new = alignment.by_new()
+    for j, new in enumerate(new_entries):
+        m = by_new.get(j)
+        yield new, (old_entries[m.old] if m else None), m
@@ -0,0 +1,158 @@
+"""Salud de los backends de traducción: puntuación, disyuntor y reparto.
+
+Cada backend (un endpoint de Google o un proveedor entero) lleva una
+`Health` con sus últimos resultados:
+
+  - tasa de errores y latencia media (EWMA) de la ventana reciente, que dan
+    la puntuación con la que se elige el endpoint más sano;
+  - un disyuntor: tras `FAILURES` errores seguidos, o con más de la mitad de
+    la ventana fallida, el backend se "abre" y no recibe peticiones durante
+    `COOLDOWN` segundos. Pasado ese tiempo admite una sola petición de
+    prueba ("semiabierto"): si sale bien se cierra; si falla vuelve a abrirse
+    con el doble de espera (hasta `MAX_COOLDOWN`).
+
+`EndpointPool` reparte las llamadas entre varios endpoints del mismo
+proveedor: prueba primero el de mejor puntuación y, si falla, el siguiente.
+Cada endpoint conserva su propio cliente HTTP, así que las conexiones
+keep-alive se reutilizan entre frases.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Generic, Optional, TypeVar
+
+WINDOW = 20           # resultados recientes que cuentan para la tasa de errores
+MIN_SAMPLES = 5       # resultados necesarios antes de abrir por tasa de errores
+ERROR_RATE = 0.5
+FAILURES = 3          # errores seguidos que abren el disyuntor
+COOLDOWN = 30.0       # segundos abierto antes de la primera prueba
+MAX_COOLDOWN = 600.0
+EWMA = 0.3            # peso de la última latencia en la media
+
+CLOSED, OPEN, HALF_OPEN = "cerrado", "abierto", "semiabierto"
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class Unavailable(RuntimeError):
+    """Todos los backends tienen el disyuntor abierto."""
+
+    def __init__(self, message: str, retry_in: float):
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+class Health:
+    """Resultados recientes y disyuntor de un backend."""
+
+    def __init__(self, name: str, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.results: deque[bool] = deque(maxlen=WINDOW)
+        self.latency: Optional[float] = None
+        self.consecutive = 0
+        self.state = CLOSED
+        self.cooldown = COOLDOWN
+        self.opened_at = 0.0
+        self.trial = False           # petición de prueba en curso (semiabierto)
+        self.ok = self.failed = self.opened = 0
+
+    @property
+    def error_rate(self) -> float:
+        return self.results.count(False) / len(self.results) if self.results else 0.0
+
+    def score(self) -> float:
+        """Menor es mejor: latencia media penalizada por la tasa de errores."""
+        # Sin mediciones se prueba antes que los conocidos: así se miden todos
+        return (self.latency or 0.0) * (1 + 4 * self.error_rate)
+
+    def retry_in(self) -> float:
+        """Segundos hasta que el backend vuelva a admitir peticiones."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - self.clock())
+
+    def acquire(self) -> bool:
+        """True si se le puede enviar una petición ahora (y la reserva si es de prueba)."""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.trial or self.clock() < self.opened_at + self.cooldown:
+                return False
+            self.state, self.trial = HALF_OPEN, True
+            return True
+
+    def success(self, latency: float) -> None:
+        with self.lock:
+            self.ok += 1
+            self.results.append(True)
+            self.consecutive = 0
+            self.latency = latency if self.latency is None else EWMA * latency + (1 - EWMA) * self.latency
+            if self.state != CLOSED:
+                self.state, self.trial, self.cooldown = CLOSED, False, COOLDOWN
+
+    def failure(self) -> None:
+        with self.lock:
+            self.failed += 1
+            self.results.append(False)
+            self.consecutive += 1
+            if self.state == HALF_OPEN:
+                self._open(min(self.cooldown * 2, MAX_COOLDOWN))
+            elif self.state == CLOSED and (
+                    self.consecutive >= FAILURES
+                    or (len(self.results) >= MIN_SAMPLES and self.error_rate > ERROR_RATE)):
+                self._open(COOLDOWN)
+
+    def _open(self, cooldown: float) -> None:
+        self.state, self.trial = OPEN, False
+        self.cooldown = cooldown
+        self.opened_at = self.clock()
+        self.opened += 1
+
+    def summary(self) -> str:
+        latency = f"{self.latency * 1000:.0f} ms" if self.latency is not None else "-"
+        line = f"{self.name}: {self.ok} bien, {self.failed} fallos, latencia {latency}, disyuntor {self.state}"
+        if self.opened:
+            line += f" (se abrió {self.opened}×)"
+        return line
+
+
+class EndpointPool(Generic[T]):
+    """Varios endpoints equivalentes; cada llamada va al más sano disponible."""
+
+    def __init__(self, endpoints: dict[str, T]):
+        self.endpoints = endpoints
+        self.health = {name: Health(name) for name in endpoints}
+
+    def call(self, fn: Callable[[T], R]) -> R:
+        """Ejecuta `fn(cliente)` en el mejor endpoint; si falla, en el siguiente.
+
+        Relanza el último error si fallan todos los que se han probado, y
+        `Unavailable` si no había ninguno disponible.
+        """
+        error: Optional[BaseException] = None
+        for name in sorted(self.health, key=lambda n: self.health[n].score()):
+            health = self.health[name]
+            if not health.acquire():
+                continue
+            t0 = time.perf_counter()
+            try:
+                result = fn(self.endpoints[name])
+            except Exception as e:
+                health.failure()
+                error = e
+                continue
+            health.success(time.perf_counter() - t0)
+            return result
+        if error is not None:
+            raise error
+        raise Unavailable("todos los endpoints tienen el disyuntor abierto",
+                          min(h.retry_in() for h in self.health.values()))
+
+    def report(self) -> list[str]:
+        return [h.summary() for h in self.health.values()]
@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """Batch apply switch_to_english.py for multiple text blocks."""
 
-from pathlib import Path
 import argparse
 
-from switch_to_english import switch_to_english
+import tools_path
+tools_path.enable()
+
+import instrument
+from rom_image import RomImage
+from switch_to_english import repoint_text, report_counts
 
 # Offsets determinados con dump_text_blocks.py.
 #
@@ -38,6 +42,31 @@ BLOCKS = [
 ]
 
 
+def switch_blocks(data: bytearray | RomImage, blocks: list[dict] = BLOCKS,
+                  overwrite_spanish: bool = False, verbose: bool = True) -> None:
+    """Apply every block switch in place on a single in-memory copy."""
+    for i, block in enumerate(blocks):
+        if verbose:
+            print(
+                f"--- Bloque {i + 1}/{len(blocks)}: "
+                f"ES 0x{block['spanish_offset']:06X} -> EN 0x{block['english_offset']:06X} ---"
+            )
+        with instrument.phase(f"block {i + 1}"):
+            counts = repoint_text(
+                data,
+                spanish_offset=block['spanish_offset'],
+                english_offset=block['english_offset'],
+                search_start=block['search_start'],
+                search_end=block['search_end'],
+                length=block['length'],
+                overwrite_spanish=overwrite_spanish,
+                verbose=verbose,
+            )
+            instrument.count("pointers", sum(v for k, v in counts.items() if k != "overwrite"))
+        if verbose:
+            report_counts(counts)
+
+
 def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(
         description="Batch run switch_to_english.py over several text blocks"
@@ -60,36 +89,18 @@ def main(argv: list[str] | None = None) -> None:
         action="store_true",
         help="Copy English text over the Spanish block for each pass",
     )
+    instrument.add_arguments(parser)
     args = parser.parse_args(argv)
 
-    final_path = Path(args.output_rom)
-    working = args.input_rom
-    temp_files: list[Path] = []
-    for i, block in enumerate(BLOCKS):
-        if i == len(BLOCKS) - 1:
-            out = final_path
-        else:
-            out = final_path.with_suffix(f'.tmp{i}')
-            temp_files.append(out)
-        print(
-            f"--- Bloque {i + 1}/{len(BLOCKS)}: "
-            f"ES 0x{block['spanish_offset']:06X} -> EN 0x{block['english_offset']:06X} ---"
-        )
-        switch_to_english(
-            working,
-            str(out),
-            spanish_offset=block['spanish_offset'],
-            english_offset=block['english_offset'],
-            search_start=block['search_start'],
-            search_end=block['search_end'],
-            length=block['length'],
-            overwrite_spanish=args.overwrite_spanish,
-        )
-        working = str(out)
-
-    for tmp in temp_files:
-        tmp.unlink(missing_ok=True)
-    print(f"ROM final: {final_path}")
+    # Los bloques se aplican en secuencia sobre una unica copia en memoria:
+    # el resultado es el mismo que encadenar switch_to_english.py con
+    # archivos intermedios, pero la ROM se lee y se escribe una sola vez.
+    with instrument.session(args, "batch_switch_to_english"):
+        with RomImage.open(args.input_rom) as data:
+            switch_blocks(data, BLOCKS, overwrite_spanish=args.overwrite_spanish)
+            with instrument.phase("write ROM"):
+                instrument.add_written(data.write_to(args.output_rom))
+    print(f"ROM final: {args.output_rom}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Mide el rendimiento de las rutas calientes del toolchain sobre una ROM sintética.
+
+Cada caso ejecuta una de las funciones que más trabajo hacen al construir o
+traducir la ROM (comparar ROMs, extraer y codificar cadenas, reapuntar el
+texto, buscar bloques, formatear y truncar) sobre una ROM de synth_rom.py,
+así que no hace falta ninguna ROM con copyright.
+
+Para cada caso se mide:
+  - el tiempo de la mejor de `--repeat` ejecuciones y el rendimiento que
+    supone (MB/s sobre la ROM o cadenas/s);
+  - el pico de memoria de una ejecución aparte con tracemalloc (medir la
+    memoria ralentiza mucho el código, por eso no se mezcla con el tiempo).
+
+Con `--save` se guardan los resultados (con el commit y la versión de Python)
+en un JSON; con `--baseline` se comparan con uno anterior y el script sale con
+código 1 si algún caso es más lento o usa más memoria de lo tolerado.
+
+Uso:
+    python translation-tools/bench.py
+    python translation-tools/bench.py --save .cache/bench/base.json
+    python translation-tools/bench.py --baseline .cache/bench/base.json --tolerance 0.25
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+import tools_path
+tools_path.enable()
+
+import dump_text_blocks
+import switch_to_english
+import synth_rom
+import text_fit
+import text_format
+import translate_spanish
+import traysia_rom_analyzer
+
+ENCODING = "latin-1"
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.20
+
+# Un caso devuelve (función sin argumentos, unidades procesadas, nombre de la unidad)
+Case = tuple[Callable[[], object], int, str]
+
+
+class Fixture:
+    """ROM sintética y datos derivados, compartidos por todos los casos."""
+
+    def __init__(self, size: int, seed: int, workdir: Path):
+        self.rom = bytes(synth_rom.make_rom(size, seed))
+        self.workdir = workdir
+        self.strings = [s for start, end in translate_spanish.BLOCKS
+                        for s in translate_spanish.extract_strings(self.rom, start, end, ENCODING)]
+        self.texts = [s["text"] for s in self.strings]
+        self.chunks = [self.rom[s["offset"]:s["offset"] + s["length"] - 1] for s in self.strings]
+        rng = random.Random(seed)
+        # "Traducciones": mismas palabras desordenadas y sin los '@'
+        self.pairs = []
+        for text in self.texts:
+            words = text.replace("@", " ").split()
+            rng.shuffle(words)
+            self.pairs.append((text, " ".join(words)))
+
+
+def case_compare_roms(fx: Fixture) -> Case:
+    a, b = fx.workdir / "a.bin", fx.workdir / "b.bin"
+    patched = bytearray(fx.rom)
+    for off in range(0x100000, 0x100000 + 4096, 4):
+        patched[off] ^= 0xFF
+    a.write_bytes(fx.rom)
+    b.write_bytes(patched)
+    return (lambda: traysia_rom_analyzer.compare_roms(a, b)), len(fx.rom), "B"
+
+
+def case_extract_strings(fx: Fixture) -> Case:
+    total = sum(end - start for start, end in translate_spanish.BLOCKS)
+    return (lambda: [translate_spanish.extract_strings(fx.rom, start, end, ENCODING)
+                     for start, end in translate_spanish.BLOCKS]), total, "B"
+
+
+def case_decode_custom(fx: Fixture) -> Case:
+    return (lambda: [translate_spanish.decode_custom(c, ENCODING) for c in fx.chunks]), len(fx.chunks), "str"
+
+
+def case_encode_custom(fx: Fixture) -> Case:
+    return (lambda: [translate_spanish.encode_custom(t, ENCODING) for t in fx.texts]), len(fx.texts), "str"
+
+
+def case_repoint_text(fx: Fixture) -> Case:
+    def run() -> dict:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return switch_to_english.repoint_text(bytearray(fx.rom), verbose=False)
+    return run, len(fx.rom), "B"
+
+
+def case_scan_blocks(fx: Fixture) -> Case:
+    return (lambda: list(dump_text_blocks.scan_blocks(fx.rom, dump_text_blocks.DEFAULT_MIN_LEN, True))), \
+        len(fx.rom), "B"
+
+
+def case_apply_formatting(fx: Fixture) -> Case:
+    def run() -> list:
+        # Sin la cache de maquetación de frases de run anteriores
+        text_format._source_layout.cache_clear()
+        return [text_format.apply_formatting(es, de) for es, de in fx.pairs]
+    return run, len(fx.pairs), "str"
+
+
+def case_truncate(fx: Fixture) -> Case:
+    limits = [max(2, len(t) // 2) for t in fx.texts]
+    return (lambda: [text_fit.truncate(t, n, ENCODING, True) for t, n in zip(fx.texts, limits)]), \
+        len(fx.texts), "str"
+
+
+CASES: dict[str, Callable[[Fixture], Case]] = {
+    "compare_roms": case_compare_roms,
+    "extract_strings": case_extract_strings,
+    "decode_custom": case_decode_custom,
+    "encode_custom": case_encode_custom,
+    "repoint_text": case_repoint_text,
+    "scan_blocks": case_scan_blocks,
+    "apply_formatting": case_apply_formatting,
+    "truncate": case_truncate,
+}
+
+
+def measure(fn: Callable[[], object], repeat: int) -> tuple[float, int]:
+    """(mejor tiempo en segundos, pico de memoria en bytes) de `fn`."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def _rate(units: int, unit: str, seconds: float) -> str:
+    if unit == "B":
+        return f"{units / seconds / (1 << 20):9.1f} MB/s"
+    return f"{units / seconds:9.0f} {unit}/s"
+
+
+def _commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def regressions(results: dict, baseline: dict, tolerance: float, mem_tolerance: float) -> list[str]:
+    """Casos más lentos o con más memoria que en `baseline`, más allá de la tolerancia."""
+    found = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if res["seconds"] > base["seconds"] * (1 + tolerance):
+            found.append(f"{name}: {base['seconds'] * 1000:.1f} ms → {res['seconds'] * 1000:.1f} ms")
+        if res["peak_bytes"] > base["peak_bytes"] * (1 + mem_tolerance):
+            found.append(f"{name}: pico {base['peak_bytes'] >> 10} KiB → {res['peak_bytes'] >> 10} KiB")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del toolchain sobre una ROM sintética")
+    parser.add_argument("--only", action="append", choices=sorted(CASES), help="medir solo estos casos (repetible)")
+    parser.add_argument("--size", type=int, choices=(2, 4), default=2, help="tamaño de la ROM en MB")
+    parser.add_argument("--seed", type=int, default=0, help="semilla de la ROM sintética")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"ejecuciones por caso; se queda la más rápida (por defecto: {DEFAULT_REPEAT})")
+    parser.add_argument("--save", help="guardar los resultados en este JSON")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"empeoramiento de tiempo tolerado (por defecto: {DEFAULT_TOLERANCE * 100:.0f} %%)")
+    parser.add_argument("--mem-tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="aumento del pico de memoria tolerado")
+    args = parser.parse_args()
+
+    names = args.only or list(CASES)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        fx = Fixture(args.size * synth_rom.MB, args.seed, Path(tmp))
+        print(f"ROM sintética de {args.size} MB (semilla {args.seed}), {len(fx.texts)} cadenas\n")
+        for name in names:
+            fn, units, unit = CASES[name](fx)
+            seconds, peak = measure(fn, max(1, args.repeat))
+            results[name] = {"seconds": seconds, "units": units, "unit": unit, "peak_bytes": peak}
+            print(f"  {name:<18} {seconds * 1000:9.2f} ms  {_rate(units, unit, seconds)}"
+                  f"  pico {peak >> 10:>7} KiB")
+
+    if args.save:
+        record = {"commit": _commit(), "python": platform.python_version(),
+                  "size": args.size, "seed": args.seed, "results": results}
+        path = Path(args.save)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(record, indent=2), "utf-8")
+        print(f"\n✔ Resultados → {path}")
+
+    if args.baseline:
+        base = json.loads(Path(args.baseline).read_text("utf-8"))
+        if (base.get("size"), base.get("seed")) != (args.size, args.seed):
+            print("Aviso: la referencia se midió con otra ROM sintética (--size/--seed)")
+        found = regressions(results, base["results"], args.tolerance, args.mem_tolerance)
+        if found:
+            print(f"\n❌ {len(found)} regresiones respecto a {args.baseline} (commit {base.get('commit')}):")
+            for line in found:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✓ Sin regresiones respecto a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
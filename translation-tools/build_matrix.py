@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Construye en paralelo todas las variantes de release (idioma × parche).
+
+Para cada idioma se generan dos ROMs, con y sin el parche Anticrash SRAM, más
+su IPS respecto a la ROM original y un manifiesto JSON con los hashes de todo
+lo generado. Los pasos se ejecutan con la cache de build_rom.py, por lo que una
+segunda ejecución solo repite lo que haya cambiado.
+
+La ROM original se lee una sola vez en el proceso principal (para calcular su
+hash); los procesos de trabajo la mapean en memoria en modo solo lectura, de
+modo que todos comparten las mismas páginas sin volver a copiarla.
+
+Cada idioma se describe como CODIGO=ORIGEN, donde ORIGEN es:
+    base    la ROM original sin cambios de idioma (castellano)
+    switch  re-apuntado al texto inglés de la ROM (batch_switch_to_english)
+    JSON    ruta a un JSON de traducción (translate_spanish import)
+
+Uso:
+    python translation-tools/build_matrix.py "roms/Traysia (W).bin" -o build/ \\
+        --lang es=base --lang en=switch --lang de=translations/german.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+from build_rom import DEFAULT_CACHE_DIR, Build, BuildCache, plan_steps, sha1
+
+DEFAULT_LANGS = ["es=base", "en=switch", "de=translations/german.json"]
+
+# ROM original mapeada en cada proceso de trabajo (ver _init_worker)
+_BASE: memoryview | None = None
+_BASE_DIGEST: str | None = None
+
+
+def parse_lang(spec: str) -> tuple[str, str]:
+    code, sep, source = spec.partition("=")
+    if not sep or not code or not source:
+        raise argparse.ArgumentTypeError(f"idioma no valido: {spec!r} (usa CODIGO=base|switch|JSON)")
+    return code, source
+
+
+def _init_worker(rom_path: str, digest: str) -> None:
+    global _BASE, _BASE_DIGEST
+    with open(rom_path, "rb") as fh:
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    _BASE = memoryview(mapped)
+    _BASE_DIGEST = digest
+
+
+def _file_info(path: Path) -> dict:
+    data = path.read_bytes()
+    return {
+        "path": path.as_posix(),
+        "size": len(data),
+        "md5": hashlib.md5(data).hexdigest(),
+        "sha1": sha1(data),
+    }
+
+
+def build_language(code: str, source: str, stem: str, out_dir: str,
+                   cache_dir: str, encoding: str, translit: bool,
+                   overwrite_spanish: bool) -> list[dict]:
+    """Construye las variantes sin y con parche de un idioma.
+
+    Se hacen en el mismo proceso para que la variante con parche reutilice el
+    paso de idioma que acaba de calcular la otra.
+    """
+    cache = BuildCache(cache_dir)
+    results = []
+    for patched in (False, True):
+        name = f"{code}_anticrash" if patched else code
+        steps = plan_steps(
+            english=source == "switch",
+            overwrite_spanish=overwrite_spanish,
+            translation=None if source in ("base", "switch") else source,
+            encoding=encoding,
+            translit=translit,
+            patch=patched,
+        )
+        build = Build(cache, _BASE, _BASE_DIGEST)
+        for step in steps:
+            build.run(step)
+        rom_path = Path(out_dir) / f"{stem} ({name}).bin"
+        build.save(rom_path)
+        entry = {"variant": name, "lang": code, "anticrash": patched,
+                 "rom": _file_info(rom_path)}
+        if steps:
+            ips_path = rom_path.with_suffix(".ips")
+            ips_path.write_bytes(build.ips())
+            entry["ips"] = _file_info(ips_path)
+        entry["steps"] = [{"step": n, "cached": hit} for n, hit in build.log]
+        results.append(entry)
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Construye todas las variantes idioma × parche en paralelo"
+    )
+    parser.add_argument("input_rom", nargs="?", default="roms/Traysia (W).bin",
+                        help="ROM original de Shinyuden")
+    parser.add_argument("-o", "--output-dir", default="build",
+                        help="Directorio de salida (por defecto: build/)")
+    parser.add_argument("--lang", action="append", type=parse_lang, metavar="CODIGO=ORIGEN",
+                        help=f"Idioma a construir; repetible (por defecto: {' '.join(DEFAULT_LANGS)})")
+    parser.add_argument("--overwrite-spanish", action="store_true",
+                        help="En los idiomas 'switch', copia también el texto inglés sobre el castellano")
+    parser.add_argument("--encoding", default="latin-1", help="Codificacion del texto")
+    parser.add_argument("--no-translit", action="store_true",
+                        help="No transliterar caracteres alemanes al importar")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Procesos en paralelo (por defecto: todos los núcleos)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Directorio de la cache (por defecto: {DEFAULT_CACHE_DIR})")
+    args = parser.parse_args(argv)
+
+    langs = args.lang or [parse_lang(s) for s in DEFAULT_LANGS]
+    for code, source in langs:
+        if source not in ("base", "switch") and not Path(source).exists():
+            raise SystemExit(f"❌ No se encuentra {source} (idioma '{code}')")
+
+    rom_path = Path(args.input_rom)
+    base = rom_path.read_bytes()
+    digest = sha1(base)
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(langs))),
+                             initializer=_init_worker,
+                             initargs=(str(rom_path), digest)) as pool:
+        futures = [
+            pool.submit(build_language, code, source, rom_path.stem, str(out_dir),
+                        args.cache_dir, args.encoding, not args.no_translit,
+                        args.overwrite_spanish)
+            for code, source in langs
+        ]
+        variants = []
+        for (code, _source), future in zip(langs, futures):
+            try:
+                variants.extend(future.result())
+            except ValueError as exc:
+                raise SystemExit(f"❌ Idioma '{code}': {exc}")
+
+    manifest = {
+        "base": {
+            "path": rom_path.as_posix(),
+            "size": len(base),
+            "md5": hashlib.md5(base).hexdigest(),
+            "sha1": digest,
+        },
+        "variants": variants,
+    }
+    manifest_path = out_dir / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), "utf-8")
+
+    for v in variants:
+        ran = sum(1 for s in v["steps"] if not s["cached"])
+        print(f"  {v['variant']:<14} {v['rom']['md5']}  ({ran} pasos ejecutados)")
+    print(f"✔ {len(variants)} variantes → {out_dir} (manifiesto: {manifest_path})")
+
+
+if __name__ == "__main__":
+    main()
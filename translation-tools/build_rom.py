@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""Construye ROMs de release encadenando el toolchain con una cache local.
+
+Una ROM de release es el resultado de aplicar sobre la ROM original una
+secuencia de pasos puros ROM -> ROM: cambio a inglés (batch_switch_to_english),
+importación de una traducción (translate_spanish import) y parche Anticrash
+SRAM, más el IPS final respecto a la original.
+
+Cada paso se identifica por el hash de su ROM de entrada, sus parámetros
+(BLOCKS, PATCHES, digest del JSON...) y la versión de las herramientas que lo
+implementan (hash de su código fuente). Los resultados se guardan en una cache
+direccionada por contenido (`.cache/rom-build/`), de modo que un paso cuyas
+entradas no han cambiado no se vuelve a ejecutar, y ni siquiera se lee su ROM
+de entrada si el paso siguiente también está en cache.
+
+Uso:
+    python translation-tools/build_rom.py "roms/Traysia (W).bin" -o "roms/Traysia (DE).bin" \\
+        --translation translations/german.json --anticrash --ips "roms/Traysia (DE).ips"
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+import tools_path
+tools_path.enable()
+
+import batch_switch_to_english
+import fix_rom_traysia_shinyuden_anticrash as anticrash
+import instrument
+import rom_import
+import switch_to_english
+import translate_spanish
+import translation_io
+
+# Se incrementa si cambia el formato de las claves o de la cache
+BUILD_VERSION = 1
+
+DEFAULT_CACHE_DIR = ".cache/rom-build"
+
+
+def sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def tool_digest(*modules) -> str:
+    """Version de un paso: hash del código fuente de los módulos que lo implementan."""
+    h = hashlib.sha1(f"build-v{BUILD_VERSION}".encode())
+    for module in modules:
+        h.update(Path(module.__file__).read_bytes())
+    return h.hexdigest()
+
+
+# ──────────────────────────────  Cache  ──────────────────────────────────────
+class BuildCache:
+    """Almacén direccionado por contenido: objects/<sha1> y steps/<clave>."""
+
+    def __init__(self, root: Path | str = DEFAULT_CACHE_DIR):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.steps = self.root / "steps"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Digest del resultado de un paso ya ejecutado, si sigue en la cache."""
+        try:
+            digest = (self.steps / key).read_text("ascii").strip()
+        except FileNotFoundError:
+            return None
+        return digest if self._object_path(digest).exists() else None
+
+    def load(self, digest: str) -> bytes:
+        return self._object_path(digest).read_bytes()
+
+    def store(self, key: str, data: bytes) -> str:
+        digest = sha1(data)
+        target = self._object_path(digest)
+        if not target.exists():
+            _atomic_write(target, data)
+        _atomic_write(self.steps / key, digest.encode("ascii"))
+        return digest
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    # Escritura atómica: varios procesos pueden compartir la misma cache
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+# ──────────────────────────────  Pasos  ──────────────────────────────────────
+class Step:
+    """Paso puro ROM -> ROM identificado por nombre, parámetros y código."""
+
+    def __init__(self, name: str, params: dict, modules: tuple,
+                 func: Callable[[bytes], bytes]):
+        self.name = name
+        self.params = params
+        self.modules = modules
+        self.func = func
+
+    def key(self, input_digest: str) -> str:
+        ident = {
+            "step": self.name,
+            "input": input_digest,
+            "params": self.params,
+            "tool": tool_digest(*self.modules),
+        }
+        return sha1(json.dumps(ident, sort_keys=True).encode("utf-8"))
+
+
+def anticrash_step() -> Step:
+    def run(data: bytes) -> bytes:
+        return bytes(anticrash.apply_patches(bytearray(data)))
+
+    params = {"patches": [[off, old.hex(), new.hex()] for off, old, new in anticrash.PATCHES]}
+    return Step("anticrash", params, (anticrash,), run)
+
+
+def english_step(overwrite_spanish: bool = False) -> Step:
+    def run(data: bytes) -> bytes:
+        rom = bytearray(data)
+        batch_switch_to_english.switch_blocks(
+            rom, batch_switch_to_english.BLOCKS,
+            overwrite_spanish=overwrite_spanish, verbose=False,
+        )
+        return bytes(rom)
+
+    params = {"blocks": batch_switch_to_english.BLOCKS, "overwrite_spanish": overwrite_spanish}
+    return Step("english", params, (batch_switch_to_english, switch_to_english), run)
+
+
+def import_step(json_path: Path | str, encoding: str = "latin-1",
+                translit: bool = True) -> Step:
+    raw = Path(json_path).read_bytes()
+
+    def run(data: bytes) -> bytes:
+        rom = bytearray(data)
+        previous = translate_spanish.ENABLE_TRANSLIT
+        translate_spanish.ENABLE_TRANSLIT = translit
+        try:
+            plan = rom_import.ImportPlan.from_files([json_path], encoding)
+        finally:
+            translate_spanish.ENABLE_TRANSLIT = previous
+        problems = plan.validate(len(rom))
+        if problems:
+            raise ValueError(f"{len(problems)} problemas en {json_path}:\n"
+                             + "\n".join(f"  {p}" for p in problems))
+        plan.apply(rom)
+        return bytes(rom)
+
+    params = {
+        "json": sha1(raw),
+        "blocks": translate_spanish.BLOCKS,
+        "encoding": encoding,
+        "translit": translit,
+    }
+    return Step("import", params, (translate_spanish, translation_io, rom_import), run)
+
+
+# ──────────────────────────────  Ejecución  ──────────────────────────────────
+class Build:
+    """Estado de una construcción: digest actual y, si ya se leyó, sus bytes."""
+
+    def __init__(self, cache: BuildCache, data: bytes, digest: Optional[str] = None):
+        self.cache = cache
+        self.base_digest = digest or sha1(data)
+        self.base_data = data
+        self.digest = self.base_digest
+        self._data: Optional[bytes] = data
+        self.log: list[tuple[str, bool]] = []
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            self._data = self.cache.load(self.digest)
+        return self._data
+
+    def run(self, step: Step) -> None:
+        key = step.key(self.digest)
+        cached = self.cache.lookup(key)
+        if cached is not None:
+            # No se carga la ROM: el siguiente paso solo necesita su digest
+            self.digest, self._data = cached, None
+            self.log.append((step.name, True))
+            return
+        out = step.func(self.data)
+        self.digest = self.cache.store(key, out)
+        self._data = out
+        self.log.append((step.name, False))
+
+    def ips(self) -> bytes:
+        """IPS de la ROM original a la actual (también cacheado)."""
+        key = sha1(json.dumps({
+            "step": "ips",
+            "base": self.base_digest,
+            "target": self.digest,
+            "tool": tool_digest(anticrash),
+        }, sort_keys=True).encode("utf-8"))
+        cached = self.cache.lookup(key)
+        if cached is not None:
+            self.log.append(("ips", True))
+            return self.cache.load(cached)
+        patch = anticrash.ips_bytes(anticrash.diff_patches(self.base_data, self.data))
+        self.cache.store(key, patch)
+        self.log.append(("ips", False))
+        return patch
+
+    def save(self, output: Path | str) -> bool:
+        """Escribe la ROM actual en `output`; False si ya estaba al día."""
+        output = Path(output)
+        if output.exists() and sha1(output.read_bytes()) == self.digest:
+            return False
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(self.data)
+        return True
+
+
+def plan_steps(english: bool = False, overwrite_spanish: bool = False,
+               translation: Optional[str] = None, encoding: str = "latin-1",
+               translit: bool = True, patch: bool = False) -> list[Step]:
+    """Orden canónico de los pasos: idioma primero y parche al final.
+
+    Así las variantes con y sin parche comparten en la cache el paso de idioma.
+    """
+    steps = []
+    if english:
+        steps.append(english_step(overwrite_spanish))
+    if translation:
+        steps.append(import_step(translation, encoding, translit))
+    if patch:
+        steps.append(anticrash_step())
+    return steps
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Construye una ROM de Traysia encadenando los pasos con cache"
+    )
+    parser.add_argument("input_rom", nargs="?", default="roms/Traysia (W).bin",
+                        help="ROM original de Shinyuden")
+    parser.add_argument("-o", "--output", dest="output_rom", required=True,
+                        help="ROM resultante")
+    parser.add_argument("--english", action="store_true",
+                        help="Aplica batch_switch_to_english (re-apuntado al texto inglés)")
+    parser.add_argument("--overwrite-spanish", action="store_true",
+                        help="Con --english, copia además el texto inglés sobre el castellano")
+    parser.add_argument("--translation", metavar="JSON",
+                        help="Importa un JSON de traducción (translate_spanish import)")
+    parser.add_argument("--encoding", default="latin-1", help="Codificacion del texto")
+    parser.add_argument("--no-translit", action="store_true",
+                        help="No transliterar caracteres alemanes al importar")
+    parser.add_argument("--anticrash", action="store_true",
+                        help="Aplica el parche Anticrash SRAM")
+    parser.add_argument("--ips", metavar="PATH",
+                        help="Genera también el IPS respecto a la ROM original")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Directorio de la cache (por defecto: {DEFAULT_CACHE_DIR})")
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.english and args.translation:
+        parser.error("--english y --translation son excluyentes")
+
+    steps = plan_steps(
+        english=args.english,
+        overwrite_spanish=args.overwrite_spanish,
+        translation=args.translation,
+        encoding=args.encoding,
+        translit=not args.no_translit,
+        patch=args.anticrash,
+    )
+    with instrument.session(args, "build_rom"):
+        cache = BuildCache(args.cache_dir)
+        build = Build(cache, instrument.read_bytes(args.input_rom))
+        try:
+            for step in steps:
+                with instrument.phase(step.name):
+                    build.run(step)
+                instrument.count("cache" if build.log[-1][1] else "ejecutados")
+        except ValueError as exc:
+            raise SystemExit(f"❌ Paso '{step.name}': {exc}")
+
+        with instrument.phase("guardar"):
+            written = build.save(args.output_rom)
+            if written:
+                instrument.add_written(args.output_rom)
+        if args.ips:
+            ips_path = Path(args.ips)
+            ips_path.parent.mkdir(parents=True, exist_ok=True)
+            with instrument.phase("ips"):
+                instrument.write_bytes(ips_path, build.ips())
+
+        for name, hit in build.log:
+            print(f"  {name:<10} {'cache' if hit else 'ejecutado'}")
+        state = "guardada" if written else "sin cambios"
+        print(f"✔ ROM {state}: {args.output_rom} (sha1 {build.digest})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Analiza cuánto espacio liberaría comprimir los bloques de texto de la ROM.
+
+El guion se guarda como cadenas null-terminated sin comprimir (BLOCKS de
+translate_spanish.py); los idiomas más largos solo caben recortando. Este
+script mide tres técnicas clásicas sobre todas las cadenas de los bloques:
+
+  - DTE (dual tile encoding): cada código libre sustituye a una pareja de
+    símbolos frecuente. Tabla: 2 bytes por código.
+  - MTE (multiple tile encoding): cada código sustituye a una subcadena de
+    hasta `--max-len` símbolos (palabras, finales de palabra...). Tabla: la
+    subcadena más su terminador.
+  - Huffman: códigos de longitud variable por frecuencia de símbolo, sobre el
+    texto original y sobre el resultado de MTE.
+
+Los candidatos de MTE salen de un array de sufijos del guion (truncado a
+`--max-len` símbolos) y de sus intervalos LCP: cada intervalo es una
+subcadena repetida con su número de apariciones. La tabla se elige de forma
+voraz por ahorro neto, con evaluación perezosa: el ahorro de un candidato
+solo puede bajar al sustituir otros, así que basta con recalcular el que
+encabeza la cola. Las parejas 0x81+letra (tildes) son un único símbolo y
+nunca se parten.
+
+Con `--emit DIR` (experimental) se escriben los bloques comprimidos y la
+tabla, y se comprueba que se descomprimen igual que el original.
+
+Uso:
+    python translation-tools/compress_text.py "roms/Traysia (W).bin"
+    python translation-tools/compress_text.py "roms/Traysia (W).bin" --mode mte --emit build/compressed
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Optional
+
+from translate_spanish import BLOCKS, decode_custom
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+PREFIX = 0x81
+# Las parejas 0x81+XX se representan como un solo carácter PAIR_BASE+XX
+PAIR_BASE = 0x8100
+SEP = "\x00"
+DEFAULT_MAX_LEN = 12
+MAX_CANDIDATES = 4000
+
+
+# ─────────────────────────────  Símbolos  ────────────────────────────────────
+def to_symbols(raw: bytes) -> str:
+    out, i = [], 0
+    while i < len(raw):
+        if raw[i] == PREFIX and i + 1 < len(raw):
+            out.append(chr(PAIR_BASE + raw[i + 1]))
+            i += 2
+        else:
+            out.append(chr(raw[i]))
+            i += 1
+    return "".join(out)
+
+
+def to_bytes(symbols: str) -> bytes:
+    out = bytearray()
+    for ch in symbols:
+        code = ord(ch)
+        if code >= PAIR_BASE:
+            out += bytes((PREFIX, code - PAIR_BASE))
+        else:
+            out.append(code)
+    return bytes(out)
+
+
+def byte_len(symbols: str) -> int:
+    return len(symbols) + sum(1 for ch in symbols if ord(ch) >= PAIR_BASE)
+
+
+def block_strings(data: bytes, start: int, end: int) -> list[bytes]:
+    """Cadenas del bloque, sin su terminador (mismo recorrido que export)."""
+    out, pos = [], start
+    while pos < end:
+        term = data.find(b"\x00", pos, end)
+        if term == -1:
+            break
+        if term > pos:
+            out.append(data[pos:term])
+        pos = term + 1
+    return out
+
+
+def free_codes(corpus: Iterable[bytes], allowed: range) -> list[int]:
+    """Bytes de `allowed` que no aparecen en el texto (ni como segundo byte de 0x81XX)."""
+    used = set()
+    for raw in corpus:
+        used.update(raw)
+    return [c for c in allowed if c not in used and c not in (0x00, PREFIX)]
+
+
+# ──────────────────────────  Array de sufijos  ───────────────────────────────
+def repeated_substrings(text: str, max_len: int, min_len: int = 2) -> list[tuple[str, int]]:
+    """Subcadenas repetidas (sin separadores) con su número de apariciones.
+
+    Array de sufijos truncado a `max_len` símbolos + LCP; cada intervalo LCP
+    aporta su subcadena más larga (a igual número de apariciones, la más
+    larga es la que más ahorra).
+    """
+    n = len(text)
+    sa = sorted(range(n), key=lambda i: text[i:i + max_len])
+    lcp = [0] * n
+    for k in range(1, n):
+        a, b = sa[k - 1], sa[k]
+        limit = min(max_len, n - a, n - b)
+        length = 0
+        while length < limit and text[a + length] == text[b + length] and text[a + length] != SEP:
+            length += 1
+        lcp[k] = length
+    out = []
+    # Intervalos LCP con una pila: (lcp, inicio del intervalo)
+    stack: list[tuple[int, int]] = []
+    for k in range(1, n + 1):
+        cur = lcp[k] if k < n else 0
+        start = k - 1
+        while stack and stack[-1][0] > cur:
+            depth, start = stack.pop()
+            if depth >= min_len:
+                pos = sa[start]
+                out.append((text[pos:pos + depth], k - start))
+        if not stack or stack[-1][0] < cur:
+            stack.append((cur, start))
+    return out
+
+
+# ──────────────────────────  Selección voraz  ────────────────────────────────
+def _gain(sub: str, count: int, entry_cost: int) -> int:
+    return count * (byte_len(sub) - 1) - entry_cost
+
+
+def choose_table(text: str, candidates: Iterable[str], codes: list[int],
+                 entry_cost) -> tuple[str, list[tuple[int, str]]]:
+    """Elige subcadenas por ahorro neto y las sustituye; devuelve (texto, tabla).
+
+    `entry_cost(sub)` es lo que ocupa la entrada de la tabla. Evaluación
+    perezosa: en la cola están las cotas superiores del ahorro (las
+    apariciones de un candidato nunca aumentan al sustituir otro).
+    """
+    heap = []
+    for sub in set(candidates):
+        gain = _gain(sub, text.count(sub), entry_cost(sub))
+        if gain > 0:
+            heap.append((-gain, sub))
+    heapq.heapify(heap)
+    table = []
+    free = list(codes)
+    while heap and free:
+        _bound, sub = heapq.heappop(heap)
+        gain = _gain(sub, text.count(sub), entry_cost(sub))
+        if gain <= 0:
+            continue
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, sub))    # ya no es el mejor: reevaluar luego
+            continue
+        code = free.pop(0)
+        text = text.replace(sub, chr(code))
+        table.append((code, sub))
+    return text, table
+
+
+def dte(text: str, codes: list[int]) -> tuple[str, list[tuple[int, str]]]:
+    pairs = Counter(text[i:i + 2] for i in range(len(text) - 1))
+    candidates = [p for p in pairs if SEP not in p]
+    return choose_table(text, candidates, codes, lambda sub: 2)
+
+
+def mte(text: str, codes: list[int], max_len: int) -> tuple[str, list[tuple[int, str]]]:
+    subs = repeated_substrings(text, max_len)
+    # Los más prometedores según el recuento con solapes del array de sufijos
+    subs.sort(key=lambda sc: _gain(sc[0], sc[1], byte_len(sc[0]) + 1), reverse=True)
+    candidates = [s for s, _c in subs[:MAX_CANDIDATES]]
+    return choose_table(text, candidates, codes, lambda sub: byte_len(sub) + 1)
+
+
+def huffman_bits(text: str) -> tuple[int, int]:
+    """(bits del texto codificado, número de símbolos distintos)."""
+    freq = Counter(text)
+    if len(freq) < 2:
+        return len(text), len(freq)
+    lengths = [0] * len(freq)
+    # Cada nodo guarda la lista de hojas que cuelgan de él
+    heap = [(f, i, [i]) for i, f in enumerate(freq.values())]
+    heapq.heapify(heap)
+    tie = len(heap)
+    while len(heap) > 1:
+        fa, _ia, la = heapq.heappop(heap)
+        fb, _ib, lb = heapq.heappop(heap)
+        for leaf in la + lb:
+            lengths[leaf] += 1
+        heapq.heappush(heap, (fa + fb, tie, la + lb))
+        tie += 1
+    return sum(f * l for f, l in zip(freq.values(), lengths)), len(freq)
+
+
+def huffman_bytes(text: str) -> int:
+    bits, symbols = huffman_bits(text)
+    # Árbol: ~2 bytes por símbolo (hoja + nodo interno) en la ROM
+    return -(-bits // 8) + 2 * symbols
+
+
+# ─────────────────────────────  Informe  ─────────────────────────────────────
+def decode(symbols: str, table: dict[int, str]) -> str:
+    return "".join(table.get(ord(ch), ch) for ch in symbols)
+
+
+def analyze(data: bytes, blocks: list[tuple[int, int]], codes: range,
+            max_len: int, modes: list[str]) -> dict:
+    strings = {blk: block_strings(data, *blk) for blk in blocks}
+    corpus = [raw for raws in strings.values() for raw in raws]
+    available = free_codes(corpus, codes)
+    text = SEP.join(to_symbols(raw) for raw in corpus) + SEP
+    original = byte_len(text)
+
+    results = {"original": original, "strings": len(corpus),
+               "free_codes": len(available), "modes": {}}
+    for mode in modes:
+        if mode == "huffman":
+            results["modes"][mode] = {"size": huffman_bytes(text), "table": 0, "codes": 0}
+            continue
+        packed, table = dte(text, available) if mode == "dte" else mte(text, available, max_len)
+        table_cost = sum(2 if mode == "dte" else byte_len(s) + 1 for _c, s in table)
+        lookup = dict(table)
+        # No es un assert: con python -O se escribiría una tabla errónea sin avisar
+        if decode(packed, lookup) != text:
+            raise ValueError(f"la tabla {mode} no reproduce el texto original")
+        results["modes"][mode] = {"size": byte_len(packed), "table": table_cost,
+                                  "codes": len(table), "packed": packed, "lookup": table}
+        if mode == "mte":
+            results["modes"]["mte+huffman"] = {"size": huffman_bytes(packed), "table": table_cost,
+                                               "codes": len(table)}
+    results["blocks"] = strings
+    return results
+
+
+def report(results: dict) -> None:
+    original = results["original"]
+    print(f"Texto: {results['strings']} cadenas, {original} bytes (con terminadores); "
+          f"{results['free_codes']} códigos libres")
+    print(f"  {'técnica':<12} {'texto':>9} {'tabla':>7} {'total':>9} {'ahorro':>9} {'ratio':>7}  códigos")
+    for name, r in results["modes"].items():
+        total = r["size"] + r["table"]
+        print(f"  {name:<12} {r['size']:>9} {r['table']:>7} {total:>9} "
+              f"{original - total:>9} {total / original:>7.1%}  {r['codes']}")
+
+
+def emit(results: dict, mode: str, out_dir: Path) -> None:
+    """Escribe los bloques comprimidos y la tabla (modo experimental)."""
+    r = results["modes"][mode]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    codes = {code: sub for code, sub in r["lookup"]}
+    table_bytes = bytearray()
+    for code, sub in r["lookup"]:
+        table_bytes += to_bytes(sub) + (b"" if mode == "dte" else b"\x00")
+    (out_dir / f"{mode}_table.bin").write_bytes(bytes(table_bytes))
+    (out_dir / f"{mode}_table.json").write_text(json.dumps(
+        {f"0x{code:02X}": decode_custom(to_bytes(sub), "latin-1") for code, sub in codes.items()},
+        ensure_ascii=False, indent=2), "utf-8")
+
+    # Cada bloque se comprime por separado con la tabla común
+    table = r["lookup"]
+    for (start, end), raws in results["blocks"].items():
+        packed = bytearray()
+        for raw in raws:
+            symbols = to_symbols(raw)
+            for code, sub in table:
+                symbols = symbols.replace(sub, chr(code))
+            if to_bytes(decode(symbols, codes)) != raw:
+                raise SystemExit(f"❌ la tabla no reproduce una cadena del bloque 0x{start:06X}: {raw[:40]!r}")
+            packed += to_bytes(symbols) + b"\x00"
+        (out_dir / f"block_{start:06X}.bin").write_bytes(bytes(packed))
+        print(f"  bloque 0x{start:06X}-0x{end:06X}: {end - start} → {len(packed)} bytes "
+              f"({end - start - len(packed)} libres)")
+    print(f"✔ Bloques y tabla ({len(table_bytes)} bytes) → {out_dir}")
+
+
+def _range(value: str) -> range:
+    lo, _, hi = value.partition("-")
+    lo_i = int(lo, 0)
+    return range(lo_i, (int(hi, 0) if hi else lo_i) + 1)
+
+
+def _block(value: str) -> tuple[int, int]:
+    start, end = value.split("-")
+    return int(start, 0), int(end, 0)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Analizador de compresión de los bloques de texto")
+    parser.add_argument("rom", help="ROM con los bloques de texto")
+    parser.add_argument("--block", type=_block, action="append",
+                        help="bloque INICIO-FIN (repetible; por defecto los BLOCKS conocidos)")
+    parser.add_argument("--codes", type=_range, default=range(0x80, 0x100),
+                        help="rango de bytes que pueden usarse como códigos (por defecto: 0x80-0xFF, "
+                             "solo los que no aparecen en el texto)")
+    parser.add_argument("--mode", choices=["dte", "mte", "huffman", "all"], default="all")
+    parser.add_argument("--max-len", type=int, default=DEFAULT_MAX_LEN,
+                        help=f"longitud máxima de una entrada MTE (por defecto: {DEFAULT_MAX_LEN})")
+    parser.add_argument("--emit", metavar="DIR",
+                        help="experimental: escribir los bloques comprimidos y la tabla (dte/mte)")
+    args = parser.parse_args(argv)
+
+    data = Path(args.rom).read_bytes()
+    modes = ["dte", "mte", "huffman"] if args.mode == "all" else [args.mode]
+    try:
+        results = analyze(data, args.block or BLOCKS, args.codes, args.max_len, modes)
+    except ValueError as exc:
+        raise SystemExit(f"❌ {exc}")
+    report(results)
+    if args.emit:
+        mode = args.mode if args.mode in ("dte", "mte") else "mte"
+        if mode not in results["modes"]:
+            raise SystemExit("❌ --emit necesita --mode dte, mte o all")
+        emit(results, mode, Path(args.emit))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import argparse
 import re
-from pathlib import Path
 import sys
 
+import tools_path
+tools_path.enable()
+
+import instrument
+
 DEFAULT_MIN_LEN = 20
 DEFAULT_WIDTH = 60
 
@@ -25,22 +29,30 @@ def scan_blocks(data: bytes, min_len: int, latin1: bool, start: int = 0):
 
 
 def main(path: str, min_len: int, width: int, latin1: bool, start: int):
-    data = Path(path).read_bytes()
+    data = instrument.read_bytes(path)
     encoding = "latin-1" if latin1 else "ascii"
-    for off, length, text in scan_blocks(data, min_len, latin1, start):
-        out = text.replace("\n", " ")
-        if width > 0:
-            out = out[:width]
-        line = f"0x{off:06X}+{length:04X}: {out}\n"
-        sys.stdout.buffer.write(line.encode(encoding, errors="replace"))
+    with instrument.phase("scan"):
+        for off, length, text in scan_blocks(data, min_len, latin1, start):
+            out = text.replace("\n", " ")
+            if width > 0:
+                out = out[:width]
+            line = f"0x{off:06X}+{length:04X}: {out}\n"
+            sys.stdout.buffer.write(line.encode(encoding, errors="replace"))
+            instrument.count("blocks")
 
 
-if __name__ == "__main__":
+def cli(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(description="Dump ASCII text blocks from a ROM")
     parser.add_argument('rom', help='Path to ROM file')
     parser.add_argument('--min-len', type=int, default=DEFAULT_MIN_LEN, help='Minimum block length')
     parser.add_argument('--width', type=int, default=DEFAULT_WIDTH, help='Maximum characters to show per block; use 0 for all')
     parser.add_argument('--latin1', action='store_true', help='Detect extended Latin-1 characters')
     parser.add_argument('--start', type=lambda x: int(x, 0), default=0, help='Start offset for scanning')
-    args = parser.parse_args()
-    main(args.rom, args.min_len, args.width, args.latin1, args.start)
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+    with instrument.session(args, "dump_text_blocks"):
+        main(args.rom, args.min_len, args.width, args.latin1, args.start)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,301 @@
+"""Almacén columnar de entradas de traducción.
+
+Las herramientas cargaban cada archivo como una lista de dicts con las mismas
+claves repetidas en cada entrada (`offset`, `offset_hex`, `length`, `text`...)
+y, para cruzar dos archivos, construían además un dict {offset: entrada}.
+`EntryStore` guarda las mismas entradas por columnas:
+
+  - `offset` y `length` en arrays de enteros; `offset_hex` solo se guarda
+    si no coincide con el offset (si coincide, se regenera al leerlo);
+  - cada clave restante es una lista con el valor de cada fila, con los
+    textos internados (`sys.intern`): el mismo original en varios idiomas,
+    o repetido en el guion, ocupa memoria una sola vez;
+  - qué claves tiene cada fila, y en qué orden, es un índice a una tabla de
+    formas compartidas, así que al guardar sale el mismo archivo que se leyó;
+  - un índice offset → fila da búsquedas O(1) (como un dict, con offsets
+    repetidos gana la última fila).
+
+Los filtros (`where`, `review_rows`, `overflow_rows`) devuelven listas de
+filas y `join` empareja dos almacenes por offset (p.ej. español y alemán) sin
+copiar entradas. `Row` es una vista con `__slots__` que se comporta como el
+dict de la entrada (`row["text"]`, `row.get(...)`, `row.update(...)`), así que
+el código que recibe entradas (align_translations...) acepta filas sin cambios.
+
+    es = EntryStore.load("translations/spanish.json")
+    de = EntryStore.load("translations/german.json")
+    for i, j in de.join(es):
+        if j is not None:
+            de.set(i, "text_source", es.get_value(j, "text"))
+    de.save("translations/german.json")
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from translation_io import iter_entries, save_entries
+
+# Claves con almacenamiento propio; el resto va a columnas genéricas.
+# En los arrays, -1 = la fila no tiene un entero válido (va a la columna)
+_INT_KEYS = ("offset", "length")
+_MISSING = object()
+# null explícito del archivo; None en una columna = "sin guardar" (offset_hex
+# canónico, offset/length en los arrays)
+_NULL = object()
+
+
+def _stored(value: Any) -> Any:
+    if value is None:
+        return _NULL
+    return sys.intern(value) if type(value) is str else value
+
+
+def _loaded(value: Any) -> Any:
+    return None if value is _NULL else value
+
+
+def _is_count(value: Any) -> bool:
+    return type(value) is int and value >= 0
+
+
+class Row(MutableMapping):
+    """Vista de una fila del almacén con la interfaz de un dict."""
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: "EntryStore", index: int):
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self.store.get_value(self.index, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.store.set(self.index, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.store.delete(self.index, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.keys(self.index))
+
+    def __len__(self) -> int:
+        return len(self.store.keys(self.index))
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.store.keys(self.index)
+
+    def to_dict(self) -> dict:
+        return self.store.entry(self.index)
+
+    def __repr__(self) -> str:
+        return f"Row({self.index}, {self.to_dict()!r})"
+
+
+class EntryStore:
+    """Entradas de un archivo de traducción guardadas por columnas."""
+
+    def __init__(self, entries: Iterable[dict] = ()):
+        self.offsets = array("q")
+        self.lengths = array("q")
+        self.columns: dict[str, list] = {}
+        self.shapes: list[tuple[str, ...]] = []
+        self._shape_ids: dict[tuple[str, ...], int] = {}
+        self._shape_of = array("I")
+        self._index: dict[int, int] = {}
+        for entry in entries:
+            self.append(entry)
+
+    @classmethod
+    def load(cls, path: Path | str) -> "EntryStore":
+        """Carga un archivo en streaming: nunca existe la lista de dicts entera."""
+        return cls(iter_entries(path))
+
+    def save(self, path: Path | str) -> bool:
+        return save_entries(path, self.entries())
+
+    def __len__(self) -> int:
+        return len(self._shape_of)
+
+    def __iter__(self) -> Iterator[Row]:
+        return (Row(self, i) for i in range(len(self)))
+
+    def __getitem__(self, index: int) -> Row:
+        if not -len(self) <= index < len(self):
+            raise IndexError("fila fuera del almacén")
+        return Row(self, index % len(self))
+
+    # ───────────────────────────  Formas  ────────────────────────────────────
+    def _shape_id(self, keys: tuple[str, ...]) -> int:
+        sid = self._shape_ids.get(keys)
+        if sid is None:
+            sid = self._shape_ids[keys] = len(self.shapes)
+            self.shapes.append(keys)
+        return sid
+
+    def keys(self, index: int) -> tuple[str, ...]:
+        return self.shapes[self._shape_of[index]]
+
+    def _column(self, key: str) -> list:
+        col = self.columns.get(key)
+        if col is None:
+            col = self.columns[key] = [None] * len(self)
+        return col
+
+    # ───────────────────────────  Escritura  ─────────────────────────────────
+    def append(self, entry: dict) -> int:
+        i = len(self)
+        self._shape_of.append(self._shape_id(tuple(entry)))
+        offset, length = entry.get("offset"), entry.get("length")
+        self.offsets.append(offset if _is_count(offset) else -1)
+        self.lengths.append(length if _is_count(length) else -1)
+        for col in self.columns.values():
+            col.append(None)
+        for key, value in entry.items():
+            if key in _INT_KEYS and _is_count(value):
+                continue
+            if key == "offset_hex" and value == self._hex(i):
+                continue
+            self._column(key)[i] = _stored(value)
+        if _is_count(offset):
+            self._index[offset] = i
+        return i
+
+    def set(self, index: int, key: str, value: Any) -> None:
+        keys = self.keys(index)
+        if key not in keys:
+            self._shape_of[index] = self._shape_id(keys + (key,))
+        if key == "offset":
+            self._pin_hex(index)
+            self._reindex(index, value if _is_count(value) else -1)
+        elif key == "length":
+            self.lengths[index] = value if _is_count(value) else -1
+        if (key in _INT_KEYS and _is_count(value)) or (key == "offset_hex" and value == self._hex(index)):
+            col = self.columns.get(key)
+            if col is not None:
+                col[index] = None
+            return
+        self._column(key)[index] = _stored(value)
+
+    def update(self, index: int, values: dict) -> None:
+        for key, value in values.items():
+            self.set(index, key, value)
+
+    def delete(self, index: int, key: str) -> None:
+        keys = self.keys(index)
+        if key not in keys:
+            raise KeyError(key)
+        self._shape_of[index] = self._shape_id(tuple(k for k in keys if k != key))
+        col = self.columns.get(key)
+        if col is not None:
+            col[index] = None
+        if key == "offset":
+            self._pin_hex(index)
+            self._reindex(index, -1)
+        elif key == "length":
+            self.lengths[index] = -1
+
+    def _pin_hex(self, index: int) -> None:
+        # Un offset_hex canónico no se guarda: se deriva del offset. Antes de
+        # cambiar el offset se fija su valor, o al guardar saldría otro
+        if "offset_hex" in self.keys(index):
+            col = self._column("offset_hex")
+            if col[index] is None:
+                col[index] = _stored(self._hex(index))
+
+    def _reindex(self, index: int, offset: int) -> None:
+        old = self.offsets[index]
+        if self._index.get(old) == index:
+            del self._index[old]
+        self.offsets[index] = offset
+        if offset >= 0:
+            self._index[offset] = index
+
+    # ────────────────────────────  Lectura  ──────────────────────────────────
+    def _hex(self, index: int) -> Optional[str]:
+        offset = self.offsets[index]
+        return f"0x{offset:X}" if offset >= 0 else None
+
+    def get_value(self, index: int, key: str, default: Any = _MISSING) -> Any:
+        """Valor de `key` en la fila (KeyError, o `default`, si no la tiene)."""
+        if key not in self.keys(index):
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        col = self.columns.get(key)
+        value = col[index] if col is not None else None
+        if value is None:
+            if key == "offset":
+                return self.offsets[index] if self.offsets[index] >= 0 else None
+            if key == "length":
+                return self.lengths[index] if self.lengths[index] >= 0 else None
+            if key == "offset_hex":
+                return self._hex(index)
+        return _loaded(value)
+
+    def entry(self, index: int) -> dict:
+        """La entrada como dict, con las claves en su orden original."""
+        return {key: self.get_value(index, key) for key in self.keys(index)}
+
+    def entries(self) -> Iterator[dict]:
+        return (self.entry(i) for i in range(len(self)))
+
+    def row_of(self, offset: int) -> Optional[int]:
+        return self._index.get(offset)
+
+    def get(self, offset: int) -> Optional[Row]:
+        i = self._index.get(offset)
+        return None if i is None else Row(self, i)
+
+    def __contains__(self, offset: object) -> bool:
+        return offset in self._index
+
+    def column(self, key: str) -> list:
+        """Valores de `key` en todas las filas (None donde falta)."""
+        if key == "offset":
+            return [o if o >= 0 else None for o in self.offsets]
+        has = [key in shape for shape in self.shapes]
+        return [self.get_value(i, key) if has[sid] else None
+                for i, sid in enumerate(self._shape_of)]
+
+    # ────────────────────────────  Filtros  ──────────────────────────────────
+    def where(self, key: str, predicate: Callable[[Any], bool] = bool) -> list[int]:
+        """Filas que tienen `key` y cuyo valor cumple `predicate`."""
+        has = [key in shape for shape in self.shapes]
+        if key in _INT_KEYS or key == "offset_hex":
+            return [i for i, sid in enumerate(self._shape_of)
+                    if has[sid] and predicate(self.get_value(i, key))]
+        col = self.columns.get(key, ())
+        return [i for i, (sid, value) in enumerate(zip(self._shape_of, col))
+                if has[sid] and predicate(_loaded(value))]
+
+    def review_rows(self) -> list[int]:
+        """Filas marcadas con "review": true."""
+        return self.where("review", lambda v: v is True)
+
+    def overflow_rows(self, encoding: str = "latin-1", key: str = "text") -> list[int]:
+        """Filas cuyo texto codificado (+0x00) no cabe en `length`.
+
+        Mismo criterio que translate_spanish_checkfit.py (incluida la
+        transliteración de `translate_spanish.ENABLE_TRANSLIT`). Las filas sin
+        un `length` entero no cuentan: no hay hueco con el que comparar.
+        """
+        from translate_spanish import encode_custom
+        lengths = self.lengths
+        return [i for i in self.where(key, lambda v: isinstance(v, str))
+                if lengths[i] >= 0
+                and len(encode_custom(self.get_value(i, key), encoding)) + 1 > lengths[i]]
+
+    def rows(self, indices: Iterable[int]) -> list[Row]:
+        return [Row(self, i) for i in indices]
+
+    # ─────────────────────────────  Cruces  ──────────────────────────────────
+    def join(self, other: "EntryStore") -> list[tuple[int, Optional[int]]]:
+        """(fila aquí, fila con el mismo offset en `other` o None) para cada fila."""
+        index = other._index
+        return [(i, index.get(offset) if offset >= 0 else None)
+                for i, offset in enumerate(self.offsets)]
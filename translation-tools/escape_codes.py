@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""Descubre y verifica los códigos de escape (`0x81` + letra) del texto de la ROM.
+
+La ROM codifica los caracteres que no son ASCII como un byte de escape
+seguido de otro byte (`0x81 'j'` → "É"). La tabla de translate_spanish.py se
+sacó buscando a mano contextos como "Él es el único" o "ESTACIÓN"; este
+script hace esa búsqueda sobre todos los bloques de texto a la vez:
+
+  1. Estadística de parejas: cuenta cada byte de escape (0x80-0x9F, que no
+     son texto imprimible en latin-1) y cada pareja `escape + byte` de los
+     bloques. El recuento se hace con `re.findall` + `Counter` sobre el
+     bloque entero, sin recorrer los bytes en Python.
+  2. Índice KWIC (keyword in context): cada aparición de cada código con el
+     texto decodificado a su izquierda y a su derecha.
+  3. Propuestas: para cada aparición se prueba cada carácter candidato en la
+     palabra y se comprueba
+       - si la palabra resultante aparece en otro sitio de la ROM escrita con
+         otros códigos (la tabla se valida a sí misma: "Él" con 0x81j se
+         confirma porque "él" aparece con 0x81M) o en un léxico externo;
+       - si la caja encaja con la palabra ("ESTACIÓN" pide mayúscula, una
+         letra tras minúsculas pide minúscula, inicio de frase pide mayúscula);
+       - para "¡"/"¿", si la cadena cierra con "!"/"?".
+     Cada aparición reparte un voto entre los candidatos que encajan. La
+     confianza de una propuesta es la fracción de apariciones del código que
+     la apoyan.
+
+El resultado se compara con la tabla actual (SPANISH_CHAR_MAP): "ok" si
+coincide, "conflicto" si la evidencia propone otro carácter, "nuevo" para
+códigos que la tabla no conoce y "sin datos" si no hay evidencia.
+
+Uso:
+    python translation-tools/escape_codes.py "roms/Traysia (W).bin"
+    python translation-tools/escape_codes.py "roms/Traysia (W).bin" --kwic 81j --kwic 81l
+    python translation-tools/escape_codes.py "roms/Traysia (DE).bin" --lexicon translations/german.json --check
+    python translation-tools/escape_codes.py rom.bin --blind --lexicon palabras.txt --json .temp/codes.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
+
+import dump_text_blocks
+import translate_spanish
+from translation_io import iter_entries
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+ENCODING = "latin-1"
+# Bytes de control en latin-1: posibles bytes de escape seguidos de un código
+_PAIR_RE = re.compile(rb"[\x80-\x9f].", re.S)
+_STRING_RE = re.compile(rb"[^\x00]+")
+_WORD_RE = re.compile(r"[^\W\d_]+")
+CONTEXT = 30
+DEFAULT_LIMIT = 20
+DEFAULT_MIN_CONFIDENCE = 0.6
+# Con --whole-rom los datos binarios dejan parejas sueltas que no son texto
+DEFAULT_MIN_COUNT = 2
+SENTENCE_END = ".!?"
+# Signos de apertura y el signo que debe cerrar la misma cadena
+OPENING = {"¡": "!", "¿": "?"}
+
+# Un token es un carácter ya decodificado (str) o una pareja de escape (bytes)
+Token = Union[str, bytes]
+
+
+def label(pair: bytes) -> str:
+    """Nombre corto de un código: 81j, o 81:0A si el segundo byte no es imprimible."""
+    second = pair[1:2]
+    if second and 0x21 <= second[0] < 0x7F:
+        return f"{pair[0]:02X}{second.decode('ascii')}"
+    return f"{pair[0]:02X}:{second.hex().upper()}"
+
+
+def parse_code(text: str) -> bytes:
+    """Acepta 81j, 81:6A, 0x816A o 816A."""
+    text = text.strip()
+    if text.lower().startswith("0x"):
+        text = text[2:]
+    if ":" in text:
+        lead, second = text.split(":", 1)
+        return bytes([int(lead, 16), int(second, 16)])
+    if len(text) == 3:
+        return bytes([int(text[:2], 16)]) + text[2].encode("ascii")
+    if len(text) == 4:
+        return bytes.fromhex(text)
+    raise argparse.ArgumentTypeError(f"código no válido: {text!r} (ejemplos: 81j, 81:6A, 0x816A)")
+
+
+def text_regions(data: bytes, whole_rom: bool, min_len: int) -> list[tuple[int, int]]:
+    """Rangos a analizar: los bloques conocidos o todo texto latin-1 de la ROM."""
+    if whole_rom:
+        return [(off, off + length) for off, length, _ in dump_text_blocks.scan_blocks(data, min_len, True)]
+    return [(start, min(end, len(data))) for start, end in translate_spanish.BLOCKS if start < len(data)]
+
+
+def tokenize(chunk: bytes) -> tuple[list[Token], list[int]]:
+    """Parte una cadena en caracteres y parejas de escape; devuelve también sus offsets relativos."""
+    tokens: list[Token] = []
+    offsets: list[int] = []
+    pos = 0
+    for m in _PAIR_RE.finditer(chunk):
+        tokens.extend(chunk[pos:m.start()].decode(ENCODING))
+        offsets.extend(range(pos, m.start()))
+        tokens.append(m.group())
+        offsets.append(m.start())
+        pos = m.end()
+    tokens.extend(chunk[pos:].decode(ENCODING))
+    offsets.extend(range(pos, len(chunk)))
+    return tokens, offsets
+
+
+def _is_letter(tok: Token) -> bool:
+    return isinstance(tok, bytes) or tok.isalpha()
+
+
+def _words(tokens: list[Token]) -> Iterator[tuple[int, int]]:
+    """Rangos [a, b) de palabras: letras y códigos seguidos."""
+    a = None
+    for i, tok in enumerate(tokens):
+        if _is_letter(tok):
+            if a is None:
+                a = i
+        elif a is not None:
+            yield a, i
+            a = None
+    if a is not None:
+        yield a, len(tokens)
+
+
+def render(tokens: Iterable[Token], table: dict[bytes, str]) -> str:
+    return "".join(tok if isinstance(tok, str) else table.get(tok) or f"⟨{label(tok)}⟩" for tok in tokens)
+
+
+class Occurrence(NamedTuple):
+    offset: int
+    code: bytes
+    left: str
+    right: str
+
+
+class Corpus:
+    """Cadenas de los bloques de texto, partidas en caracteres y códigos."""
+
+    def __init__(self, data: bytes, regions: list[tuple[int, int]]):
+        self.regions = regions
+        self.leads: Counter[int] = Counter()
+        self.pairs: Counter[bytes] = Counter()
+        # (offset de la cadena, tokens, offsets relativos de cada token, palabras)
+        self.strings: list[tuple[int, list[Token], list[int], list[tuple[int, int]]]] = []
+        for start, end in regions:
+            block = data[start:end]
+            self.pairs.update(_PAIR_RE.findall(block))
+            for m in _STRING_RE.finditer(block):
+                if _PAIR_RE.search(m.group()) or len(m.group()) > 1:
+                    tokens, offsets = tokenize(m.group())
+                    self.strings.append((start + m.start(), tokens, offsets, list(_words(tokens))))
+        for pair, n in self.pairs.items():
+            self.leads[pair[0]] += n
+
+    def occurrences(self) -> Iterator[tuple[list[Token], int, int, int]]:
+        """(tokens de la cadena, palabra [a, b), índice k del código) de cada código."""
+        for _, tokens, _, words in self.strings:
+            for a, b in words:
+                for k in range(a, b):
+                    if isinstance(tokens[k], bytes):
+                        yield tokens, a, b, k
+
+    def kwic(self, table: dict[bytes, str], codes: Optional[set[bytes]] = None,
+             width: int = CONTEXT) -> dict[bytes, list[Occurrence]]:
+        """Índice KWIC: apariciones de cada código con su contexto decodificado."""
+        index: dict[bytes, list[Occurrence]] = defaultdict(list)
+        for offset, tokens, offsets, _ in self.strings:
+            for k, tok in enumerate(tokens):
+                if isinstance(tok, bytes) and (codes is None or tok in codes):
+                    left = render(tokens[max(0, k - width):k], table)[-width:]
+                    right = render(tokens[k + 1:k + 1 + width], table)[:width]
+                    index[tok].append(Occurrence(offset + offsets[k], tok, left, right))
+        for entries in index.values():
+            entries.sort(key=lambda o: (o.right.lower(), o.left[::-1].lower()))
+        return dict(index)
+
+
+# ─────────────────────────────  Léxico  ──────────────────────────────────────
+class Lexicon:
+    """Palabras vistas, con los códigos usados al escribir cada una."""
+
+    def __init__(self):
+        # palabra en minúsculas → {códigos usados: veces}
+        self.counts: dict[str, Counter] = defaultdict(Counter)
+        # palabras escritas con mayúscula a mitad de frase (nombres propios)
+        self.proper: set[str] = set()
+
+    def add(self, word: str, codes: frozenset = frozenset(), initial: bool = False) -> None:
+        folded = word.lower()
+        self.counts[folded][codes] += 1
+        if not initial and word[:1].isupper() and word[1:].islower():
+            self.proper.add(folded)
+
+    def update(self, other: "Lexicon") -> None:
+        for word, counts in other.counts.items():
+            self.counts[word].update(counts)
+        self.proper |= other.proper
+
+    def support(self, word: str, code: bytes) -> int:
+        """Veces que `word` aparece escrita sin usar `code` (para no validarse a sí mismo)."""
+        return sum(n for codes, n in self.counts.get(word.lower(), {}).items() if code not in codes)
+
+
+def _sentence_start(tokens: list[Token], a: int, table: dict[bytes, str]) -> bool:
+    for tok in reversed(tokens[:a]):
+        tok = table.get(tok, tok) if isinstance(tok, bytes) else tok
+        if isinstance(tok, bytes) or tok.isspace() or tok == "@":
+            continue
+        return tok in SENTENCE_END or tok in OPENING
+    return True
+
+
+def build_lexicon(corpus: Corpus, table: dict[bytes, str], external: Optional[Lexicon] = None) -> Lexicon:
+    lexicon = Lexicon()
+    if external is not None:
+        lexicon.update(external)
+    for _, tokens, _, words in corpus.strings:
+        for a, b in words:
+            word = tokens[a:b]
+            codes = frozenset(t for t in word if isinstance(t, bytes))
+            if all(t in table for t in codes):
+                initial = _sentence_start(tokens, a, table)
+                # "¡Ayuda" → "Ayuda": los signos decodificados no son parte de la palabra
+                for part in _WORD_RE.findall(render(word, table)):
+                    lexicon.add(part, codes, initial)
+    return lexicon
+
+
+def add_lexicon_file(lexicon: Lexicon, path: Path) -> int:
+    """Añade las palabras de un texto o de un JSON de traducción (campo text)."""
+    n = 0
+    if path.suffix.lower() not in (".json", ".jsonl"):
+        # Lista de palabras: la mayúscula es parte de la palabra (nombres propios)
+        for word in _WORD_RE.findall(path.read_text("utf-8")):
+            lexicon.add(word)
+            n += 1
+        return n
+    for entry in iter_entries(path):
+        text = str(entry.get("text", ""))
+        for m in _WORD_RE.finditer(text):
+            before = text[:m.start()].rstrip(" @¡¿\"'")
+            lexicon.add(m.group(), initial=not before or before[-1] in SENTENCE_END)
+            n += 1
+    return n
+
+
+# ────────────────────────────  Propuestas  ───────────────────────────────────
+def _expected_case(word: list[str | None], k: int, sentence_start: bool) -> Optional[bool]:
+    """True si el código de la posición k debe ser mayúscula, False si minúscula, None si no se sabe."""
+    others = [c for i, c in enumerate(word) if i != k and c and c.isalpha()]
+    if any(c.islower() for c in word[:k] if c):
+        return False
+    if len(others) > 1 and all(c.isupper() for c in others):
+        return True
+    if k == 0 and sentence_start:
+        return True
+    return None
+
+
+def vote(word: tuple[Token, ...], j: int, sentence_start: bool, closer: Optional[str],
+         table: dict[bytes, str], lexicon: Lexicon, candidates: list[str]) -> list[str]:
+    """Candidatos compatibles con el código `word[j]` en su palabra.
+
+    `sentence_start` dice si la palabra abre frase y `closer` es el primer
+    "!" o "?" que la sigue en la cadena.
+    """
+    code = word[j]
+    resolved: list[str | None] = []
+    for tok in word:
+        if tok == code:
+            resolved.append(None)
+        elif isinstance(tok, bytes):
+            if tok not in table:
+                return []           # otra pareja desconocida en la misma palabra
+            resolved.append(table[tok])
+        else:
+            resolved.append(tok)
+    # "¿Dónde": los signos ya decodificados al principio no son parte de la palabra
+    while j and resolved[0] in OPENING:
+        resolved.pop(0)
+        j -= 1
+        sentence_start = True
+    case = _expected_case(resolved, j, sentence_start)
+    found = []
+    for ch in candidates:
+        if ch in OPENING:
+            # Signo de apertura: abre una palabra conocida y el primer cierre
+            # de la cadena es el suyo
+            tail = "".join(resolved[1:]) if j == 0 and None not in resolved[1:] else ""
+            if OPENING[ch] == closer and tail and lexicon.support(tail, code):
+                found.append(ch)
+            continue
+        text = "".join(c if c is not None else ch for c in resolved)
+        if not lexicon.support(text, code):
+            continue
+        # Inicial a mitad de frase: mayúscula solo si es un nombre propio
+        expected = case if case is not None or j else text.lower() in lexicon.proper
+        if ch.isupper() == expected or (expected is None and ch.isalpha()):
+            found.append(ch)
+    return found
+
+
+class Proposal(NamedTuple):
+    code: bytes
+    count: int
+    current: Optional[str]
+    proposed: Optional[str]
+    confidence: float
+    evidence: int
+    votes: dict[str, float]
+
+    @property
+    def status(self) -> str:
+        if self.proposed is None:
+            return "sin datos"
+        if self.current is None:
+            return "nuevo"
+        return "ok" if self.current == self.proposed else "conflicto"
+
+
+def propose(corpus: Corpus, table: dict[bytes, str], lexicon: Lexicon,
+            candidates: list[str]) -> list[Proposal]:
+    votes: dict[bytes, Counter] = defaultdict(Counter)
+    evidence: Counter[bytes] = Counter()
+    # Las mismas palabras se repiten mucho: cada contexto distinto se evalúa una vez
+    cache: dict[tuple, list[str]] = {}
+    for tokens, a, b, k in corpus.occurrences():
+        closer = next((t for t in tokens[b:] if t == "!" or t == "?"), None)
+        key = (tuple(tokens[a:b]), k - a, _sentence_start(tokens, a, table), closer)
+        found = cache.get(key)
+        if found is None:
+            found = cache[key] = vote(*key, table, lexicon, candidates)
+        if found:
+            evidence[tokens[k]] += 1
+            for ch in found:
+                votes[tokens[k]][ch] += 1 / len(found)
+    proposals = []
+    for code, count in corpus.pairs.most_common():
+        best = votes[code].most_common(1)
+        proposed, score = best[0] if best else (None, 0.0)
+        proposals.append(Proposal(code, count, table.get(code), proposed, score / count,
+                                  evidence[code], dict(votes[code])))
+    return proposals
+
+
+def discover(corpus: Corpus, table: dict[bytes, str], candidates: list[str],
+             external: Optional[Lexicon] = None, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+             rounds: int = 3) -> list[Proposal]:
+    """Propuestas para todos los códigos, aprendiendo por rondas.
+
+    Los códigos nuevos con confianza suficiente se dan por buenos en la ronda
+    siguiente: así una palabra con dos códigos desconocidos ("¿Dónde" sin ¿
+    ni ó) se resuelve cuando uno de ellos ya se conoce.
+    """
+    known = dict(table)
+    for _ in range(rounds):
+        proposals = propose(corpus, known, build_lexicon(corpus, known, external), candidates)
+        learned = {p.code: p.proposed for p in proposals
+                   if p.code not in known and p.proposed and p.confidence >= min_confidence}
+        if not learned:
+            break
+        known.update(learned)
+    return [p._replace(current=table.get(p.code)) for p in proposals]
+
+
+# ───────────────────────────────  CLI  ───────────────────────────────────────
+def _print_table(corpus: Corpus, proposals: list[Proposal]) -> None:
+    leads = "  ".join(f"0x{lead:02X}×{n}" for lead, n in corpus.leads.most_common())
+    print(f"Bytes de escape: {leads or 'ninguno'}")
+    print(f"{'código':<8}{'veces':>7}  {'tabla':<6}{'propuesta':<10}{'confianza':>9}  {'evid.':>6}  estado")
+    for p in proposals:
+        print(f"{label(p.code):<8}{p.count:>7}  {p.current or '-':<6}{p.proposed or '-':<10}"
+              f"{p.confidence:>9.0%}  {p.evidence:>6}  {p.status}")
+
+
+def _print_kwic(index: dict[bytes, list[Occurrence]], table: dict[bytes, str], limit: int) -> None:
+    for code, entries in index.items():
+        shown = entries if limit <= 0 else entries[:limit]
+        print(f"\n── {label(code)} ({table.get(code, '?')}): {len(entries)} apariciones ──")
+        for occ in shown:
+            print(f"  0x{occ.offset:06X}  {occ.left:>{CONTEXT}} ⟨{label(code)}⟩ {occ.right}")
+        if len(shown) < len(entries):
+            print(f"  ... {len(entries) - len(shown)} más (--limit 0 para verlas todas)")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Estadística, índice KWIC y propuestas para los códigos 0x81 de la ROM")
+    parser.add_argument("rom", type=Path, help="ROM a analizar")
+    parser.add_argument("--whole-rom", action="store_true",
+                        help="analizar todo el texto latin-1 de la ROM, no solo translate_spanish.BLOCKS")
+    parser.add_argument("--min-len", type=int, default=dump_text_blocks.DEFAULT_MIN_LEN,
+                        help="longitud mínima de un bloque de texto con --whole-rom")
+    parser.add_argument("--lexicon", type=Path, action="append", default=[],
+                        help="texto o JSON de traducción con palabras del idioma de la ROM (repetible)")
+    parser.add_argument("--min-count", type=int, default=DEFAULT_MIN_COUNT,
+                        help=f"ocultar códigos con menos apariciones (por defecto: {DEFAULT_MIN_COUNT})")
+    parser.add_argument("--chars", default="", help="caracteres candidatos además de los de la tabla actual")
+    parser.add_argument("--blind", action="store_true",
+                        help="ignorar la tabla actual: proponer solo a partir del léxico y el contexto")
+    parser.add_argument("--kwic", type=parse_code, action="append", metavar="CODE",
+                        help="mostrar las apariciones de un código en contexto (repetible)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="apariciones por código con --kwic (0 = todas)")
+    parser.add_argument("--json", type=Path, help="guardar estadística, propuestas e índice KWIC completo")
+    parser.add_argument("--check", action="store_true",
+                        help="salir con código 1 si algún código de la tabla tiene un conflicto")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help=f"confianza mínima para que --check cuente un conflicto (por defecto: {DEFAULT_MIN_CONFIDENCE})")
+    args = parser.parse_args(argv)
+
+    data = args.rom.read_bytes()
+    table = {} if args.blind else dict(translate_spanish.SPANISH_CHAR_MAP)
+    candidates = list(dict.fromkeys([*translate_spanish.SPANISH_CHAR_MAP.values(), *args.chars]))
+
+    corpus = Corpus(data, text_regions(data, args.whole_rom, args.min_len))
+    external = Lexicon()
+    for path in args.lexicon:
+        print(f"Léxico: {add_lexicon_file(external, path)} palabras de {path}")
+    proposals = [p for p in discover(corpus, table, candidates, external, args.min_confidence)
+                 if p.count >= args.min_count or p.current is not None]
+    _print_table(corpus, proposals)
+
+    if args.kwic:
+        _print_kwic(corpus.kwic(table, set(args.kwic)), table, args.limit)
+
+    if args.json:
+        index = corpus.kwic(table)
+        record = {
+            "rom": str(args.rom),
+            "regions": [[f"0x{s:X}", f"0x{e:X}"] for s, e in corpus.regions],
+            "leads": {f"0x{lead:02X}": n for lead, n in corpus.leads.most_common()},
+            "codes": [{
+                "code": label(p.code), "bytes": p.code.hex(), "count": p.count,
+                "current": p.current, "proposed": p.proposed, "confidence": round(p.confidence, 3),
+                "evidence": p.evidence, "status": p.status,
+                "votes": {ch: round(v, 2) for ch, v in sorted(p.votes.items(), key=lambda kv: -kv[1])},
+                "kwic": [{"offset": f"0x{o.offset:06X}", "left": o.left, "right": o.right}
+                         for o in index.get(p.code, [])],
+            } for p in proposals],
+        }
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(record, indent=2, ensure_ascii=False), "utf-8")
+        print(f"\n✔ Índice → {args.json}")
+
+    if args.check:
+        conflicts = [p for p in proposals if p.status == "conflicto" and p.confidence >= args.min_confidence]
+        if conflicts:
+            print(f"\n❌ {len(conflicts)} códigos de la tabla contradicen la evidencia: "
+                  + ", ".join(f"{label(p.code)} {p.current}→{p.proposed}" for p in conflicts))
+            sys.exit(1)
+        print("\n✓ La tabla concuerda con la evidencia")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Glosario de términos fijos (lugares, objetos, personajes) para la traducción.
+
+Los motores en línea traducen los nombres propios cada vez de una manera
+("Espada de Fuego" → "Feuerschwert", "Schwert des Feuers"...). El glosario:
+
+  1. Antes de traducir, sustituye cada término del original por un marcador
+     (`ZX0Q`, `ZX1Q`...) que el motor deja intacto (`mask`).
+  2. Después, cambia cada marcador por la traducción fijada del término
+     (`unmask`).
+  3. Comprueba que todos los términos del original aparecen traducidos como
+     dice el glosario (`missing`) y corrige los que el motor dejó sin
+     traducir (`enforce`).
+
+Los términos se buscan con un único autómata de Aho–Corasick sobre todo el
+glosario: el coste por frase es lineal en su longitud, tenga el glosario diez
+términos o diez mil. Las coincidencias no distinguen mayúsculas, respetan los
+límites de palabra y, si se solapan, gana la más larga que empiece antes.
+
+Formato del archivo (JSON), una traducción común o una por idioma:
+
+    {
+      "Traysia": "Traysia",
+      "Espada de Fuego": {"de": "Feuerschwert", "en": "Fire Sword"}
+    }
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections import deque
+from pathlib import Path
+from typing import Iterator
+
+PLACEHOLDER = "ZX{}Q"
+# Los motores a veces separan o cambian de caja el marcador
+_PLACEHOLDER_RE = re.compile(r"ZX\s*(\d+)\s*Q", re.IGNORECASE)
+
+
+def _fold(text: str) -> str:
+    """Minúsculas carácter a carácter (misma longitud que `text`)."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class _Automaton:
+    """Aho–Corasick sobre los términos (ya en minúsculas)."""
+
+    def __init__(self, terms: list[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[list[int]] = [[]]     # índices de término que acaban aquí
+        for idx, term in enumerate(terms):
+            node = 0
+            for ch in term:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append(idx)
+        # Enlaces de fallo por anchura (los hijos de la raíz fallan a la raíz);
+        # cada nodo hereda las salidas de su fallo
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter(self, text: str) -> Iterator[tuple[int, int]]:
+        """(posición final exclusiva, índice de término) de cada aparición."""
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in out[node]:
+                yield pos + 1, idx
+
+
+class Glossary:
+    def __init__(self, terms: dict[str, str]):
+        # Se descartan términos vacíos; si dos difieren solo en mayúsculas, gana el último
+        by_key = {_fold(src): (src, dst) for src, dst in terms.items() if src.strip()}
+        self.sources = [src for src, _ in by_key.values()]
+        self.targets = [dst for _, dst in by_key.values()]
+        self._keys = list(by_key)
+        self._lengths = [len(k) for k in self._keys]
+        self._automaton = _Automaton(self._keys)
+        self._target_keys = [_fold(t) for t in self.targets]
+
+    @classmethod
+    def from_file(cls, path: Path | str, target: str) -> "Glossary":
+        data = json.loads(Path(path).read_text("utf-8"))
+        terms = {}
+        for src, dst in data.items():
+            if isinstance(dst, dict):
+                dst = dst.get(target)
+            if dst:
+                terms[src] = dst
+        return cls(terms)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def find(self, text: str) -> list[tuple[int, int, int]]:
+        """Apariciones (inicio, fin, índice) sin solapes, por orden en el texto."""
+        if not self._keys:
+            return []
+        found = []
+        for end, idx in self._automaton.iter(_fold(text)):
+            start = end - self._lengths[idx]
+            # solo palabras completas
+            if start > 0 and _is_word(text[start - 1]) and _is_word(text[start]):
+                continue
+            if end < len(text) and _is_word(text[end]) and _is_word(text[end - 1]):
+                continue
+            found.append((start, end, idx))
+        # La más larga que empiece antes; descartar las que se solapan
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        chosen, last_end = [], 0
+        for start, end, idx in found:
+            if start >= last_end:
+                chosen.append((start, end, idx))
+                last_end = end
+        return chosen
+
+    def _render(self, idx: int, original: str) -> str:
+        target = self.targets[idx]
+        # "CRISTAL" en el original → "KRISTALL"
+        if original.isupper() and any(c.isalpha() for c in original):
+            return target.upper()
+        return target
+
+    def mask(self, text: str) -> tuple[str, list[str]]:
+        """Sustituye los términos por marcadores; devuelve (texto, sustituciones)."""
+        matches = self.find(text)
+        if not matches:
+            return text, []
+        out, replacements, pos = [], [], 0
+        for n, (start, end, idx) in enumerate(matches):
+            out.append(text[pos:start])
+            out.append(PLACEHOLDER.format(n))
+            replacements.append(self._render(idx, text[start:end]))
+            pos = end
+        out.append(text[pos:])
+        return "".join(out), replacements
+
+    def unmask(self, text: str, replacements: list[str]) -> str:
+        """Restaura los marcadores de `mask`; los que no existan se dejan tal cual."""
+        if not replacements:
+            return text
+
+        def restore(m: re.Match) -> str:
+            n = int(m.group(1))
+            return replacements[n] if n < len(replacements) else m.group()
+        return _PLACEHOLDER_RE.sub(restore, text)
+
+    def missing(self, source: str, translated: str) -> list[str]:
+        """Términos del original cuya traducción fijada no aparece en `translated`."""
+        return [self.sources[idx] for idx in self._missing(source, translated)]
+
+    def _missing(self, source: str, translated: str) -> list[int]:
+        matches = self.find(source)
+        if not matches:
+            return []
+        folded = _fold(translated)
+        ids = dict.fromkeys(idx for _s, _e, idx in matches)
+        return [idx for idx in ids if self._target_keys[idx] not in folded]
+
+    def enforce(self, source: str, translated: str) -> str:
+        """Cambia por su traducción los términos del original que quedaron sin traducir."""
+        missing = self._missing(source, translated)
+        if not missing:
+            return translated
+        matches = [m for m in self.find(translated) if m[2] in missing]
+        if not matches:
+            return translated
+        out, pos = [], 0
+        for start, end, idx in matches:
+            out.append(translated[pos:start])
+            out.append(self._render(idx, translated[start:end]))
+            pos = end
+        out.append(translated[pos:])
+        return "".join(out)
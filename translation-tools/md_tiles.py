@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""Tiles de Mega Drive: decodificación, codificación y hojas PNG indexadas.
+
+Un tile son 8×8 píxeles. En 4bpp (el formato del VDP) ocupa 32 bytes: 4 bytes
+por fila y un nibble por píxel, el de la izquierda en el nibble alto. Las
+fuentes se guardan a menudo comprimidas a 1bpp: 8 bytes por tile, un bit por
+píxel con el de la izquierda en el bit 7.
+
+`decode_tiles` devuelve cada tile como una lista de 8 filas de 8 índices de
+color (0 = transparente). Para rangos grandes, `unpack_tiles`/`pack_tiles`
+pasan de bytes de la ROM a un píxel por byte (64 por tile) y al revés por
+bloques: nibbles y bits se separan con tablas de `bytes.translate` y se
+intercalan con asignaciones de slices con paso, y al codificar se juntan con
+un OR entre enteros grandes; no hay bucles de Python por píxel.
+
+`write_png` guarda una imagen de 8 bits con paleta usando solo zlib: sin
+fechas ni metadatos, así que la misma entrada produce siempre el mismo archivo.
+`read_png` lee las hojas editadas (PNG indexado o RGB/gris de 8 bits); los
+filtros None/Sub/Up y la conversión de colores a índices van por bloques.
+
+Como script, exporta un rango de tiles a una hoja PNG (títulos y menús que se
+guardan como gráficos, no como texto) y vuelve a insertar la hoja editada,
+indicando qué tiles cambian; el IPS opcional sale por la misma ruta que el del
+parche Anticrash:
+
+    python translation-tools/md_tiles.py export "roms/Traysia (W).bin" 0x... 64 titulo.png --palette-offset 0x...
+    python translation-tools/md_tiles.py import "roms/Traysia (W).bin" 0x... 64 titulo.png -o "roms/Traysia (DE).bin" --ips
+"""
+
+from __future__ import annotations
+
+import argparse
+import struct
+import sys
+import zlib
+from itertools import accumulate
+from pathlib import Path
+from typing import Optional
+
+import tools_path
+tools_path.enable()
+
+import instrument
+from rom_image import RomImage
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+TILE_W = TILE_H = 8
+TILE_PIXELS = TILE_W * TILE_H
+TILE_BYTES = {"1bpp": 8, "4bpp": 32}
+COLORS = {"1bpp": 2, "4bpp": 16}
+DEFAULT_COLUMNS = 16
+# Nivel de zlib de los PNG: el 9 tarda ~6 veces más que el 6 y solo ahorra ~15%
+PNG_LEVEL = 6
+
+Tile = list[list[int]]
+Palette = list[tuple[int, int, int]]
+
+# Paletas por defecto: grises distintos entre sí, para poder reimportar desde RGB
+GRAY_PALETTE: Palette = [(255 * i // 15,) * 3 for i in range(16)]
+MONO_PALETTE: Palette = [(0, 0, 0), (255, 255, 255)]
+
+# Tablas para bytes.translate
+_HI = bytes(b >> 4 for b in range(256))
+_LO = bytes(b & 0x0F for b in range(256))
+_SHL4 = bytes((b << 4) & 0xFF for b in range(256))
+_BIT = [bytes((b >> (7 - x)) & 1 for b in range(256)) for x in range(TILE_W)]
+_TO_BIT = [bytes((b & 1) << (7 - x) for b in range(256)) for x in range(TILE_W)]
+# Marca de "color fuera de la paleta" en read_png: las paletas tienen 2 o 16 colores
+_MISSING = 0xFF
+
+
+def decode_1bpp(data: bytes, offset: int = 0) -> Tile:
+    return [[(data[offset + y] >> (7 - x)) & 1 for x in range(TILE_W)]
+            for y in range(TILE_H)]
+
+
+def decode_4bpp(data: bytes, offset: int = 0) -> Tile:
+    rows = []
+    for y in range(TILE_H):
+        row = []
+        for b in data[offset + y * 4:offset + y * 4 + 4]:
+            row.append(b >> 4)
+            row.append(b & 0x0F)
+        rows.append(row)
+    return rows
+
+
+def _check_range(size: int, offset: int, count: int, fmt: str) -> int:
+    end = offset + count * TILE_BYTES[fmt]
+    if offset < 0 or count < 0 or end > size:
+        raise ValueError(f"Los tiles 0x{offset:X}-0x{end:X} se salen de la ROM ({size} bytes)")
+    return end
+
+
+def decode_tiles(data: bytes, offset: int, count: int, fmt: str = "4bpp") -> list[Tile]:
+    """Decodifica `count` tiles consecutivos a partir de `offset`."""
+    end = _check_range(len(data), offset, count, fmt)
+    pixels = unpack_tiles(bytes(data[offset:end]), fmt)
+    return [[list(pixels[base:base + TILE_W]) for base in range(t, t + TILE_PIXELS, TILE_W)]
+            for t in range(0, len(pixels), TILE_PIXELS)]
+
+
+# ──────────────────────  Codificación por bloques  ───────────────────────────
+def unpack_tiles(data: bytes, fmt: str = "4bpp") -> bytes:
+    """Píxeles de los tiles de `data`: un byte por píxel, 64 por tile, fila a fila."""
+    if fmt == "4bpp":
+        out = bytearray(2 * len(data))
+        out[0::2] = data.translate(_HI)
+        out[1::2] = data.translate(_LO)
+        return bytes(out)
+    out = bytearray(TILE_W * len(data))
+    for x in range(TILE_W):
+        out[x::TILE_W] = data.translate(_BIT[x])
+    return bytes(out)
+
+
+def pack_tiles(pixels: bytes, fmt: str = "4bpp") -> bytes:
+    """Inversa de `unpack_tiles`. ValueError si algún índice no cabe en el formato."""
+    if len(pixels) % TILE_PIXELS:
+        raise ValueError(f"{len(pixels)} píxeles no son un número entero de tiles")
+    if not pixels:
+        return b""
+    if max(pixels) >= COLORS[fmt]:
+        bad = next(i for i, p in enumerate(pixels) if p >= COLORS[fmt])
+        raise ValueError(f"El tile {bad // TILE_PIXELS} usa el color {pixels[bad]} "
+                         f"(en {fmt} solo hay {COLORS[fmt]})")
+    if fmt == "4bpp":
+        hi, lo = pixels[0::2].translate(_SHL4), pixels[1::2]
+        return (int.from_bytes(hi, "big") | int.from_bytes(lo, "big")).to_bytes(len(hi), "big")
+    size = len(pixels) // TILE_W
+    acc = 0
+    for x in range(TILE_W):
+        acc |= int.from_bytes(pixels[x::TILE_W].translate(_TO_BIT[x]), "big")
+    return acc.to_bytes(size, "big")
+
+
+def sheet_size(count: int, columns: int = DEFAULT_COLUMNS) -> tuple[int, int]:
+    """(columnas, filas) de tiles de una hoja con `count` tiles."""
+    cols = max(1, min(columns, count))
+    return cols, -(-count // cols)
+
+
+def tiles_to_sheet(pixels: bytes, columns: int = DEFAULT_COLUMNS) -> tuple[int, int, bytearray]:
+    """Coloca los tiles en una rejilla: (ancho, alto, píxeles). Los huecos quedan a 0."""
+    count = len(pixels) // TILE_PIXELS
+    cols, rows = sheet_size(count, columns)
+    width = cols * TILE_W
+    sheet = bytearray(width * rows * TILE_H)
+    for t in range(count):
+        r, c = divmod(t, cols)
+        dst = r * TILE_H * width + c * TILE_W
+        src = t * TILE_PIXELS
+        for y in range(TILE_H):
+            sheet[dst:dst + TILE_W] = pixels[src:src + TILE_W]
+            dst += width
+            src += TILE_W
+    return width, rows * TILE_H, sheet
+
+
+def sheet_to_tiles(sheet: bytes, width: int, count: int) -> bytes:
+    """Inversa de `tiles_to_sheet`: los `count` primeros tiles de la rejilla."""
+    cols = width // TILE_W
+    out = bytearray(count * TILE_PIXELS)
+    for t in range(count):
+        r, c = divmod(t, cols)
+        src = r * TILE_H * width + c * TILE_W
+        dst = t * TILE_PIXELS
+        for y in range(TILE_H):
+            out[dst:dst + TILE_W] = sheet[src:src + TILE_W]
+            src += width
+            dst += TILE_W
+    return bytes(out)
+
+
+def cram_palette(data: bytes, offset: int, colors: int = 16) -> Palette:
+    """Paleta en formato CRAM (palabras 0000BBB0GGG0RRR0) leída de la ROM."""
+    words = struct.unpack(f">{colors}H", bytes(data[offset:offset + 2 * colors]))
+    return [tuple(((w >> shift) & 7) * 255 // 7 for shift in (1, 5, 9)) for w in words]
+
+
+def ink_width(rows: list[list[int]]) -> int:
+    """Columnas hasta el último píxel no transparente (0 si el glifo está vacío)."""
+    width = 0
+    for row in rows:
+        for x in range(len(row) - 1, width - 1, -1):
+            if row[x]:
+                width = x + 1
+                break
+    return width
+
+
+# ──────────────────────────────────  PNG  ────────────────────────────────────
+def _chunk(kind: bytes, payload: bytes) -> bytes:
+    return (struct.pack(">I", len(payload)) + kind + payload
+            + struct.pack(">I", zlib.crc32(kind + payload) & 0xFFFFFFFF))
+
+
+def write_png(path: Path | str, width: int, height: int, pixels: bytes | bytearray,
+              palette: list[tuple[int, int, int]], scale: int = 1, level: int = PNG_LEVEL) -> None:
+    """PNG indexado de `width`×`height` (un byte por píxel, fila a fila)."""
+    raw = bytearray()
+    for y in range(height):
+        row = pixels[y * width:(y + 1) * width]
+        if scale > 1:
+            wide = bytearray(width * scale)
+            for k in range(scale):
+                wide[k::scale] = row
+            row = wide
+        for _ in range(scale):
+            raw.append(0)          # filtro "None"
+            raw += row
+    header = struct.pack(">IIBBBBB", width * scale, height * scale, 8, 3, 0, 0, 0)
+    plte = b"".join(bytes(rgb) for rgb in palette)
+    Path(path).write_bytes(b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", header) + _chunk(b"PLTE", plte)
+                           + _chunk(b"IDAT", zlib.compress(bytes(raw), level)) + _chunk(b"IEND", b""))
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+_BYTE = (255).__and__
+
+
+def _add_bytes(a: bytes, b: bytes) -> bytes:
+    """Suma byte a byte módulo 256, con enteros grandes (sin acarreo entre bytes)."""
+    n = len(a)
+    if not n:
+        return b""
+    low, high = int.from_bytes(b"\x7f" * n, "big"), int.from_bytes(b"\x80" * n, "big")
+    x, y = int.from_bytes(a, "big"), int.from_bytes(b, "big")
+    return (((x & low) + (y & low)) ^ ((x ^ y) & high)).to_bytes(n, "big")
+
+
+def _unfilter(raw: bytes, stride: int, height: int, bpp: int) -> bytearray:
+    """Deshace los filtros de fila de PNG (None, Sub, Up, Average, Paeth).
+
+    None, Sub y Up van por bloques (Sub es una suma acumulada por canal, Up una
+    suma byte a byte); Average y Paeth dependen del byte de la izquierda ya
+    decodificado y necesitan un bucle por byte.
+    """
+    out = bytearray(stride * height)
+    prev = bytes(stride)
+    pos = 0
+    for y in range(height):
+        kind = raw[pos]
+        row = bytes(raw[pos + 1:pos + 1 + stride])
+        pos += 1 + stride
+        if kind == 1:
+            sub = bytearray(stride)
+            for k in range(bpp):
+                sub[k::bpp] = bytes(map(_BYTE, accumulate(row[k::bpp])))
+            row = bytes(sub)
+        elif kind == 2:
+            row = _add_bytes(row, prev)
+        elif kind == 3:
+            cur = bytearray(row)
+            for i in range(bpp):
+                cur[i] = (cur[i] + (prev[i] >> 1)) & 0xFF
+            for i in range(bpp, stride):
+                cur[i] = (cur[i] + ((cur[i - bpp] + prev[i]) >> 1)) & 0xFF
+            row = bytes(cur)
+        elif kind == 4:
+            cur = bytearray(row)
+            for i in range(bpp):
+                cur[i] = (cur[i] + prev[i]) & 0xFF
+            for i in range(bpp, stride):
+                cur[i] = (cur[i] + _paeth(cur[i - bpp], prev[i], prev[i - bpp])) & 0xFF
+            row = bytes(cur)
+        elif kind != 0:
+            raise ValueError(f"Filtro PNG desconocido ({kind}) en la fila {y}")
+        out[y * stride:(y + 1) * stride] = row
+        prev = row
+    return out
+
+
+def read_png(path: Path | str, palette: Optional[Palette] = None) -> tuple[int, int, bytes]:
+    """(ancho, alto, índices) de un PNG sin entrelazar.
+
+    Los PNG indexados (1, 2, 4 u 8 bits) dan sus índices tal cual; los de gris
+    o RGB(A) de 8 bits se traducen a índices buscando cada color exacto en
+    `palette` (la misma con la que se exportó la hoja).
+    """
+    blob = Path(path).read_bytes()
+    if blob[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError(f"{path}: no es un PNG")
+    pos, idat, header = 8, bytearray(), None
+    while pos < len(blob):
+        length, kind = struct.unpack(">I4s", blob[pos:pos + 8])
+        payload = blob[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", payload)
+        elif kind == b"IDAT":
+            idat += payload
+        elif kind == b"IEND":
+            break
+    if header is None:
+        raise ValueError(f"{path}: falta la cabecera IHDR")
+    width, height, depth, color, _comp, _filter, interlace = header
+    if interlace:
+        raise ValueError(f"{path}: PNG entrelazado; guárdalo sin entrelazar")
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}.get(color)
+    if channels is None or (color != 3 and depth != 8) or depth > 8:
+        raise ValueError(f"{path}: formato no admitido (tipo {color}, {depth} bits)")
+    stride = (width * channels * depth + 7) // 8
+    data = _unfilter(zlib.decompress(bytes(idat)), stride, height, max(1, channels * depth // 8))
+
+    if color == 3:
+        if depth == 8:
+            return width, height, bytes(data)
+        # Índices de menos de 8 bits: se separan como los bits de un tile 1bpp
+        per_byte = 8 // depth
+        mask = (1 << depth) - 1
+        tables = [bytes((b >> (8 - depth * (k + 1))) & mask for b in range(256)) for k in range(per_byte)]
+        pixels = bytearray(width * height)
+        for y in range(height):
+            row = bytes(data[y * stride:(y + 1) * stride])
+            wide = bytearray(stride * per_byte)
+            for k in range(per_byte):
+                wide[k::per_byte] = row.translate(tables[k])
+            pixels[y * width:(y + 1) * width] = wide[:width]
+        return width, height, bytes(pixels)
+
+    if palette is None:
+        raise ValueError(f"{path}: PNG sin paleta; hace falta la paleta con la que se exportó")
+    lookup: dict[tuple[int, int, int], int] = {}
+    for i, rgb in reversed(list(enumerate(palette))):   # con colores repetidos gana el primero
+        lookup[tuple(rgb)] = i
+    if color in (0, 4):
+        # Gris: una tabla de 256 entradas y bytes.translate
+        gray = bytes(data[0::channels])
+        table = bytes(lookup.get((v, v, v), _MISSING) for v in range(256))
+        pixels = gray.translate(table)
+        bad = pixels.find(_MISSING)
+        if bad != -1:
+            raise ValueError(f"{path}: el color #{bytes([gray[bad]] * 3).hex()} en "
+                             f"({bad % width}, {bad // width}) no está en la paleta")
+        return width, height, pixels
+    # RGB(A): los canales se separan con slices y cada terna se busca en C (zip/map)
+    colors = zip(data[0::channels], data[1::channels], data[2::channels])
+    try:
+        pixels = bytes(map(lookup.__getitem__, colors))
+    except KeyError as exc:
+        rgb = exc.args[0]
+        bad = next(i for i, c in enumerate(zip(data[0::channels], data[1::channels], data[2::channels]))
+                   if c == rgb)
+        raise ValueError(f"{path}: el color #{bytes(rgb).hex()} en ({bad % width}, {bad // width}) "
+                         f"no está en la paleta") from None
+    return width, height, pixels
+
+
+# ────────────────────────────────  Script  ───────────────────────────────────
+def _palette(data: bytes, args: argparse.Namespace) -> Palette:
+    if args.palette_offset is not None:
+        return cram_palette(data, args.palette_offset, COLORS[args.format])
+    return GRAY_PALETTE if args.format == "4bpp" else MONO_PALETTE
+
+
+def _tile_ranges(indices: list[int]) -> str:
+    """[0, 1, 2, 5] → "0-2, 5"."""
+    parts, start = [], None
+    for k, i in enumerate(indices):
+        if start is None:
+            start = i
+        if k + 1 == len(indices) or indices[k + 1] != i + 1:
+            parts.append(str(start) if start == i else f"{start}-{i}")
+            start = None
+    return ", ".join(parts)
+
+
+def export_mode(args: argparse.Namespace) -> None:
+    with RomImage.open(args.rom) as rom:
+        end = _check_range(len(rom), args.offset, args.count, args.format)
+        with instrument.phase("decodificar"):
+            pixels = unpack_tiles(rom[args.offset:end], args.format)
+            palette = _palette(rom, args)
+            instrument.count("tiles", args.count)
+    with instrument.phase("guardar PNG"):
+        width, height, sheet = tiles_to_sheet(pixels, args.columns)
+        write_png(args.png, width, height, sheet, palette, args.scale)
+        instrument.add_written(args.png)
+    print(f"✔ Exportados {args.count} tiles ({width * args.scale}×{height * args.scale} px) → {args.png}")
+
+
+def import_mode(args: argparse.Namespace) -> None:
+    size = TILE_BYTES[args.format]
+    with RomImage.open(args.rom) as rom:
+        end = _check_range(len(rom), args.offset, args.count, args.format)
+        cols, rows = sheet_size(args.count, args.columns)
+        with instrument.phase("leer PNG"):
+            width, height, sheet = read_png(args.png, _palette(rom, args))
+            instrument.add_read(args.png)
+        scale = width // (cols * TILE_W)
+        if scale < 1 or width != cols * TILE_W * scale or height != rows * TILE_H * scale:
+            raise SystemExit(f"❌ {args.png} mide {width}×{height}; para {args.count} tiles en "
+                             f"{cols} columnas se esperaba {cols * TILE_W}×{rows * TILE_H} (o un múltiplo)")
+        if scale > 1:
+            # Un píxel de cada bloque scale×scale
+            small = bytearray()
+            for y in range(0, height, scale):
+                small += sheet[y * width:(y + 1) * width:scale]
+            sheet, width = bytes(small), width // scale
+
+        with instrument.phase("codificar"):
+            try:
+                new = pack_tiles(sheet_to_tiles(sheet, width, args.count), args.format)
+            except ValueError as exc:
+                raise SystemExit(f"❌ {args.png}: {exc}")
+            old = rom[args.offset:end]
+            changed = [t for t in range(args.count)
+                       if old[t * size:(t + 1) * size] != new[t * size:(t + 1) * size]]
+            instrument.count("tiles", len(changed))
+        if not changed:
+            print("No cambia ningún tile")
+            return
+        print(f"Tiles cambiados ({len(changed)} de {args.count}): {_tile_ranges(changed)}")
+        for t in changed if args.verbose else ():
+            print(f"  tile {t:>4}  0x{args.offset + t * size:06X}")
+        if args.dry_run:
+            return
+        with instrument.phase("insertar"):
+            for t in changed:
+                at = args.offset + t * size
+                rom[at:at + size] = new[t * size:(t + 1) * size]
+        with instrument.phase("guardar ROM"):
+            instrument.add_written(rom.write_to(args.output))
+            print(f"✔ ROM guardada: {args.output}")
+            if args.ips:
+                import fix_rom_traysia_shinyuden_anticrash as anticrash
+                anticrash.build_ips(rom.patches(), args.ips)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Exporta e importa tiles de Mega Drive como hojas PNG")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_exp = sub.add_parser("export", help="Guarda un rango de tiles como hoja PNG")
+    p_exp.add_argument("rom", help="Ruta a la ROM")
+    p_exp.add_argument("offset", type=lambda x: int(x, 0), help="Offset del primer tile")
+    p_exp.add_argument("count", type=int, help="Número de tiles")
+    p_exp.add_argument("png", help="Hoja PNG de salida")
+    p_exp.add_argument("--scale", type=int, default=1, help="Ampliación de la hoja (por defecto: 1)")
+
+    p_imp = sub.add_parser("import", help="Inserta en la ROM una hoja PNG editada")
+    p_imp.add_argument("rom", help="Ruta a la ROM original")
+    p_imp.add_argument("offset", type=lambda x: int(x, 0), help="Offset del primer tile")
+    p_imp.add_argument("count", type=int, help="Número de tiles")
+    p_imp.add_argument("png", help="Hoja PNG editada (la ampliación se deduce del tamaño)")
+    p_imp.add_argument("-o", "--output", help="ROM modificada")
+    p_imp.add_argument("--ips", nargs="?", const="patches/tiles.ips", default=None,
+                       help="Genera además el IPS respecto a la ROM original (por defecto: patches/tiles.ips)")
+    p_imp.add_argument("--dry-run", action="store_true", help="Solo indica qué tiles cambiarían")
+    p_imp.add_argument("-v", "--verbose", action="store_true", help="Lista el offset de cada tile cambiado")
+
+    for p in (p_exp, p_imp):
+        p.add_argument("--format", choices=tuple(TILE_BYTES), default="4bpp",
+                       help="Formato de los tiles (por defecto: 4bpp)")
+        p.add_argument("--columns", type=int, default=DEFAULT_COLUMNS,
+                       help=f"Tiles por fila de la hoja (por defecto: {DEFAULT_COLUMNS})")
+        p.add_argument("--palette-offset", type=lambda x: int(x, 0), metavar="OFFSET",
+                       help="Paleta CRAM de la ROM (16 palabras; 2 en 1bpp). Sin ella, grises")
+        instrument.add_arguments(p)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "import" and not (args.output or args.dry_run):
+        parser.error("import necesita -o/--output (o --dry-run)")
+    with instrument.session(args, f"md_tiles {args.cmd}"):
+        try:
+            if args.cmd == "export":
+                export_mode(args)
+            else:
+                import_mode(args)
+        except ValueError as exc:
+            raise SystemExit(f"❌ {exc}")
+
+
+if __name__ == "__main__":
+    main()
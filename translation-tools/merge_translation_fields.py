@@ -1,7 +1,9 @@
-import json
 import sys
 from pathlib import Path
 
+from align_translations import Alignment, Match, align, iter_pairs, normalize, report, source_text
+from entry_store import EntryStore
+
 # Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
 try:
     sys.stdout.reconfigure(errors="replace")
@@ -17,25 +19,62 @@ for p in (legacy_path, new_path):
     if not p.exists():
         raise SystemExit(f"❌ No se encuentra {p}. Ejecuta el script desde la raíz del repositorio.")
 
-# Cargar datos
-old_data = json.loads(legacy_path.read_text(encoding="utf-8"))
-new_data = json.loads(new_path.read_text(encoding="utf-8"))
-
-# Crear mapas por offset
-old_by_offset = {entry["offset"]: entry for entry in old_data}
-new_by_offset = {entry["offset"]: entry for entry in new_data}
-
-# Mezclar los datos por coincidencia de offset
-merged = []
-for offset, new_entry in new_by_offset.items():
-    merged_entry = new_entry.copy()
-    if offset in old_by_offset:
-        old_entry = old_by_offset[offset]
-        for key in ("text_translator", "text", "review"):
+# Cargar datos (por columnas; las filas se comportan como dicts)
+legacy = EntryStore.load(legacy_path)
+merged = EntryStore.load(new_path)
+old_data = list(legacy)
+new_data = list(merged)
+
+# 1. Emparejar por offset. Si la entrada antigua tiene text_source y no coincide
+#    con el original nuevo, la ROM ha desplazado cadenas: la pareja se aplaza.
+matches = []
+deferred = {}
+for i, j in merged.join(legacy):
+    if j is None:
+        continue
+    old_source = old_data[j].get("text_source")
+    if old_source is None or normalize(old_source) == normalize(source_text(new_data[i])):
+        matches.append(Match(j, i, "offset", 1.0))
+    else:
+        deferred[i] = j
+
+# 2. Realinear por contenido las que quedan libres. Solo las antiguas con un
+#    text_source real: `text` es la traducción y no sirve para emparejar.
+paired_old = {m.old for m in matches}
+paired_new = {m.new for m in matches}
+old_free = [j for j in range(len(old_data))
+            if j not in paired_old and old_data[j].get("text_source") is not None]
+new_free = [i for i in range(len(new_data)) if i not in paired_new]
+content = align([old_data[j] for j in old_free], [new_data[i] for i in new_free])
+for m in content.matches:
+    matches.append(Match(old_free[m.old], new_free[m.new], m.kind, m.score))
+
+# 3. Las parejas aplazadas que nadie ha reclamado vuelven a su offset (a revisar)
+paired_old = {m.old for m in matches}
+paired_new = {m.new for m in matches}
+for i, j in deferred.items():
+    if i not in paired_new and j not in paired_old:
+        matches.append(Match(j, i, "offset", 0.0))
+
+alignment = Alignment(matches, len(old_data), len(new_data))
+# Antes de completar las filas: el informe muestra el original de cada una
+report(alignment, old_data, new_data)
+stale = sum(1 for j in alignment.unmatched_old if old_data[j].get("text_source") is None)
+if stale:
+    print(f"⚠ {stale} entradas antiguas sin pareja por offset ni text_source: "
+          "ejecuta antes add_text_source.py con la exportación anterior")
+
+# Las filas nuevas se completan en el sitio: `merged` es el resultado
+for new_entry, old_entry, match in iter_pairs(alignment, old_data, new_data):
+    if old_entry is not None:
+        for key in ("text_translator", "provider", "text", "review"):
             if key in old_entry:
-                merged_entry[key] = old_entry[key]
-    merged.append(merged_entry)
+                new_entry[key] = old_entry[key]
+        # El original ha cambiado (o el hueco es distinto): hay que revisarla
+        if match.kind not in ("exact", "offset") or match.score < 1.0 \
+                or old_entry.get("length") != new_entry["length"]:
+            new_entry["review"] = True
 
 # Guardar el resultado
-output_path.write_text(json.dumps(merged, ensure_ascii=False, indent=2), encoding="utf-8")
+merged.save(output_path)
 print(f"✔ Archivo combinado guardado como {output_path.name}")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Vista previa de las ventanas de diálogo traducidas, en hojas PNG.
+
+Para comprobar una entrada marcada con `"review": true` hoy hay que arrancar
+el emulador y jugar hasta esa línea. Este script dibuja cada cadena con la
+fuente de la propia ROM, con los mismos saltos de línea '@' que el juego, y
+junta las ventanas en hojas de contactos PNG:
+
+  - Cada ventana lleva encima su offset; lo que se sale del ancho de la
+    ventana (`--window-width`) se dibuja sobre fondo rojo.
+  - Los glifos se decodifican una sola vez (md_tiles.py) y se copian fila a
+    fila en un búfer de bytes; las hojas se reparten entre varios procesos.
+  - Los PNG se escriben sin fechas ni metadatos: la misma ROM y el mismo
+    JSON producen exactamente los mismos archivos.
+
+La fuente se describe con las mismas opciones que `text_width.py extract`.
+
+Uso:
+    python translation-tools/preview_text.py "roms/Traysia (W).bin" translations/german.json -o preview/ --font-offset 0x...
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import md_tiles
+import translate_spanish
+from text_width import (BREAK, DEFAULT_WINDOW_WIDTH, FontMetrics, add_font_arguments,
+                        base_glyph, metrics_from_args)
+from translation_io import iter_entries, save_entries
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+# Paleta: 0-15 son los colores de los glifos (0 = fondo de la ventana)
+WINDOW_BG, SHEET_BG, OVERFLOW_BG, LABEL = 0, 16, 17, 18
+PALETTE = ([(16, 24, 72)] + [(255 * i // 15,) * 3 for i in range(1, 16)]
+           + [(32, 32, 32), (120, 24, 24), (255, 208, 64)])
+OVERFLOW_PAD = 64     # píxeles visibles a la derecha de la ventana
+GAP = 4
+MAX_LINES = 8
+SHEET_NAME = "preview_{:03d}.png"
+
+# Los glifos vacíos se pintan con el fondo de la zona
+_TO_OVERFLOW = bytes([OVERFLOW_BG] + list(range(1, 256)))
+_TO_LABEL = bytes([SHEET_BG] + [LABEL] * 255)
+
+# Estado de cada proceso (lo fija _init_worker)
+_FONT: dict = {}
+
+
+def load_glyphs(data: bytes, args: argparse.Namespace) -> dict[str, list[bytes]]:
+    """Filas de píxeles de cada glifo, listas para copiar al búfer."""
+    per_glyph = max(1, args.height // md_tiles.TILE_H)
+    tiles = md_tiles.decode_tiles(data, args.font_offset, args.count * per_glyph, args.format)
+    # En 1bpp el único color es el 1: se dibuja en blanco
+    color = 15 if args.format == "1bpp" else 1
+    glyphs = {}
+    for i in range(args.count):
+        rows = [row for tile in tiles[i * per_glyph:(i + 1) * per_glyph] for row in tile]
+        ch = bytes([args.first_code + i]).decode("latin-1", errors="replace")
+        glyphs[ch] = [bytes(p * color for p in row) for row in rows]
+    return glyphs
+
+
+def _init_worker(font: dict) -> None:
+    _FONT.update(font)
+    _FONT["metrics"] = FontMetrics(font["widths"], font["default"], translit=False)
+
+
+def _draw_line(text: str, box_w: int, window: Optional[int]) -> list[bytearray]:
+    glyphs, memo = _FONT["glyphs"], _FONT["metrics"]._memo
+    height = _FONT["glyph_h"]
+    rows = [bytearray(box_w) for _ in range(height)]
+    fallback = glyphs.get("?")
+    x = 0
+    for ch in text:
+        if x >= box_w:
+            break
+        glyph = glyphs.get(base_glyph(ch), fallback)
+        if glyph is not None:
+            n = min(md_tiles.TILE_W, box_w - x)
+            for row, src in zip(rows, glyph):
+                row[x:x + n] = src[:n]
+        x += memo[ch]
+    if window is not None and window < box_w:
+        for row in rows:
+            row[window:] = row[window:].translate(_TO_OVERFLOW)
+    return rows
+
+
+def render_sheet(job: tuple[int, list[tuple[int, str]], str]) -> str:
+    """Dibuja una hoja con sus entradas (offset, texto) y la guarda en PNG."""
+    index, items, out_dir = job
+    window, columns = _FONT["window"], _FONT["columns"]
+    glyph_h = _FONT["glyph_h"]
+    line_h = glyph_h + 2
+    box_w = window + OVERFLOW_PAD
+    lines = min(MAX_LINES, max(text.count(BREAK) + 1 for _, text in items))
+    cell_w, cell_h = box_w + GAP, line_h * (lines + 1) + GAP
+    rows_used = -(-len(items) // columns)
+    width, height = GAP + cell_w * columns, GAP + cell_h * rows_used
+    canvas = bytearray([SHEET_BG]) * (width * height)
+
+    def paste(rows: list[bytearray], x0: int, y0: int) -> None:
+        for dy, row in enumerate(rows):
+            start = (y0 + dy) * width + x0
+            canvas[start:start + len(row)] = row
+
+    for n, (offset, text) in enumerate(items):
+        x0 = GAP + (n % columns) * cell_w
+        y0 = GAP + (n // columns) * cell_h
+        label = [row.translate(_TO_LABEL) for row in _draw_line(f"0x{offset:X}", box_w, None)]
+        paste(label, x0, y0)
+        # Fondo de la ventana y de la zona de desbordamiento
+        blank = bytearray(window) + bytearray([OVERFLOW_BG]) * OVERFLOW_PAD
+        paste([blank] * (line_h * lines), x0, y0 + line_h)
+        for k, line in enumerate(text.split(BREAK)[:lines]):
+            paste(_draw_line(line, box_w, window), x0, y0 + line_h * (k + 1) + 1)
+
+    path = os.path.join(out_dir, SHEET_NAME.format(index))
+    md_tiles.write_png(path, width, height, canvas, PALETTE, _FONT["scale"])
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hojas PNG con la vista previa de las ventanas de diálogo")
+    parser.add_argument("rom", help="ROM con la fuente")
+    parser.add_argument("json_file", help="Archivo JSON (o .jsonl) con las traducciones")
+    parser.add_argument("-o", "--output", required=True, help="carpeta de salida")
+    add_font_arguments(parser)
+    parser.add_argument("--window-width", type=int, default=DEFAULT_WINDOW_WIDTH,
+                        help=f"ancho útil de la ventana en píxeles (por defecto: {DEFAULT_WINDOW_WIDTH})")
+    parser.add_argument("--all", action="store_true",
+                        help='todas las entradas (por defecto solo las marcadas con "review": true)')
+    parser.add_argument("--columns", type=int, default=2, help="ventanas por fila de la hoja")
+    parser.add_argument("--per-sheet", type=int, default=32, help="ventanas por hoja")
+    parser.add_argument("--scale", type=int, default=2, help="ampliación de los píxeles")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="procesos en paralelo (por defecto: uno por núcleo)")
+    parser.add_argument("--no-translit", action="store_true",
+                        help="No transliterar caracteres alemanes (ä→ae...) al dibujar")
+    args = parser.parse_args()
+
+    data = Path(args.rom).read_bytes()
+    metrics = metrics_from_args(data, args)
+    translit = not args.no_translit
+    items = [(e["offset"], translate_spanish.transliterate_de(e.get("text", "")) if translit
+              else e.get("text", ""))
+             for e in iter_entries(args.json_file) if args.all or e.get("review") is True]
+    if not items:
+        print("✓ No hay entradas que previsualizar.")
+        return
+
+    out_dir = Path(args.output)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    font = {"glyphs": load_glyphs(data, args), "widths": metrics.widths,
+            "default": metrics.default, "glyph_h": max(md_tiles.TILE_H, args.height),
+            "window": args.window_width, "columns": max(1, args.columns), "scale": max(1, args.scale)}
+    per_sheet = max(1, args.per_sheet)
+    jobs = [(i, items[start:start + per_sheet], str(out_dir))
+            for i, start in enumerate(range(0, len(items), per_sheet))]
+
+    with ProcessPoolExecutor(args.jobs, initializer=_init_worker, initargs=(font,)) as pool:
+        paths = list(pool.map(render_sheet, jobs))
+
+    # Hojas sobrantes de una ejecución anterior con más entradas
+    n = len(paths)
+    while (stale := out_dir / SHEET_NAME.format(n)).exists():
+        stale.unlink()
+        n += 1
+    save_entries(out_dir / "index.json",
+                 ({"sheet": SHEET_NAME.format(i), "offset": off, "offset_hex": f"0x{off:X}", "text": text}
+                  for i, _items, _d in jobs for off, text in _items))
+    print(f"✔ {len(items)} ventanas en {len(paths)} hojas → {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Mapa del espacio libre de la ROM y asignador de huecos.
+
+Ninguna herramienta sabía dónde hay espacio libre: el parche Anticrash
+reaprovecha bytes en su sitio y la importación de textos solo puede
+sobrescribir cada cadena en su hueco. Este módulo:
+
+  1. Busca tramos largos de relleno (`0xFF` o `0x00`) con una única
+     expresión regular, que recorre la ROM en C sin bucles de Python.
+  2. Los contrasta con las referencias: todos los valores de 32 bits
+     alineados a 2 bytes que caen dentro de la ROM se tratan como posibles
+     punteros (`lea`, `jmp`, tablas...). Si alguno apunta dentro de un tramo,
+     el tramo se corta antes de esa dirección: ahí pueden empezar datos que
+     casualmente son todo ceros.
+  3. Excluye siempre la cabecera y los vectores, los bloques de texto
+     conocidos (translate_spanish.BLOCKS y el guion inglés) y los puntos
+     del parche Anticrash.
+
+El mapa se guarda en `.cache/freespace/` indexado por el SHA1 de la ROM y
+los parámetros, así que las siguientes consultas son instantáneas.
+`Allocator` reparte los huecos (primer ajuste o mejor ajuste, con
+alineación) a quien los pida:
+
+    free = Allocator.for_rom(data)
+    offset = free.alloc(len(code), align=2)
+
+Hoy lo usa `translate_spanish.py import --relocate` (ImportPlan.relocate) para
+mover los textos que no caben en su hueco. El parche Anticrash y build_rom
+siguen escribiendo en posiciones fijas: sus cambios reaprovechan bytes en su
+sitio y no necesitan espacio nuevo.
+
+Uso:
+    python translation-tools/rom_freespace.py "roms/Traysia (W).bin"
+    python translation-tools/rom_freespace.py "roms/Traysia (W).bin" --alloc 0x400 --alloc 96
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Iterable, Optional
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+import tools_path
+tools_path.enable()
+
+import fix_rom_traysia_shinyuden_anticrash as anticrash
+import switch_to_english
+import translate_spanish
+
+# Se incrementa si cambia el algoritmo o el formato del mapa
+MAP_VERSION = 1
+DEFAULT_CACHE_DIR = ".cache/freespace"
+DEFAULT_MIN_LEN = 256
+# Bytes respetados al principio de cada tramo: el final de los datos
+# anteriores (un terminador, una tabla acabada en ceros...) puede ser relleno
+DEFAULT_GUARD = 16
+FILL_BYTES = (0xFF, 0x00)
+# Cabecera de Mega Drive: vectores (0x000-0x0FF) y cabecera (0x100-0x1FF)
+HEADER = (0x000, 0x200)
+
+
+def reserved_ranges() -> list[tuple[int, int]]:
+    """Zonas que nunca se consideran libres aunque parezcan relleno."""
+    ranges = [HEADER]
+    ranges += [(start, end) for start, end in translate_spanish.BLOCKS]
+    ranges.append((switch_to_english.DEFAULT_ENGLISH_OFFSET, switch_to_english.DEFAULT_ENGLISH_END))
+    ranges += [(off, off + len(new)) for off, _old, new in anticrash.PATCHES]
+    return sorted(ranges)
+
+
+def pointer_targets(data: bytes) -> list[int]:
+    """Valores de 32 bits big-endian, en offsets pares, que caen dentro de la ROM."""
+    size = len(data)
+    targets: set[int] = set()
+    for start in (0, 2):
+        usable = (size - start) // 4 * 4
+        words = array("I", data[start:start + usable])
+        if words.itemsize != 4:          # plataformas con int de 8 bytes
+            words = array("L", data[start:start + usable])
+        if sys.byteorder == "little":
+            words.byteswap()
+        targets.update(words)
+    return sorted(v for v in targets if v < size)
+
+
+def _subtract(runs: list[tuple[int, int, int]], holes: Iterable[tuple[int, int]]) -> list[tuple[int, int, int]]:
+    """Quita de `runs` (inicio, fin, relleno) los intervalos de `holes`."""
+    out = []
+    holes = sorted(holes)
+    for start, end, fill in runs:
+        pieces = [(start, end)]
+        for h0, h1 in holes:
+            if h0 >= end:
+                break
+            if h1 <= start:
+                continue
+            nxt = []
+            for p0, p1 in pieces:
+                if h1 <= p0 or h0 >= p1:
+                    nxt.append((p0, p1))
+                    continue
+                if p0 < h0:
+                    nxt.append((p0, h0))
+                if h1 < p1:
+                    nxt.append((h1, p1))
+            pieces = nxt
+        out.extend((p0, p1, fill) for p0, p1 in pieces)
+    return out
+
+
+def scan(data: bytes, min_len: int = DEFAULT_MIN_LEN, guard: int = DEFAULT_GUARD,
+         reserved: Optional[list[tuple[int, int]]] = None) -> dict:
+    """Calcula el mapa: tramos libres y tramos descartados por referencias."""
+    if reserved is None:
+        reserved = reserved_ranges()
+    pattern = re.compile(b"|".join(re.escape(bytes([b])) + b"{%d,}" % min_len for b in FILL_BYTES))
+    runs = [(m.start() + guard, m.end(), m.group()[0]) for m in pattern.finditer(data)]
+    runs = [r for r in _subtract(runs, reserved) if r[1] - r[0] >= min_len]
+
+    targets = pointer_targets(data)
+    free, referenced = [], []
+    for start, end, fill in runs:
+        k = bisect_left(targets, start)
+        if k < len(targets) and targets[k] < end:
+            # Hay un posible puntero dentro: solo es seguro lo anterior a él
+            first = targets[k]
+            referenced.append([first, end, fill])
+            end = first
+        if end - start >= min_len:
+            free.append([start, end, fill])
+    return {"runs": free, "referenced": referenced}
+
+
+def _cache_path(cache_dir: Path, digest: str, params: dict) -> Path:
+    key = hashlib.sha1(json.dumps([MAP_VERSION, params], sort_keys=True).encode()).hexdigest()[:12]
+    return cache_dir / f"{digest[:16]}-{key}.json"
+
+
+def load_map(data: bytes, min_len: int = DEFAULT_MIN_LEN, guard: int = DEFAULT_GUARD,
+             cache_dir: Optional[Path | str] = DEFAULT_CACHE_DIR) -> dict:
+    """Mapa de la ROM, desde la cache si ya se calculó para este SHA1."""
+    digest = hashlib.sha1(data).hexdigest()
+    reserved = reserved_ranges()
+    params = {"min_len": min_len, "guard": guard, "reserved": reserved}
+    path = _cache_path(Path(cache_dir), digest, params) if cache_dir else None
+    if path and path.exists():
+        return json.loads(path.read_text("utf-8"))
+    result = {"sha1": digest, "size": len(data), **params, **scan(data, min_len, guard, reserved)}
+    if path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(result), "utf-8")
+        os.replace(tmp, path)
+    return result
+
+
+class Allocator:
+    """Reparte los huecos libres de la ROM (intervalos [inicio, fin))."""
+
+    def __init__(self, runs: Iterable[tuple[int, int]]):
+        self.free: list[tuple[int, int]] = sorted((s, e) for s, e in runs if e > s)
+        self.allocated: list[tuple[int, int]] = []
+
+    @classmethod
+    def for_rom(cls, data: bytes, cache_dir: Optional[Path | str] = DEFAULT_CACHE_DIR,
+                **kwargs) -> "Allocator":
+        space = load_map(data, cache_dir=cache_dir, **kwargs)
+        return cls((start, end) for start, end, _fill in space["runs"])
+
+    @property
+    def free_bytes(self) -> int:
+        return sum(e - s for s, e in self.free)
+
+    @property
+    def largest(self) -> int:
+        return max((e - s for s, e in self.free), default=0)
+
+    def alloc(self, size: int, align: int = 1, strategy: str = "first") -> int:
+        """Reserva `size` bytes alineados a `align` y devuelve su offset.
+
+        `strategy="first"` toma el primer hueco (el de offset más bajo) en el
+        que cabe; `"best"` el que deja menos sobrante.
+        """
+        if size <= 0:
+            raise ValueError("El tamaño debe ser positivo")
+        if align <= 0:
+            raise ValueError("La alineación debe ser positiva")
+        best = None
+        for k, (start, end) in enumerate(self.free):
+            at = -(-start // align) * align
+            # `at` ya salta el relleno de alineación
+            if at + size > end:
+                continue
+            # Sobrante aprovechable: lo que queda detrás; el relleno no sirve
+            spare = end - at - size
+            if best is None or spare < best[0]:
+                best = (spare, k, at)
+            if strategy == "first":
+                break
+        if best is None:
+            raise ValueError(f"No hay un hueco libre de {size} bytes (alineado a {align}); "
+                             f"el mayor tiene {self.largest}")
+        _spare, k, at = best
+        start, end = self.free.pop(k)
+        for piece in ((start, at), (at + size, end)):
+            if piece[1] > piece[0]:
+                insort(self.free, piece)
+        insort(self.allocated, (at, at + size))
+        return at
+
+    def reserve(self, start: int, end: int) -> None:
+        """Marca [start, end) como ocupado (p.ej. por otro parche ya aplicado)."""
+        runs = _subtract([(s, e, 0) for s, e in self.free], [(start, end)])
+        self.free = [(s, e) for s, e, _f in runs]
+
+
+# ─────────────────────────────────  CLI  ─────────────────────────────────────
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mapa del espacio libre de la ROM")
+    parser.add_argument("rom", help="ROM a analizar")
+    parser.add_argument("--min-len", type=int, default=DEFAULT_MIN_LEN,
+                        help=f"longitud mínima de un tramo libre (por defecto: {DEFAULT_MIN_LEN})")
+    parser.add_argument("--guard", type=int, default=DEFAULT_GUARD,
+                        help=f"bytes respetados al principio de cada tramo (por defecto: {DEFAULT_GUARD})")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="cache del mapa ('' para desactivarla)")
+    parser.add_argument("--top", type=int, default=20, help="tramos a listar")
+    parser.add_argument("--alloc", type=lambda v: int(v, 0), action="append", default=[],
+                        metavar="SIZE", help="simular la reserva de SIZE bytes (repetible)")
+    parser.add_argument("--align", type=int, default=2, help="alineación de --alloc")
+    parser.add_argument("--best-fit", action="store_true", help="usar mejor ajuste en --alloc")
+    args = parser.parse_args(argv)
+
+    data = Path(args.rom).read_bytes()
+    space = load_map(data, args.min_len, args.guard, args.cache_dir or None)
+    runs = space["runs"]
+    total = sum(e - s for s, e, _f in runs)
+    print(f"Espacio libre: {total} bytes en {len(runs)} tramos (≥ {args.min_len} bytes)")
+    for start, end, fill in sorted(runs, key=lambda r: r[0] - r[1])[:args.top]:
+        print(f"  0x{start:06X}-0x{end:06X}  {end - start:>8} bytes  relleno 0x{fill:02X}")
+    if space["referenced"]:
+        lost = sum(e - s for s, e, _f in space["referenced"])
+        print(f"  {len(space['referenced'])} tramos recortados por posibles punteros ({lost} bytes descartados)")
+
+    if args.alloc:
+        free = Allocator((s, e) for s, e, _f in runs)
+        for size in args.alloc:
+            try:
+                at = free.alloc(size, args.align, "best" if args.best_fit else "first")
+            except ValueError as exc:
+                raise SystemExit(f"❌ {exc}")
+            print(f"  alloc({size}) → 0x{at:06X}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Importación transaccional de traducciones en la ROM.
+
+Es la única ruta que escribe traducciones en la ROM (`translate_spanish.py
+import` y el paso de importación de `build_rom.py`). Antes se escribían las
+entradas en el orden del archivo y se paraba en la primera que no cabía, sin
+comprobar solapes ni los bloques de texto. `ImportPlan`:
+
+  1. Carga uno o varios fragmentos JSON/JSONL, codifica todas las entradas
+     y las ordena por offset en un índice de intervalos (inicios ordenados
+     más el máximo acumulado de los finales, para buscar solapes con bisect).
+  2. Valida todo en una pasada: entradas mal formadas, límites de la ROM,
+     pertenencia a `BLOCKS`, solapes entre entradas (también entre
+     fragmentos distintos) y que cada texto quepa en su hueco. Devuelve
+     todos los problemas a la vez; la misma entrada repetida con el mismo
+     contenido en dos fragmentos no es un problema.
+  3. Solo si no hay ninguno, aplica las escrituras en orden de offset en una
+     pasada secuencial (sobre una RomImage, que luego se vuelca de una vez).
+
+`diff` compara el plan con la ROM sin escribir nada y da los tramos de bytes
+que cambiarían, para el modo `--dry-run` de `translate_spanish.py import`.
+
+`relocate` (`--relocate`) mueve a espacio libre las entradas que no caben en
+su hueco: pide sitio al `Allocator` de rom_freespace y reescribe los punteros
+absolutos a la cadena (32 bits big-endian en offset par: operandos de `lea`,
+tablas de punteros). Las cadenas sin ningún puntero así siguen siendo un
+problema "largo": se llegan a ellas de otra forma y moverlas las rompería.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Sequence
+
+from translate_spanish import BLOCKS, encode_custom
+from translation_io import iter_entries
+
+# Dos cambios separados por menos de DIFF_GAP bytes iguales van en el mismo tramo
+DIFF_GAP = 4
+DIFF_BYTES = 16       # bytes mostrados de cada lado por tramo
+DEFAULT_DIFF_LIMIT = 50
+
+
+class Edit(NamedTuple):
+    offset: int
+    length: int
+    data: bytes       # texto codificado + 0x00, relleno hasta `length`
+    source: str       # "archivo:índice" de la entrada
+    kind: str = "texto"   # "texto" | "reubicada" | "puntero" (fuera de BLOCKS)
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.length
+
+
+class Problem(NamedTuple):
+    kind: str
+    offset: Optional[int]
+    source: str
+    message: str
+
+    def __str__(self) -> str:
+        where = f"0x{self.offset:X}" if self.offset is not None else "-"
+        return f"{where:>9}  {self.source}: {self.message}"
+
+
+class ImportPlan:
+    """Entradas codificadas y ordenadas por offset, listas para validar y aplicar."""
+
+    def __init__(self, edits: Iterable[Edit], problems: Iterable[Problem] = (),
+                 overflows: Iterable[Edit] = ()):
+        self.problems = list(problems)
+        # Entradas que no caben (con su texto completo): candidatas a `relocate`
+        self.overflows = list(overflows)
+        self._build(edits)
+
+    def _build(self, edits: Iterable[Edit]) -> None:
+        self.edits = sorted(edits, key=lambda e: (e.offset, e.length))
+        self.starts = array("q", (e.offset for e in self.edits))
+        # max_end[i] = mayor final entre las entradas 0..i (poda las búsquedas de solapes)
+        self.max_end = array("q")
+        reach = -1
+        for e in self.edits:
+            reach = max(reach, e.end)
+            self.max_end.append(reach)
+
+    @classmethod
+    def from_entries(cls, fragments: Iterable[tuple[str, Iterable[dict]]],
+                     encoding: str = "latin-1",
+                     encode: Callable[[str, str], bytes] = encode_custom) -> "ImportPlan":
+        """`fragments`: pares (nombre, entradas).
+
+        `encode` es `translate_spanish.encode_custom` salvo cuando translate_spanish
+        se ejecuta como script: entonces se pasa la de `__main__`, que es la que
+        ve `--no-translit`.
+        """
+        edits: list[Edit] = []
+        problems: list[Problem] = []
+        overflows: list[Edit] = []
+        for name, entries in fragments:
+            for n, entry in enumerate(entries):
+                source = f"{name}:{n}"
+                offset, length, text = entry.get("offset"), entry.get("length"), entry.get("text")
+                if type(offset) is not int or type(length) is not int or not isinstance(text, str):
+                    problems.append(Problem("entrada", offset if type(offset) is int else None, source,
+                                            "faltan offset/length/text o no son válidos"))
+                    continue
+                if length <= 0:
+                    problems.append(Problem("entrada", offset, source, f"length no válido ({length})"))
+                    continue
+                encoded = encode(text, encoding)
+                if len(encoded) >= length:
+                    problems.append(Problem("largo", offset, source,
+                                            f"necesita {len(encoded) + 1} bytes, reservados {length}: «{_short(text)}»"))
+                    overflows.append(Edit(offset, len(encoded) + 1, encoded + b"\x00", source, "reubicada"))
+                    continue
+                edits.append(Edit(offset, length, (encoded + b"\x00").ljust(length, b"\x00"), source))
+        return cls(edits, problems, overflows)
+
+    @classmethod
+    def from_files(cls, paths: Sequence[Path | str], encoding: str = "latin-1",
+                   encode: Callable[[str, str], bytes] = encode_custom) -> "ImportPlan":
+        return cls.from_entries(((Path(p).name, iter_entries(p)) for p in paths), encoding, encode)
+
+    def __len__(self) -> int:
+        return len(self.edits)
+
+    def _touching(self, start: int, end: int, below: Optional[int] = None) -> Iterator[int]:
+        """Índices (de mayor a menor) de las entradas que tocan [start, end)."""
+        i = bisect_left(self.starts, end) if below is None else below
+        i -= 1
+        while i >= 0 and self.max_end[i] > start:
+            if self.edits[i].end > start:
+                yield i
+            i -= 1
+
+    def overlapping(self, start: int, end: int) -> list[Edit]:
+        """Entradas que tocan algún byte de [start, end)."""
+        return [self.edits[i] for i in reversed(list(self._touching(start, end)))]
+
+    def validate(self, rom_size: int,
+                 blocks: Optional[Sequence[tuple[int, int]]] = BLOCKS) -> list[Problem]:
+        """Todos los problemas del plan (incluidos los de carga); [] si se puede aplicar.
+
+        Quita del plan las repeticiones exactas de una entrada.
+        """
+        problems = list(self.problems)
+        seen: set[tuple[int, int, bytes]] = set()
+        unique = [e for e in self.edits
+                  if e[:3] not in seen and not seen.add(e[:3])]
+        if len(unique) != len(self.edits):
+            self._build(unique)
+        spans = sorted(blocks) if blocks is not None else None
+        span_starts = [s for s, _ in spans] if spans is not None else []
+        for i, e in enumerate(self.edits):
+            if e.offset < 0 or e.end > rom_size:
+                problems.append(Problem("rom", e.offset, e.source,
+                                        f"0x{e.offset:X}-0x{e.end:X} fuera de la ROM ({rom_size} bytes)"))
+            elif spans is not None and e.kind == "texto":
+                k = bisect_right(span_starts, e.offset) - 1
+                if k < 0 or e.end > spans[k][1]:
+                    problems.append(Problem("bloque", e.offset, e.source,
+                                            f"0x{e.offset:X}-0x{e.end:X} fuera de los bloques de texto"))
+            # Solapes: contra las entradas anteriores que siguen abiertas
+            for k in reversed(list(self._touching(e.offset, e.end, below=i))):
+                other = self.edits[k]
+                kind = "mismo offset" if other.offset == e.offset else "solape"
+                problems.append(Problem("solape", e.offset, e.source,
+                                        f"{kind} con {other.source} (0x{other.offset:X}-0x{other.end:X})"))
+        problems.sort(key=lambda p: (p.offset if p.offset is not None else -1, p.source))
+        return problems
+
+    def relocate(self, rom, allocator, align: int = 2) -> int:
+        """Mueve las entradas que no caben a huecos de `allocator`; devuelve cuántas.
+
+        Cada entrada movida añade al plan su texto en el hueco nuevo y una
+        escritura de 4 bytes por puntero, y deja de ser un problema "largo".
+        """
+        moved: set[tuple[int, str]] = set()
+        edits = list(self.edits)
+        for e in self.overflows:
+            refs = references(rom, e.offset)
+            if not refs:
+                continue
+            try:
+                at = allocator.alloc(e.length, align, "best")
+            except ValueError as exc:
+                self.problems.append(Problem("espacio", e.offset, e.source, str(exc)))
+                continue
+            edits.append(e._replace(offset=at))
+            target = at.to_bytes(4, "big")
+            edits.extend(Edit(ref, 4, target, f"{e.source} (puntero)", "puntero") for ref in refs)
+            moved.add((e.offset, e.source))
+        if moved:
+            self.problems = [p for p in self.problems
+                             if not (p.kind == "largo" and (p.offset, p.source) in moved)]
+            self.overflows = [e for e in self.overflows if (e.offset, e.source) not in moved]
+            self._build(edits)
+        return len(moved)
+
+    def apply(self, rom) -> int:
+        """Escribe el plan en `rom` (bytearray o RomImage) en orden; devuelve las entradas que cambian."""
+        changed = 0
+        for e in self.edits:
+            if rom[e.offset:e.end] != e.data:
+                rom[e.offset:e.end] = e.data
+                changed += 1
+        return changed
+
+    def diff(self, rom) -> Iterator[tuple[int, bytes, bytes, Edit]]:
+        """Tramos (offset, antes, después, entrada) que `apply` cambiaría.
+
+        Las entradas fuera de la ROM no dan tramos (ya las señala `validate`).
+        """
+        size = len(rom)
+        for e in self.edits:
+            if e.offset < 0 or e.end > size:
+                continue
+            old = bytes(rom[e.offset:e.end])
+            new = e.data
+            i, n = 0, len(new)
+            while i < n:
+                if old[i] == new[i]:
+                    i += 1
+                    continue
+                j = last = i
+                while j < n and j - last <= DIFF_GAP:
+                    if old[j] != new[j]:
+                        last = j
+                    j += 1
+                yield e.offset + i, old[i:last + 1], new[i:last + 1], e
+                i = last + 1
+
+
+def references(rom, offset: int) -> list[int]:
+    """Offsets pares donde la ROM contiene `offset` como valor de 32 bits big-endian."""
+    needle = offset.to_bytes(4, "big")
+    found = []
+    i = rom.find(needle)
+    while i != -1:
+        if i % 2 == 0:
+            found.append(i)
+        i = rom.find(needle, i + 1)
+    return found
+
+
+def _short(text: str, limit: int = 40) -> str:
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def _hex(data: bytes) -> str:
+    shown = data[:DIFF_BYTES].hex(" ")
+    return shown + (" …" if len(data) > DIFF_BYTES else "")
+
+
+def print_problems(problems: Sequence[Problem]) -> None:
+    counts: dict[str, int] = {}
+    for p in problems:
+        counts[p.kind] = counts.get(p.kind, 0) + 1
+    detail = ", ".join(f"{kind}: {n}" for kind, n in sorted(counts.items()))
+    print(f"❌ {len(problems)} problemas ({detail}); no se modifica la ROM:")
+    for p in problems:
+        print(f"  {p}")
+
+
+def print_diff(plan: ImportPlan, rom, limit: int = DEFAULT_DIFF_LIMIT) -> None:
+    runs = entries = changed = 0
+    last_edit = None
+    for offset, old, new, edit in plan.diff(rom):
+        runs += 1
+        changed += sum(a != b for a, b in zip(old, new))
+        if edit is not last_edit:
+            entries += 1
+            last_edit = edit
+        if not limit or runs <= limit:
+            print(f"  0x{offset:06X} {len(new):>4} B  {_hex(old)}  →  {_hex(new)}   [{edit.source}]")
+    if limit and runs > limit:
+        print(f"  … y {runs - limit} tramos más (--diff-limit 0 para verlos todos)")
+    print(f"Simulación: {len(plan)} entradas, {entries} con cambios, "
+          f"{changed} bytes distintos en {runs} tramos")
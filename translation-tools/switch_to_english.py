@@ -1,8 +1,13 @@
 """Switch the Spanish-language Traysia ROM to English by repointing text."""
 
-from pathlib import Path
 import argparse
 
+import tools_path
+tools_path.enable()
+
+import instrument
+from rom_image import RomImage
+
 DEFAULT_SPANISH_OFFSET = 0x100000  # address of Spanish script in Shinyuden ROM
 DEFAULT_ENGLISH_OFFSET = 0x07B706  # start of English script in Shinyuden ROM
 DEFAULT_ENGLISH_END = 0x0937C4     # end of English text block in Shinyuden ROM
@@ -32,9 +37,46 @@ def switch_to_english(rom_path: str, output_path: str,
                       length: int | None = None,
                       search_start: int | None = None,
                       search_end: int | None = None):
-    path = Path(rom_path)
-    data = bytearray(path.read_bytes())
+    # The ROM is memory-mapped; only the patched ranges are kept in memory
+    with RomImage.open(rom_path) as data:
+        with instrument.phase("repoint"):
+            counts = repoint_text(
+                data,
+                english_offset=english_offset,
+                spanish_offset=spanish_offset,
+                overwrite_spanish=overwrite_spanish,
+                skip_pointers=skip_pointers,
+                length=length,
+                search_start=search_start,
+                search_end=search_end,
+            )
+            instrument.count("pointers", sum(v for k, v in counts.items() if k != "overwrite"))
+        with instrument.phase("write ROM"):
+            instrument.add_written(data.write_to(output_path))
+    report_counts(counts)
+
+
+def report_counts(counts: dict[str, int]) -> None:
+    """Print the per-pattern replacement summary."""
+    total = sum(counts.values())
+    detail = ", ".join(f"{k}:{v}" for k, v in counts.items() if v)
+    print(f"Replaced {total} pointers ({detail or 'sin coincidencias'})")
 
+
+def repoint_text(data: bytearray | RomImage,
+                 english_offset: int | None = None,
+                 spanish_offset: int | None = None,
+                 overwrite_spanish: bool = False,
+                 skip_pointers: bool = False,
+                 length: int | None = None,
+                 search_start: int | None = None,
+                 search_end: int | None = None,
+                 verbose: bool = True) -> dict[str, int]:
+    """Apply the language switch in place on `data` and return per-pattern counts.
+
+    With verbose=False nothing is printed (callers such as build_rom report
+    the counts themselves).
+    """
     if search_start is None:
         search_start = 0
     if search_end is None or search_end > len(data):
@@ -43,11 +85,11 @@ def switch_to_english(rom_path: str, output_path: str,
     auto_eng, auto_span = detect_offsets(data)
     if english_offset is None:
         english_offset = DEFAULT_ENGLISH_OFFSET
-        if auto_eng != -1 and auto_eng != english_offset:
+        if verbose and auto_eng != -1 and auto_eng != english_offset:
             print(f"Detected English text at 0x{auto_eng:X}; using default 0x{english_offset:X}")
     if spanish_offset is None:
         spanish_offset = DEFAULT_SPANISH_OFFSET
-        if auto_span != -1 and auto_span != spanish_offset:
+        if verbose and auto_span != -1 and auto_span != spanish_offset:
             print(f"Detected Spanish text at 0x{auto_span:X}; using default 0x{spanish_offset:X}")
 
     PATTERNS = {
@@ -79,7 +121,7 @@ def switch_to_english(rom_path: str, output_path: str,
 
     counts = {}
 
-    def replace_within(buf: bytearray, old: bytes, new: bytes) -> int:
+    def replace_within(buf: bytearray | RomImage, old: bytes, new: bytes) -> int:
         count = 0
         idx = buf.find(old, search_start)
         while idx != -1 and idx < search_end:
@@ -101,7 +143,7 @@ def switch_to_english(rom_path: str, output_path: str,
             occurrences = replace_within(data, old, new)
             counts[name] = occurrences
             distinctive = sum(1 for b in old if b != 0)
-            if occurrences > LOW_ENTROPY_WARN_THRESHOLD and distinctive <= 1:
+            if verbose and occurrences > LOW_ENTROPY_WARN_THRESHOLD and distinctive <= 1:
                 print(
                     f"Warning: el patron '{name}' ({old.hex(' ')}) es poco distintivo y ha "
                     f"reemplazado {occurrences} coincidencias; es probable que muchas sean "
@@ -123,16 +165,13 @@ def switch_to_english(rom_path: str, output_path: str,
         block = block[:max(len(data) - spanish_offset, 0)]
         data[spanish_offset:spanish_offset + len(block)] = block
         counts['overwrite'] = len(block)
-    elif sum(counts.values()) <= 1:
+    elif verbose and sum(counts.values()) <= 1:
         print("Warning: se encontraron muy pocos punteros. Prueba a usar --overwrite-spanish o revisa los offsets.")
 
-    Path(output_path).write_bytes(bytes(data))
-    total = sum(counts.values())
-    detail = ", ".join(f"{k}:{v}" for k, v in counts.items() if v)
-    print(f"Replaced {total} pointers ({detail or 'sin coincidencias'})")
+    return counts
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     """Parse CLI arguments and apply the language switch."""
     parser = argparse.ArgumentParser(
         description="Switch Traysia (W).bin language to English"
@@ -185,18 +224,20 @@ def main() -> None:
         action="store_true",
         help="Do not patch any pointer references; only copy text if requested",
     )
-    args = parser.parse_args()
-    switch_to_english(
-        args.input_rom,
-        args.output_rom,
-        english_offset=args.english_offset,
-        spanish_offset=args.spanish_offset,
-        overwrite_spanish=args.overwrite_spanish,
-        skip_pointers=args.skip_pointers,
-        length=args.length,
-        search_start=args.search_start,
-        search_end=args.search_end,
-    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+    with instrument.session(args, "switch_to_english"):
+        switch_to_english(
+            args.input_rom,
+            args.output_rom,
+            english_offset=args.english_offset,
+            spanish_offset=args.spanish_offset,
+            overwrite_spanish=args.overwrite_spanish,
+            skip_pointers=args.skip_pointers,
+            length=args.length,
+            search_start=args.search_start,
+            search_end=args.search_end,
+        )
 
 
 if __name__ == "__main__":
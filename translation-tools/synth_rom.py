@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Genera ROMs sintéticas con la estructura de Traysia (W).
+
+Las ROMs del juego tienen copyright y no pueden ir en el repositorio, así
+que las pruebas y las mediciones (bench.py) usan ROMs generadas con la misma
+forma que la de Shinyuden:
+
+  - Tabla de vectores del 68000 y cabecera de Mega Drive con la
+    declaración de SRAM y un checksum correcto.
+  - Los bloques de texto de translate_spanish.BLOCKS llenos de cadenas
+    null-terminated, con acentos codificados como parejas `0x81`+letra y
+    saltos '@'. El bloque 1 empieza por "EL REINO" y el guion inglés (en
+    DEFAULT_ENGLISH_OFFSET) por "THE KINGDOM", como en la ROM real.
+  - Una zona de "código" con instrucciones `LEA addr, An` e inmediatos que
+    apuntan al bloque español, los bytes originales de los puntos del
+    parche Anticrash y una tabla de punteros absolutos a cadenas.
+  - El resto relleno con 0xFF.
+
+La salida depende solo de `size` y `seed`: la misma semilla produce
+siempre la misma ROM.
+
+Uso:
+    python translation-tools/synth_rom.py build/synth.bin
+    python translation-tools/synth_rom.py build/synth4.bin --size 4 --seed 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+import tools_path
+tools_path.enable()
+
+import fix_rom_traysia_shinyuden_anticrash as anticrash
+import switch_to_english
+import translate_spanish
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+MB = 1 << 20
+CODE_START = 0x000200
+CODE_END = 0x00C000
+POINTER_TABLE = 0x180000   # hueco entre el bloque 1 y el de enemigos
+SRAM = (0x200001, 0x203FFF)
+
+_WORDS_ES = ("el reino de la isla camino hacia puerto roy espada magia dragón "
+             "guerrero tienda posada oro hierba poción castillo rey princesa "
+             "monstruo bosque montaña cueva tesoro viaje ciudad anciano niño "
+             "también aquí así después corazón pequeño señor mañana ánimo "
+             "ESTACIÓN Él Ópalo Ámbar Ígnea ¡Ayuda! ¿Dónde? está será había").split()
+_WORDS_EN = ("the kingdom of island road to port sword magic dragon warrior "
+             "shop inn gold herb potion castle king princess monster forest "
+             "mountain cave treasure journey town elder child").split()
+
+
+def _sentence(rng: random.Random, words: list[str], breaks: bool) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 3) if breaks else 1):
+        parts.append(" ".join(rng.choice(words) for _ in range(rng.randint(2, 7))))
+    text = "@ ".join(parts)
+    return text[:1].upper() + text[1:] + rng.choice(".!?")
+
+
+def _fill_block(rom: bytearray, start: int, end: int, rng: random.Random, words: list[str],
+                first: str, breaks: bool) -> list[int]:
+    """Llena [start, end) de cadenas y devuelve sus offsets."""
+    offsets, pos, text = [], start, first
+    while True:
+        raw = translate_spanish.encode_custom(text, "latin-1") + b"\x00"
+        if pos + len(raw) > end:
+            break
+        rom[pos:pos + len(raw)] = raw
+        offsets.append(pos)
+        pos += len(raw)
+        text = _sentence(rng, words, breaks)
+    rom[pos:end] = bytes(end - pos)     # cola del bloque a ceros
+    return offsets
+
+
+def _header(rom: bytearray) -> None:
+    def put(offset: int, text: str, width: int) -> None:
+        rom[offset:offset + width] = text.encode("ascii").ljust(width, b" ")[:width]
+
+    put(0x100, "SEGA MEGA DRIVE", 16)
+    put(0x110, "(C)SYNT 2024.JAN", 16)
+    put(0x120, "TRAYSIA SYNTHETIC", 48)
+    put(0x150, "TRAYSIA SYNTHETIC", 48)
+    put(0x180, "GM 00000000-00", 14)
+    put(0x190, "J", 16)
+    rom[0x1A0:0x1A8] = (0).to_bytes(4, "big") + (len(rom) - 1).to_bytes(4, "big")
+    rom[0x1A8:0x1B0] = (0xFF0000).to_bytes(4, "big") + (0xFFFFFF).to_bytes(4, "big")
+    rom[0x1B0:0x1BC] = b"RA\xF8\x20" + SRAM[0].to_bytes(4, "big") + SRAM[1].to_bytes(4, "big")
+    put(0x1BC, "", 52)
+    put(0x1F0, "JUE", 16)
+
+
+def checksum(rom: bytes) -> int:
+    """Checksum de la cabecera: suma de palabras de 16 bits desde 0x200."""
+    body = memoryview(rom)[0x200:len(rom) & ~1]
+    return sum(int.from_bytes(body[i:i + 2], "big") for i in range(0, len(body), 2)) & 0xFFFF
+
+
+def make_rom(size: int = 2 * MB, seed: int = 0) -> bytearray:
+    """ROM sintética de `size` bytes (2 o 4 MB) determinada por `seed`."""
+    if size < 2 * MB:
+        raise ValueError("La ROM sintética necesita al menos 2 MB para los bloques de texto")
+    rng = random.Random(seed)
+    rom = bytearray(b"\xFF") * size
+
+    # Vectores: SP inicial, PC de reset y excepciones hacia el código
+    rom[0:8] = (0x00FFFE00).to_bytes(4, "big") + CODE_START.to_bytes(4, "big")
+    for vec in range(8, 0x100, 4):
+        rom[vec:vec + 4] = (CODE_START + 0x10).to_bytes(4, "big")
+    _header(rom)
+
+    spanish = switch_to_english.DEFAULT_SPANISH_OFFSET
+    strings = []
+    for k, (start, end) in enumerate(translate_spanish.BLOCKS):
+        first = "EL REINO de Traysia." if start == spanish else _sentence(rng, _WORDS_ES, True)
+        strings += _fill_block(rom, start, end, rng, _WORDS_ES, first, breaks=k != 1)
+    _fill_block(rom, switch_to_english.DEFAULT_ENGLISH_OFFSET, switch_to_english.DEFAULT_ENGLISH_END,
+                rng, _WORDS_EN, "THE KINGDOM of Traysia.", breaks=True)
+
+    # Código: bytes de aspecto aleatorio con LEA/JSR y punteros absolutos
+    code = bytearray(rng.randbytes(CODE_END - CODE_START))
+    for _ in range(400):
+        at = rng.randrange(0, len(code) - 6) & ~1
+        op = rng.choice(switch_to_english.LEA_OPCODES)
+        code[at:at + 6] = op + spanish.to_bytes(4, "big")
+    for _ in range(200):
+        at = rng.randrange(0, len(code) - 6) & ~1
+        code[at:at + 6] = b"\x4E\xB9" + rng.randrange(CODE_START, CODE_END, 2).to_bytes(4, "big")
+    rom[CODE_START:CODE_END] = code
+    # Bytes originales de los puntos del parche Anticrash (`jmp $200000`)
+    for off, old, _new in anticrash.PATCHES:
+        rom[off:off + len(old)] = old
+
+    # Tabla de punteros absolutos a una muestra de cadenas
+    table = sorted(rng.sample(strings, min(512, len(strings))))
+    for i, off in enumerate(table):
+        rom[POINTER_TABLE + 4 * i:POINTER_TABLE + 4 * i + 4] = off.to_bytes(4, "big")
+
+    rom[0x18E:0x190] = checksum(rom).to_bytes(2, "big")
+    return rom
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Genera una ROM sintética con la estructura de Traysia")
+    parser.add_argument("output", help="archivo .bin de salida")
+    parser.add_argument("--size", type=int, choices=(2, 4), default=2, help="tamaño en MB")
+    parser.add_argument("--seed", type=int, default=0, help="semilla (misma semilla, misma ROM)")
+    args = parser.parse_args()
+
+    rom = make_rom(args.size * MB, args.seed)
+    out = Path(args.output)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(rom)
+    print(f"✔ ROM sintética de {len(rom) // MB} MB → {out}")
+
+
+if __name__ == "__main__":
+    main()
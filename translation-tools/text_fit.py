@@ -0,0 +1,146 @@
+"""Ajuste de las traducciones al hueco que tienen en la ROM.
+
+El espacio de cada cadena es fijo (`length`, incluido el 0x00 final), y lo
+que cuenta es su longitud *codificada*: las letras acentuadas ocupan dos bytes
+(0x81 + letra) y, con la transliteración alemana activa, "ä" pasa a "ae".
+
+En lugar de recortar palabra a palabra re-codificando la cadena entera en
+cada vuelta (coste cuadrático), se calcula una sola vez el coste en bytes de
+cada carácter, se acumula en sumas prefijas y el punto de corte se busca por
+bisección entre los finales de palabra.
+
+Antes de recortar se puede intentar acortar con un `Shortener`: un
+diccionario de abreviaturas y de sinónimos más cortos (p.ej. derivados del
+glosario) que se aplican, de mayor a menor ahorro, solo hasta que el texto cabe.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from pathlib import Path
+from typing import Optional
+
+import translate_spanish
+
+TRUNCATOR = "/"
+_WORD_RE = re.compile(r"\S+")
+
+# Transliteración de translate_spanish.transliterate_de, carácter a carácter
+_TRANSLIT_DE = {"ä": "ae", "ö": "oe", "ü": "ue", "Ä": "Ae", "Ö": "Oe", "Ü": "Ue", "ß": "ss"}
+
+
+@lru_cache(maxsize=4096)
+def char_cost(ch: str, encoding: str = "latin-1", translit: bool = True) -> int:
+    """Bytes que ocupa `ch` en la ROM (mismo criterio que encode_custom)."""
+    if translit and ch in _TRANSLIT_DE:
+        return sum(char_cost(c, encoding, False) for c in _TRANSLIT_DE[ch])
+    pair = translate_spanish.REVERSE_CHAR_MAP.get(ch)
+    if pair is not None:
+        return len(pair)
+    return len(ch.encode(encoding, errors="replace"))
+
+
+def prefix_costs(text: str, encoding: str = "latin-1", translit: Optional[bool] = None) -> list[int]:
+    """Sumas prefijas: `costs[k]` = bytes de `text[:k]`."""
+    if translit is None:
+        translit = translate_spanish.ENABLE_TRANSLIT
+    return [0, *accumulate(char_cost(c, encoding, translit) for c in text)]
+
+
+def encoded_length(text: str, encoding: str = "latin-1", translit: Optional[bool] = None) -> int:
+    """Bytes que ocupa `text` en la ROM, incluido el terminador 0x00."""
+    return prefix_costs(text, encoding, translit)[-1] + 1
+
+
+def truncate(text: str, limit: int, encoding: str = "latin-1",
+             translit: Optional[bool] = None) -> str:
+    """Recorta `text` por el último final de palabra que deja sitio a "/".
+
+    Si ni siquiera la primera palabra cabe con el truncador, se corta por
+    el último carácter que cabe, sin truncador.
+    """
+    costs = prefix_costs(text, encoding, translit)
+    if costs[-1] + 1 <= limit:
+        return text
+    budget = limit - 1 - prefix_costs(TRUNCATOR, encoding, translit)[-1]
+    # Mayor prefijo (en caracteres) que cabe junto con el truncador
+    fit = bisect_right(costs, budget) - 1
+    word_ends = [m.end() for m in _WORD_RE.finditer(text, 0, fit)]
+    # Un final de palabra vale si la palabra no continúa tras el corte
+    while word_ends and word_ends[-1] == fit and fit < len(text) and not text[fit].isspace():
+        word_ends.pop()
+    if word_ends:
+        return text[:word_ends[-1]] + TRUNCATOR
+    # ni siquiera cabe el truncador tras una palabra completa
+    return text[:bisect_right(costs, limit - 1) - 1].rstrip()
+
+
+class Shortener:
+    """Sustituciones que acortan un texto sin perder su significado.
+
+    `abbreviations` asigna a cada término su abreviatura; `synonyms` asigna
+    a cada término una lista de alternativas, de las que se usa la más corta.
+    Los términos se buscan como palabras completas con una única expresión.
+    """
+
+    def __init__(self, abbreviations: Optional[dict[str, str]] = None,
+                 synonyms: Optional[dict[str, list[str]]] = None):
+        table: dict[str, str] = {}
+        for term, options in (synonyms or {}).items():
+            if options:
+                table[term] = min(options, key=len)
+        table.update(abbreviations or {})
+        self.table = {k: v for k, v in table.items() if len(v) < len(k)}
+        terms = sorted(self.table, key=len, reverse=True)
+        self._re = (re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, terms)) + r")(?!\w)")
+                    if terms else None)
+
+    @classmethod
+    def from_file(cls, path: Path | str) -> "Shortener":
+        """Carga {"abbreviations": {...}, "synonyms": {...}} desde JSON."""
+        data = json.loads(Path(path).read_text("utf-8"))
+        return cls(data.get("abbreviations"), data.get("synonyms"))
+
+    def shorten(self, text: str, limit: int, encoding: str = "latin-1",
+                translit: Optional[bool] = None) -> str:
+        """Aplica sustituciones, de mayor a menor ahorro, hasta que `text` cabe."""
+        if self._re is None:
+            return text
+        matches = list(self._re.finditer(text))
+        if not matches:
+            return text
+        need = encoded_length(text, encoding, translit) - limit
+        # Ahorro de cada coincidencia, medido en bytes codificados
+        savings = []
+        for m in matches:
+            short = self.table[m.group()]
+            saved = (encoded_length(m.group(), encoding, translit)
+                     - encoded_length(short, encoding, translit))
+            savings.append((saved, m.start(), m.end(), short))
+        chosen = []
+        for saved, start, end, short in sorted(savings, reverse=True):
+            if need <= 0:
+                break
+            chosen.append((start, end, short))
+            need -= saved
+        out, pos = [], 0
+        for start, end, short in sorted(chosen):
+            out.append(text[pos:start])
+            out.append(short)
+            pos = end
+        out.append(text[pos:])
+        return "".join(out)
+
+
+def fit_text(text: str, limit: int, shortener: Optional[Shortener] = None,
+             encoding: str = "latin-1", translit: Optional[bool] = None) -> tuple[str, bool]:
+    """Devuelve (texto que cabe en `limit`, si hubo que modificarlo)."""
+    if encoded_length(text, encoding, translit) <= limit:
+        return text, False
+    if shortener is not None:
+        text = shortener.shorten(text, limit, encoding, translit)
+    return truncate(text, limit, encoding, translit), True
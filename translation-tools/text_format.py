@@ -0,0 +1,238 @@
+"""Motor de formato de las traducciones (mayúsculas y saltos '@' de Traysia).
+
+Reúne las reglas que antes vivían sueltas en translate_spanish_to_german.py:
+
+  - `apply_formatting(es, de)`: reparte la traducción entre los segmentos '@'
+    del original, copia su estilo de mayúsculas y reconstruye los paddings.
+  - `is_badly_formatted(text, expected_ats)`: heurística de texto mal partido.
+  - `format_issue(text)`: las incidencias que busca `--mode check`.
+
+Los patrones se compilan una sola vez y el original en castellano se analiza
+(segmentos, paddings y estilo de cada segmento) en una única pasada que se
+memoriza por cadena, ya que el mismo original se formatea una y otra vez.
+
+`Formatter` añade una cache persistente por (original, salida del traductor).
+Cada resultado guarda, además del texto, los valores de los que dependen las
+decisiones de cada regla (los ratios de mayúsculas de cada segmento, la
+palabra pegada más larga...). Si se cambia el umbral de una regla, solo se
+recalculan las entradas cuya decisión cambia con el nuevo umbral.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+_AT_RUN_RE = re.compile(r"@+")
+_PAD_RE = re.compile(r"@( *)")
+# Las tres comprobaciones de --mode check en una sola expresión
+_ISSUE_RE = re.compile(r"@@|@[^\s@]|[^\s@]@[a-zA-Z]")
+
+
+class FormatRules:
+    """Umbrales ajustables de las reglas de formato."""
+
+    __slots__ = ("upper_ratio", "glue_limit", "segment_limit")
+
+    def __init__(self, upper_ratio: float = 0.8, glue_limit: int = 20,
+                 segment_limit: int = 16):
+        # Segmentos del original con más de este ratio de mayúsculas → MAYÚSCULAS
+        self.upper_ratio = upper_ratio
+        # Un segmento traducido sin espacios más largo que esto = palabras pegadas
+        self.glue_limit = glue_limit
+        # is_badly_formatted: segmento sin espacios más largo que esto
+        self.segment_limit = segment_limit
+
+    def as_list(self) -> list:
+        return [self.upper_ratio, self.glue_limit]
+
+
+DEFAULT_RULES = FormatRules()
+
+
+# ─────────────────────────────  Análisis del original  ──────────────────────
+@lru_cache(maxsize=65536)
+def _source_layout(es: str) -> tuple[tuple[str, ...], tuple[str, ...], tuple[float, ...]]:
+    """Segmentos, paddings tras cada '@' y ratio de mayúsculas por segmento."""
+    segs, pads, prev = [], [], 0
+    for m in _PAD_RE.finditer(es):
+        segs.append(es[prev:m.start()])
+        pads.append(m.group(1))
+        prev = m.start() + 1
+    segs.append(es[prev:])
+    ratios = []
+    for seg in segs:
+        alpha = upper = 0
+        for c in seg:
+            if c.isalpha():
+                alpha += 1
+                upper += c.isupper()
+        ratios.append(upper / alpha if alpha else 0.0)
+    return tuple(segs), tuple(pads), tuple(ratios)
+
+
+def _distribute(words: list[str], seg_count: int) -> list[str]:
+    # distribuir palabras proporcionalmente
+    chunks = []
+    remaining = len(words)
+    avg = remaining // seg_count
+    i = 0
+    for n in range(seg_count - 1):
+        chunk_size = avg
+        if remaining - chunk_size < (seg_count - 1 - n):
+            chunk_size = 1  # asegurar al menos 1 palabra por segmento
+        chunks.append(words[i:i + chunk_size])
+        i += chunk_size
+        remaining -= chunk_size
+    chunks.append(words[i:])
+    return [" ".join(chunk) for chunk in chunks]
+
+
+def _format(es: str, de: str, rules: FormatRules) -> tuple[str, Optional[list]]:
+    """Devuelve (texto formateado, testigos de las reglas) o testigos None si
+    el resultado no depende de ningún umbral."""
+    de = _AT_RUN_RE.sub(" ", de)
+    if "@" not in es:
+        return de.strip(), None
+    de_words = de.split()
+    if len(de_words) < 2:
+        return de.strip(), None
+
+    es_segs, pads, ratios = _source_layout(es)
+    de_segs = _distribute(de_words, len(es_segs))
+
+    # detectar si hay palabras pegadas (sin espacios)
+    glued = max((len(seg) for seg in de_segs if " " not in seg), default=0)
+    witnesses = [list(ratios), glued]
+    if glued > rules.glue_limit:
+        return de.strip(), witnesses
+
+    for i, (es_seg, de_seg) in enumerate(zip(es_segs, de_segs)):
+        if ratios[i] > rules.upper_ratio:
+            de_segs[i] = de_seg.upper()
+        elif es_seg[:1].isupper():
+            de_segs[i] = de_seg[:1].upper() + de_seg[1:]
+
+    rebuilt = de_segs[0].strip()
+    for i, pad in enumerate(pads):
+        segment = de_segs[i + 1].strip()
+        if not rebuilt.endswith(" "):
+            rebuilt += " "
+        rebuilt += "@" + pad
+        if not segment.startswith(" "):
+            rebuilt += " "
+        rebuilt += segment
+    return rebuilt, witnesses
+
+
+def _same_decisions(witnesses: Optional[list], old: list, new: list) -> bool:
+    """¿Toman las reglas las mismas decisiones con los umbrales `old` y `new`?"""
+    if witnesses is None:
+        return True
+    ratios, glued = witnesses
+    if old[0] != new[0] and any((r > old[0]) != (r > new[0]) for r in ratios):
+        return False
+    return (glued > old[1]) == (glued > new[1])
+
+
+# ─────────────────────────────  API pública  ─────────────────────────────────
+def apply_formatting(es: str, de: str, rules: FormatRules = DEFAULT_RULES) -> str:
+    """Sincroniza mayúsculas y preserva la posición original de los '@'."""
+    return _format(es, de, rules)[0]
+
+
+def is_badly_formatted(text: str, expected_ats: int, rules: FormatRules = DEFAULT_RULES) -> bool:
+    """Detecta si un texto tiene signos de formato incorrecto, aunque tenga el número correcto de '@'."""
+    if text.count("@") != expected_ats:
+        return True
+    limit = rules.segment_limit
+    return any(len(seg.strip()) > limit and " " not in seg for seg in text.split("@"))
+
+
+def format_issue(text: str) -> bool:
+    """Incidencias de --mode check: '@@', '@' sin espacio detrás o pegado a una palabra."""
+    return _ISSUE_RE.search(text) is not None
+
+
+def _hash_code(h, code) -> None:
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _hash_code(h, const)   # generadores/comprehensions anidados
+        else:
+            h.update(repr(const).encode())
+
+
+def _engine_fingerprint() -> str:
+    # Solo el código de las reglas invalida toda la cache; sus umbrales no
+    h = hashlib.sha1(sys.version.encode())
+    for func in (_source_layout.__wrapped__, _distribute, _format):
+        _hash_code(h, func.__code__)
+    return h.hexdigest()[:16]
+
+
+class Formatter:
+    """apply_formatting con cache persistente y consciente de los umbrales."""
+
+    def __init__(self, rules: FormatRules = DEFAULT_RULES, cache_path: Path | str | None = None):
+        self.rules = rules
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.hits = 0
+        self.computed = 0
+        self._memo: dict[tuple[str, str], str] = {}
+        self._dirty = False
+        self._store: dict[str, list] = {}
+        self._engine = _engine_fingerprint()
+        if self.cache_path and self.cache_path.exists():
+            try:
+                data = json.loads(self.cache_path.read_text("utf-8"))
+            except ValueError:
+                data = {}
+            if data.get("engine") == self._engine:
+                self._store = data.get("entries", {})
+
+    @staticmethod
+    def _key(es: str, de: str) -> str:
+        return hashlib.sha1(f"{es}\x00{de}".encode("utf-8")).hexdigest()
+
+    def format(self, es: str, de: str) -> str:
+        memo_key = (es, de)
+        out = self._memo.get(memo_key)
+        if out is not None:
+            self.hits += 1
+            return out
+        key = self._key(es, de)
+        current = self.rules.as_list()
+        stored = self._store.get(key)
+        if stored is not None:
+            out, witnesses, used = stored
+            if used == current or _same_decisions(witnesses, used, current):
+                if used != current:
+                    stored[2] = current
+                    self._dirty = True
+                self.hits += 1
+                self._memo[memo_key] = out
+                return out
+        out, witnesses = _format(es, de, self.rules)
+        self._store[key] = [out, witnesses, current]
+        self._memo[memo_key] = out
+        self._dirty = True
+        self.computed += 1
+        return out
+
+    def save(self) -> None:
+        if not (self.cache_path and self._dirty):
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"engine": self._engine, "entries": self._store},
+                                  ensure_ascii=False), "utf-8")
+        os.replace(tmp, self.cache_path)
+        self._dirty = False
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""Ancho en pantalla de las traducciones, medido con la fuente de la ROM.
+
+translate_spanish_checkfit.py y build_block solo comparan bytes codificados
+con `length`. El límite que se ve en el juego es otro: el ancho de la ventana
+de diálogo entre dos saltos '@'. Este módulo mide en píxeles cada línea de
+cada entrada y reparte un texto en líneas de ventana, de modo que los
+desbordamientos se detectan sin probar en el emulador.
+
+Las métricas (avance en píxeles de cada carácter) se extraen una sola vez de
+los glifos de la fuente de la ROM y se guardan en un JSON pequeño, que luego
+usan `check` y checkfit sin volver a leer la ROM:
+
+    python translation-tools/text_width.py extract "roms/Traysia (W).bin" --font-offset 0x... -o translations/font_metrics.json
+    python translation-tools/text_width.py check translations/german.json --metrics translations/font_metrics.json
+
+La posición y el formato de la fuente no están documentados en este
+repositorio: se indican con `--font-offset`, `--format`, `--first-code`...
+Sin métricas, cada carácter ocupa una celda de `DEFAULT_CELL` píxeles
+(motor monoespaciado).
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+import unicodedata
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import md_tiles
+import translate_spanish
+from translation_io import iter_entries
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+BREAK = "@"
+DEFAULT_CELL = 8
+# 24 celdas de 8 px; ajustar con --window-width al ancho real de la ventana
+DEFAULT_WINDOW_WIDTH = 192
+# Signos que se dibujan como su versión sin invertir
+_BASE_GLYPH = {"¡": "!", "¿": "?"}
+
+
+def base_glyph(ch: str) -> str:
+    """Glifo con el que el juego dibuja `ch`: las tildes (0x81 + letra) se
+    dibujan sobre su letra base y ¡/¿ como !/?."""
+    if ch in translate_spanish.REVERSE_CHAR_MAP:
+        return _BASE_GLYPH.get(ch) or unicodedata.normalize("NFD", ch)[0]
+    return ch
+
+
+class _Widths(dict):
+    """Avance de cada carácter, calculado la primera vez que aparece."""
+
+    def __init__(self, metrics: "FontMetrics"):
+        super().__init__()
+        self.metrics = metrics
+
+    def __missing__(self, ch: str) -> int:
+        width = self[ch] = self.metrics._char_width(ch)
+        return width
+
+
+class FontMetrics:
+    """Avances en píxeles por carácter, tal como los dibuja el juego."""
+
+    def __init__(self, widths: Optional[dict[str, int]] = None, default: int = DEFAULT_CELL,
+                 translit: Optional[bool] = None, source: Optional[dict] = None):
+        self.widths = dict(widths or {})
+        self.default = default
+        self.source = source or {}
+        if translit is None:
+            translit = translate_spanish.ENABLE_TRANSLIT
+        self.translit = translit
+        self._memo = _Widths(self)
+
+    # ──────────────  Construcción  ──────────────
+    @classmethod
+    def fixed(cls, cell: int = DEFAULT_CELL, translit: Optional[bool] = None) -> "FontMetrics":
+        return cls({}, cell, translit, {"fixed": cell})
+
+    @classmethod
+    def from_rom(cls, data: bytes, offset: int, fmt: str = "1bpp", first_code: int = 0x20,
+                 count: int = 96, height: int = 8, spacing: int = 1,
+                 space_width: Optional[int] = None, encoding: str = "latin-1") -> "FontMetrics":
+        """Mide los glifos `first_code`..`first_code+count-1` de la fuente.
+
+        Cada glifo ocupa `height // 8` tiles consecutivos (de arriba abajo);
+        su avance es la tinta más `spacing`. Los glifos vacíos (el espacio)
+        avanzan `space_width`, por defecto media celda.
+        """
+        per_glyph = max(1, height // md_tiles.TILE_H)
+        tiles = md_tiles.decode_tiles(data, offset, count * per_glyph, fmt)
+        if space_width is None:
+            space_width = md_tiles.TILE_W // 2
+        widths = {}
+        for i in range(count):
+            rows = [row for tile in tiles[i * per_glyph:(i + 1) * per_glyph] for row in tile]
+            ink = md_tiles.ink_width(rows)
+            ch = bytes([first_code + i]).decode(encoding, errors="replace")
+            widths[ch] = ink + spacing if ink else space_width
+        source = {
+            "rom_sha1": hashlib.sha1(data).hexdigest(),
+            "font_offset": f"0x{offset:X}", "format": fmt, "first_code": f"0x{first_code:X}",
+            "count": count, "height": height, "spacing": spacing,
+        }
+        return cls(widths, md_tiles.TILE_W, source=source)
+
+    @classmethod
+    def from_file(cls, path: Path | str, translit: Optional[bool] = None) -> "FontMetrics":
+        data = json.loads(Path(path).read_text("utf-8"))
+        return cls(data["widths"], data.get("default", DEFAULT_CELL), translit, data.get("source"))
+
+    def save(self, path: Path | str) -> None:
+        Path(path).write_text(json.dumps({"source": self.source, "default": self.default,
+                                          "widths": self.widths},
+                                         ensure_ascii=False, indent=2), "utf-8")
+
+    # ──────────────  Medida  ──────────────
+    def _char_width(self, ch: str) -> int:
+        if self.translit:
+            expanded = translate_spanish.transliterate_de(ch)
+            if expanded != ch:
+                return sum(self._memo[c] for c in expanded)
+        width = self.widths.get(ch)
+        if width is not None:
+            return width
+        base = base_glyph(ch)
+        if base != ch:
+            return self._memo[base]
+        return self.default
+
+    def width(self, line: str) -> int:
+        """Ancho de una línea (sin contar los espacios finales, que no se ven)."""
+        return sum(map(self._memo.__getitem__, line.rstrip()))
+
+    def line_widths(self, text: str) -> list[int]:
+        return [self.width(line) for line in text.split(BREAK)]
+
+    def layout(self, text: str, window: int) -> list[str]:
+        """Reparte `text` en líneas de como mucho `window` píxeles.
+
+        Respeta los saltos '@' existentes y parte por palabras; una palabra
+        más ancha que la ventana se corta por caracteres.
+        """
+        memo = self._memo
+        space = memo[" "]
+        lines = []
+        for part in text.split(BREAK):
+            current, cur_w = "", 0
+            for word in part.split():
+                w = self.width(word)
+                if current and cur_w + space + w <= window:
+                    current, cur_w = f"{current} {word}", cur_w + space + w
+                    continue
+                if current:
+                    lines.append(current)
+                current, cur_w = "", 0
+                while w > window:
+                    # palabra más ancha que la ventana: cortar por caracteres
+                    cut, acc = 0, 0
+                    while cut < len(word) and acc + memo[word[cut]] <= window:
+                        acc += memo[word[cut]]
+                        cut += 1
+                    cut = max(cut, 1)
+                    lines.append(word[:cut])
+                    word = word[cut:]
+                    w = self.width(word)
+                current, cur_w = word, w
+            lines.append(current)
+        return lines
+
+
+def overflows(entries: Iterable[dict], metrics: FontMetrics, window: int,
+              field: str = "text") -> Iterator[tuple[dict, list[int]]]:
+    """Entradas con alguna línea más ancha que la ventana: (entrada, anchos)."""
+    for entry in entries:
+        text = entry.get(field) or ""
+        widths = metrics.line_widths(text)
+        if max(widths) > window:
+            yield entry, widths
+
+
+def load_metrics(path: Optional[str], translit: Optional[bool] = None) -> FontMetrics:
+    return FontMetrics.from_file(path, translit) if path else FontMetrics.fixed(translit=translit)
+
+
+# ─────────────────────────────────  CLI  ─────────────────────────────────────
+def _int(value: str) -> int:
+    return int(value, 0)
+
+
+def add_font_arguments(parser: argparse.ArgumentParser) -> None:
+    """Opciones que describen la fuente dentro de la ROM (también en preview_text.py)."""
+    parser.add_argument("--font-offset", type=_int, required=True,
+                        help="offset del primer glifo (p.ej. 0x12340)")
+    parser.add_argument("--format", choices=sorted(md_tiles.TILE_BYTES), default="1bpp",
+                        help="formato de los tiles de la fuente (por defecto: 1bpp)")
+    parser.add_argument("--first-code", type=_int, default=0x20,
+                        help="código del primer glifo (por defecto: 0x20, el espacio)")
+    parser.add_argument("--count", type=int, default=96, help="número de glifos")
+    parser.add_argument("--height", type=int, choices=(8, 16), default=8,
+                        help="alto del glifo en píxeles (16 = dos tiles por glifo)")
+    parser.add_argument("--spacing", type=int, default=1, help="píxeles entre glifos")
+    parser.add_argument("--space-width", type=int, default=None,
+                        help="avance de los glifos vacíos (por defecto: media celda)")
+
+
+def metrics_from_args(data: bytes, args: argparse.Namespace) -> FontMetrics:
+    try:
+        return FontMetrics.from_rom(data, args.font_offset, args.format, args.first_code,
+                                    args.count, args.height, args.spacing, args.space_width)
+    except ValueError as exc:
+        raise SystemExit(f"❌ {exc}")
+
+
+def cmd_extract(args: argparse.Namespace) -> None:
+    metrics = metrics_from_args(Path(args.rom).read_bytes(), args)
+    metrics.save(args.output)
+    print(f"✔ Métricas de {len(metrics.widths)} glifos → {args.output}")
+    # Unos pocos anchos de muestra para comprobar a ojo que el offset es correcto
+    print("  " + "  ".join(f"{c!r}={metrics.widths[c]}" for c in " AiWm.!" if c in metrics.widths))
+
+
+def cmd_check(args: argparse.Namespace) -> None:
+    metrics = load_metrics(args.metrics, not args.no_translit)
+    bad = list(overflows(iter_entries(args.json_file), metrics, args.window_width))
+    if not bad:
+        print(f"✓   Todas las líneas caben en {args.window_width} px.")
+        return
+    print(f"{len(bad)} cadenas con líneas más anchas que la ventana ({args.window_width} px):\n")
+    for entry, widths in bad:
+        text = entry.get("text", "")
+        over = ", ".join(f"línea {i + 1}: {w} px" for i, w in enumerate(widths) if w > args.window_width)
+        print(f"   offset 0x{entry['offset']:X}   {over}   →   «{text}»")
+        if args.layout:
+            print("      propuesta: " + " @ ".join(metrics.layout(text, args.window_width)))
+    sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ancho en píxeles de las traducciones según la fuente de la ROM")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_ext = sub.add_parser("extract", help="extraer los anchos de los glifos de la ROM a JSON")
+    p_ext.add_argument("rom", help="ROM con la fuente")
+    add_font_arguments(p_ext)
+    p_ext.add_argument("-o", "--output", required=True, help="JSON de métricas de salida")
+
+    p_chk = sub.add_parser("check", help="buscar líneas más anchas que la ventana")
+    p_chk.add_argument("json_file", help="Archivo JSON (o .jsonl) con las traducciones")
+    p_chk.add_argument("--metrics", help="JSON de métricas (sin él: monoespaciado de 8 px)")
+    p_chk.add_argument("--window-width", type=int, default=DEFAULT_WINDOW_WIDTH,
+                       help=f"ancho útil de la ventana en píxeles (por defecto: {DEFAULT_WINDOW_WIDTH})")
+    p_chk.add_argument("--layout", action="store_true",
+                       help="proponer un reparto en líneas que quepa en la ventana")
+    p_chk.add_argument("--no-translit", action="store_true",
+                       help="No transliterar caracteres alemanes antes de medir")
+
+    args = parser.parse_args()
+    if args.cmd == "extract":
+        cmd_extract(args)
+    else:
+        cmd_check(args)
+
+
+if __name__ == "__main__":
+    main()
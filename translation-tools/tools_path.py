@@ -0,0 +1,18 @@
+"""Hace importables los módulos de tools/ desde los scripts de translation-tools/.
+
+Los scripts estables (instrumentación, RomImage, parche Anticrash, analizador)
+viven en tools/. Con el proyecto instalado (`pip install -e .`, ver
+pyproject.toml) ya están en sys.path y `enable` no hace nada; al ejecutar un
+script directamente desde el repositorio, añade tools/ una sola vez.
+"""
+
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent / "tools"
+
+
+def enable() -> None:
+    path = str(TOOLS_DIR)
+    if path not in sys.path and TOOLS_DIR.is_dir():
+        sys.path.insert(0, path)
@@ -8,10 +8,16 @@ traducciones y las escribe en la ROM respetando la longitud original.
 from __future__ import annotations
 
 import argparse
-import json
 import sys
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, List
+
+import tools_path
+tools_path.enable()
+
+import instrument
+from rom_image import RomImage
+from translation_io import save_entries
 
 # Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
 try:
@@ -167,62 +173,89 @@ def extract_strings(data: bytes, start: int, end: int, encoding: str) -> List[Di
     return strings
 
 
-def write_strings(data: bytearray, entries: List[Dict[str, int | str]], encoding: str) -> None:
-    for entry in entries:
-        off = entry["offset"]
-        length = entry["length"]
-        text = entry["text"]
-        encoded = encode_custom(text, encoding)
-        if len(encoded) >= length:
-            raise ValueError(f"Texto demasiado largo en offset 0x{off:X}")
-        encoded += b"\x00"
-        data[off:off + length] = encoded.ljust(length, b"\x00")
-
-
 def export_mode(rom_path: Path, json_path: Path, encoding: str):
-    data = rom_path.read_bytes()
+    with instrument.phase("leer ROM"):
+        data = instrument.read_bytes(rom_path)
     strings = []
-    for start, end in BLOCKS:
-        strings.extend(extract_strings(data, start, end, encoding))
-    strings.sort(key=lambda s: s["offset"])
-    json_path.write_text(json.dumps(strings, ensure_ascii=False, indent=2), "utf-8")
+    with instrument.phase("extraer"):
+        for start, end in BLOCKS:
+            strings.extend(extract_strings(data, start, end, encoding))
+        strings.sort(key=lambda s: s["offset"])
+        instrument.count("cadenas", len(strings))
+    with instrument.phase("guardar JSON"):
+        save_entries(json_path, strings)
+        instrument.add_written(json_path)
     print(f"✔ Exportadas {len(strings)} cadenas → {json_path}")
 
 def import_mode(args: argparse.Namespace) -> None:
     global ENABLE_TRANSLIT
     if args.no_translit:
         ENABLE_TRANSLIT = False
-    data = bytearray(Path(args.rom).read_bytes())
-    entries = json.loads(Path(args.json).read_text(encoding="utf-8"))
-    write_strings(data, entries, args.encoding)
-    Path(args.output).write_bytes(data)
-    print(f"Insertadas {len(entries)} cadenas")
+    from rom_import import ImportPlan, print_diff, print_problems
+
+    # La ROM se mapea en memoria; solo las cadenas escritas ocupan memoria
+    with RomImage.open(args.rom) as data:
+        with instrument.phase("validar"):
+            plan = ImportPlan.from_files(args.json, args.encoding, encode_custom)
+            for path in args.json:
+                instrument.add_read(path)
+            if args.relocate and plan.overflows:
+                from rom_freespace import Allocator
+                moved = plan.relocate(data, Allocator.for_rom(data.to_bytes()))
+                instrument.count("reubicadas", moved)
+                print(f"Reubicadas {moved} de {moved + len(plan.overflows)} cadenas que no cabían")
+            problems = plan.validate(len(data), None if args.no_block_check else BLOCKS)
+            instrument.count("cadenas", len(plan))
+        if problems:
+            print_problems(problems)
+        if args.dry_run:
+            print_diff(plan, data, args.diff_limit)
+        if problems:
+            raise SystemExit(1)
+        if args.dry_run:
+            return
+        with instrument.phase("insertar"):
+            changed = plan.apply(data)
+        with instrument.phase("guardar ROM"):
+            instrument.add_written(data.write_to(args.output))
+    print(f"Insertadas {len(plan)} cadenas ({changed} con cambios)")
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(description="Exportar/Importar textos de Traysia")
     sub = parser.add_subparsers(dest="cmd", required=True)
 
     p_exp = sub.add_parser("export", help="Extrae cadenas a JSON")
     p_exp.add_argument("rom", help="Ruta a la ROM original")
-    p_exp.add_argument("output", help="Archivo JSON de salida")
+    p_exp.add_argument("output", help="Archivo JSON (o .jsonl) de salida")
     p_exp.add_argument("--encoding", default="latin-1", help="Codificacion del texto (por defecto: latin-1). Se usan bloques predefinidos.")
-    p_imp = sub.add_parser("import", help="Inserta traducciones desde JSON")
+    p_imp = sub.add_parser("import", help="Inserta traducciones desde uno o varios JSON")
     p_imp.add_argument("rom", help="Ruta a la ROM original")
-    p_imp.add_argument("json", help="Archivo JSON con traduccion")
-    p_imp.add_argument("output", help="Ruta de la ROM modificada")
+    p_imp.add_argument("json", nargs="+", help="Archivos JSON (o .jsonl) con traduccion; se validan juntos")
+    p_imp.add_argument("output", help="Ruta de la ROM modificada (con --dry-run no se escribe)")
     p_imp.add_argument("--encoding", default="latin-1", help="Codificacion del texto")
     p_imp.add_argument(
         "--no-translit",
         action="store_true",
         help="No transliterar caracteres alemanes (ä→ae...); usalo si la ROM soporta los codigos 0x81 alemanes",
     )
+    p_imp.add_argument("--dry-run", action="store_true",
+                       help="Valida y muestra los bytes que cambiarian, sin escribir la ROM")
+    p_imp.add_argument("--diff-limit", type=int, default=50, metavar="N",
+                       help="Tramos mostrados por --dry-run (0 = todos; por defecto: 50)")
+    p_imp.add_argument("--relocate", action="store_true",
+                       help="Mueve a espacio libre (rom_freespace) las cadenas que no caben y reescribe sus punteros")
+    p_imp.add_argument("--no-block-check", action="store_true",
+                       help="Admite entradas fuera de los bloques de texto conocidos (BLOCKS)")
+    for sub_parser in (p_exp, p_imp):
+        instrument.add_arguments(sub_parser)
 
-    args = parser.parse_args()
-    if args.cmd == "export":
-        export_mode(Path(args.rom), Path(args.output), args.encoding)
-    else:
-        import_mode(args)
+    args = parser.parse_args(argv)
+    with instrument.session(args, f"translate_spanish {args.cmd}"):
+        if args.cmd == "export":
+            export_mode(Path(args.rom), Path(args.output), args.encoding)
+        else:
+            import_mode(args)
 
 
 if __name__ == "__main__":
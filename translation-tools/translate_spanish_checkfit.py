@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """Comprueba si las cadenas traducidas de un JSON caben en el espacio
-reservado en la ROM (mismo criterio que translate_spanish.py import)."""
+reservado en la ROM (mismo criterio que translate_spanish.py import).
+
+Con --metrics comprueba además que cada línea (entre saltos '@') cabe a lo
+ancho en la ventana de diálogo, medida en píxeles con la fuente de la ROM
+(ver text_width.py)."""
 
 import argparse
-import json
 import sys
 
 # Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
@@ -14,38 +17,51 @@ except AttributeError:
 
 import translate_spanish
 from translate_spanish import encode_custom  # reutilizamos la misma rutina
+from translation_io import iter_entries
+from text_width import DEFAULT_WINDOW_WIDTH, FontMetrics
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(
         description="Verifica que cada cadena traducida cabe en su hueco de la ROM"
     )
-    parser.add_argument("json_file", help="Archivo JSON con las traducciones")
+    parser.add_argument("json_file", help="Archivo JSON (o .jsonl) con las traducciones")
     parser.add_argument("--encoding", default="latin-1", help="Codificacion del texto")
     parser.add_argument(
         "--no-translit",
         action="store_true",
         help="No transliterar caracteres alemanes antes de medir (debe coincidir con la opcion usada al importar)",
     )
-    args = parser.parse_args()
+    parser.add_argument("--metrics", help="JSON de métricas de la fuente (text_width.py extract): "
+                                          "comprueba también el ancho de cada línea")
+    parser.add_argument("--window-width", type=int, default=DEFAULT_WINDOW_WIDTH,
+                        help=f"ancho útil de la ventana en píxeles (por defecto: {DEFAULT_WINDOW_WIDTH})")
+    args = parser.parse_args(argv)
 
     if args.no_translit:
         translate_spanish.ENABLE_TRANSLIT = False
+    metrics = FontMetrics.from_file(args.metrics) if args.metrics else None
 
-    with open(args.json_file, encoding="utf-8") as fh:
-        entries = json.load(fh)
-
-    bad = []
-    for e in entries:
+    bad, wide = [], []
+    for e in iter_entries(args.json_file):
         txt = e["text"]
         need = len(encode_custom(txt, args.encoding)) + 1   # +0x00
         if need > e["length"]:
             bad.append((e["offset"], e["length"], need, txt))
+        if metrics is not None:
+            widths = metrics.line_widths(txt)
+            if max(widths) > args.window_width:
+                wide.append((e["offset"], max(widths), txt))
 
     if bad:
         print(f"{len(bad)} cadenas demasiado largas:\n")
         for off, lim, need, txt in bad:
             print(f"   offset 0x{off:X} ({off})   reservado={lim}   necesita={need}   →   «{txt}»")
+    if wide:
+        print(f"{len(wide)} cadenas con líneas más anchas que la ventana ({args.window_width} px):\n")
+        for off, width, txt in wide:
+            print(f"   offset 0x{off:X} ({off})   ancho={width} px   →   «{txt}»")
+    if bad or wide:
         sys.exit(1)
     print("✓   Todas las cadenas caben.")
 
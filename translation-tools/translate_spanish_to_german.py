@@ -18,20 +18,58 @@
 ▪ Ajusta automáticamente la pausa entre peticiones (0.25 – 8 s) según
   la latencia media de las últimas 20 respuestas.
 
+▪ Con --memory usa una memoria de traducción (p.ej. el corpus EN-ES de
+  align_bilingual.py): las frases que ya tienen traducción no se envían
+  al motor.
+
+▪ Con --hedge PROVIDER[:PCT] duplica las peticiones lentas: si el motor
+  tarda más que el percentil PCT de sus latencias, la frase se envía
+  también al motor secundario y gana la primera respuesta. El campo
+  "provider" de cada entrada dice qué motor (o "memory") la tradujo.
+
+▪ Si un motor falla seguido no se cancela la ejecución: su disyuntor se
+  abre y las frases pasan a los motores de --fallback (o se espera a que
+  vuelva, hasta --max-outage segundos). googletrans reparte las peticiones
+  entre sus endpoints según su tasa de errores y latencia.
+
 Uso:
     # primera pasada
     python translate_spanish_to_german.py spanish.json german.json --save-every 10
 
     # reanudar o cambiar de proveedor
     python translate_spanish_to_german.py spanish.json german.json --provider argos --resume
+
+    # offline con los modelos residentes en el servidor local (translate_worker.py)
+    python translate_spanish_to_german.py spanish.json german.json --provider argos-worker --resume
+
+    # inglés: el texto oficial de la ROM primero, el motor solo para el resto
+    python translate_spanish_to_german.py spanish.json english.json --target en --memory en_es.json
+
+    # googletrans con Argos local de reserva para las peticiones lentas
+    python translate_spanish_to_german.py spanish.json german.json --hedge argos:95
+
+    # googletrans, y Argos local mientras Google esté caído
+    python translate_spanish_to_german.py spanish.json german.json --fallback argos --resume
 """
 
 from __future__ import annotations
-import argparse, json, random, re, sys, time
-from collections import deque
+import argparse, random, sys, time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Optional
-from translate_spanish import encode_custom, transliterate_de
+import tools_path
+tools_path.enable()
+import instrument
+from translate_spanish import transliterate_de
+from translation_io import iter_entries, load_entries, save_entries
+from glossary import Glossary
+from translation_memory import DEFAULT_MAX_COST, TranslationMemory
+from backend_health import EndpointPool, Health
+from entry_store import EntryStore
+import text_fit
+from text_fit import Shortener, fit_text
+from text_format import DEFAULT_RULES, FormatRules, Formatter, apply_formatting, format_issue
 
 # Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
 try:
@@ -41,34 +79,49 @@ except AttributeError:
 
 # Idiomas de destino soportados (--target)
 DEEPL_TARGETS = {"de": "DE", "en": "EN-US"}
+PROVIDERS = ["googletrans", "deepl", "argos", "argos-worker"]
 
 # ──────────────────────────  Motores de traducción  ──────────────────────────
 class BaseTranslator:
+    name = ""          # proveedor (--provider); se guarda en cada entrada traducida
     def translate(self, text: str) -> str: ...
 
 # Google (web‑scraper)
+GOOGLE_ENDPOINTS = [
+    "https://translate.googleapis.com",
+    "https://translate.google.com",
+    "https://translate.google.de",
+    "https://translate.google.es",
+]
+
 class GoogleTransTranslator(BaseTranslator):
-    def __init__(self, target: str):
-        from googletrans import Translator
+    def __init__(self, target: str, server_urls: Optional[list[str]] = None):
+        from googletrans import Translator, urls
+        # googletrans fija "https://{host}"; con el esquema dentro del host
+        # también sirven servidores http (translate_standin.py)
+        urls.TRANSLATE_RPC = "{host}/_/TranslateWebserverUi/data/batchexecute"
         self.target = target
-        self.t = Translator(service_urls=[
-            "translate.googleapis.com",
-            "translate.google.com",
-            "translate.google.de",
-            "translate.google.es",
-        ])
-        # Parche pequeño: la lib. usa un atributo mal nombrado
-        if not hasattr(self.t, "raise_Exception"):
-            self.t.raise_Exception = getattr(self.t, "raise_exception", True)
+        # Un cliente por endpoint (cada uno con sus conexiones keep-alive); el
+        # pool elige el más sano en vez de dejarlo al azar de la librería
+        clients = {}
+        for url in server_urls or GOOGLE_ENDPOINTS:
+            t = Translator(service_urls=[url.rstrip("/")])
+            # Parche pequeño: la lib. usa un atributo mal nombrado
+            if not hasattr(t, "raise_Exception"):
+                t.raise_Exception = getattr(t, "raise_exception", True)
+            clients[url] = t
+        self.pool = EndpointPool(clients)
     def translate(self, text: str) -> str:
-        return self.t.translate(text, dest=self.target).text
+        return self.pool.call(lambda t: t.translate(text, dest=self.target).text)
+    def report(self) -> list[str]:
+        return [f"endpoint {line}" for line in self.pool.report()]
 
 # DeepL (requiere API key)
 class DeeplTranslator(BaseTranslator):
-    def __init__(self, api_key: str, target: str):
+    def __init__(self, api_key: str, target: str, server_urls: Optional[list[str]] = None):
         import deepl
         self.target = DEEPL_TARGETS[target]
-        self.t = deepl.Translator(api_key)
+        self.t = deepl.Translator(api_key, server_url=server_urls[0] if server_urls else None)
     def translate(self, text: str) -> str:
         return self.t.translate_text(text, target_lang=self.target).text
 
@@ -86,122 +139,75 @@ class ArgosTranslator(BaseTranslator):
     def translate(self, text: str) -> str:
         return self.t.translate(text)
 
-def get_translator(provider: str, api_key: Optional[str], target: str) -> BaseTranslator:
-    provider = provider.lower()
+# Argos Translate a través del servidor local (modelos ya cargados, por lotes)
+class ArgosWorkerTranslator(BaseTranslator):
+    def __init__(self, target: str):
+        from translate_worker import WorkerClient
+        self.client = WorkerClient(target)
+    @property
+    def batch_size(self) -> int:
+        return self.client.batch_size
+    def translate(self, text: str) -> str:
+        return self.client.translate(text)
+    def translate_batch(self, texts: list[str]) -> list[str]:
+        return self.client.translate_batch(texts)
+
+def get_translator(provider: str, api_key: Optional[str], target: str,
+                   server_urls: Optional[list[str]] = None) -> BaseTranslator:
+    tr = _new_translator(provider.lower(), api_key, target, server_urls)
+    tr.name = provider.lower()
+    return tr
+
+def _new_translator(provider: str, api_key: Optional[str], target: str,
+                    server_urls: Optional[list[str]] = None) -> BaseTranslator:
     if provider == "googletrans":
-        return GoogleTransTranslator(target)
+        return GoogleTransTranslator(target, server_urls)
     if provider == "deepl":
         if not api_key:
             raise SystemExit("--api-key es obligatorio para DeepL")
-        return DeeplTranslator(api_key, target)
+        return DeeplTranslator(api_key, target, server_urls)
     if provider == "argos":
         return ArgosTranslator(target)
+    if provider == "argos-worker":
+        try:
+            return ArgosWorkerTranslator(target)
+        except RuntimeError as e:
+            raise SystemExit(f"❌ {e}")
     raise SystemExit(f"Proveedor desconocido: {provider}")
 
 # ────────────────────────────  Helpers de formato (Genéricos y Traysia MD) ───────────────────────────
-_pad_re = re.compile(r"@ *")
-
-def _uppercase_ratio(s: str) -> float:
-    letters = [c for c in s if c.isalpha()]
-    return sum(c.isupper() for c in letters) / len(letters) if letters else 0.0
-
-def is_badly_formatted(text: str, expected_ats: int) -> bool:
-    """Detecta si un texto tiene signos de formato incorrecto, aunque tenga el número correcto de '@'."""
-    if text.count("@") != expected_ats:
-        return True
-    for segment in text.split("@"):
-        if len(segment.strip()) > 16 and " " not in segment:
-            return True
-    return False
-
-
-def apply_formatting(es: str, de: str) -> str:
-    """Sincroniza mayúsculas y preserva la posición original de los '@'."""
-    de = re.sub(r"@+", " ", de)
-    if '@' not in es or len(de.split()) < 2:
-        return de.strip()
-
-    es_segs = es.split('@')
-    pads = [m.group(0)[1:] for m in _pad_re.finditer(es)]
-
-    de_words = de.split()
-    seg_count = len(es_segs)
-    if seg_count == 0:
-        return de.strip()
-
-    # distribuir palabras proporcionalmente
-    chunks = []
-    remaining = len(de_words)
-    avg = remaining // seg_count
-    i = 0
-    for n in range(seg_count - 1):
-        chunk_size = avg
-        if remaining - chunk_size < (seg_count - 1 - n):
-            chunk_size = 1  # asegurar al menos 1 palabra por segmento
-        chunks.append(de_words[i:i+chunk_size])
-        i += chunk_size
-        remaining -= chunk_size
-    chunks.append(de_words[i:])
-
-    de_segs = [' '.join(chunk) for chunk in chunks]
-
-    # detectar si hay palabras pegadas (sin espacios)
-    if any(len(seg) > 20 and ' ' not in seg for seg in de_segs):
-        return de.strip()
-
-    for i, (es_seg, de_seg) in enumerate(zip(es_segs, de_segs)):
-        ratio = _uppercase_ratio(es_seg)
-        if ratio > 0.8:
-            de_segs[i] = de_seg.upper()
-        elif es_seg[:1].isupper():
-            de_segs[i] = de_seg[:1].upper() + de_seg[1:]
-
-    rebuilt = de_segs[0].strip()
-    for i, pad in enumerate(pads):
-        segment = de_segs[i + 1].strip()
-        if not rebuilt.endswith(" "):
-            rebuilt += " "
-        rebuilt += "@" + pad
-        if not segment.startswith(" "):
-            rebuilt += " "
-        rebuilt += segment
-    return rebuilt
+# Las reglas de formato viven en text_format.py (patrones precompilados y
+# cache por original/salida del traductor).
 
 def truncate(text: str, limit: int, encoding="latin-1") -> str:
-    encoded_len = lambda t: len(encode_custom(t, encoding)) + 1
-    truncator = "/"
-    if encoded_len(text) <= limit:
-        return text
-    allowed = text
-    while encoded_len(allowed + truncator) > limit:
-        allowed = re.sub(r"\s?\S+$", "", allowed)
-        if not allowed:
-            truncator = ""  # ni siquiera cabe el truncador
-            allowed = text[:limit - 1]
-            break
-    return allowed.rstrip() + truncator
-
-def build_block(formatted: str, limit: int, translit: bool = True) -> dict:
+    # Recorte en tiempo lineal (sumas prefijas de bytes codificados), ver text_fit.py
+    return text_fit.truncate(text, limit, encoding)
+
+def build_block(formatted: str, limit: int, translit: bool = True,
+                shortener: Optional[Shortener] = None) -> dict:
     # La transliteración (ä→ae...) solo tiene sentido para alemán; la fuente
     # de Traysia no incluye esos glifos. Para otros idiomas se omite.
     text = transliterate_de(formatted) if translit else formatted
-    if len(encode_custom(text, "latin-1")) + 1 <= limit:
+    fitted, changed = fit_text(text, limit, shortener)
+    if not changed:
         return {"text": text}
-    return {"text": truncate(text, limit), "review": True}
+    return {"text": fitted, "review": True}
 
 # ───────────────────────  Cargar o iniciar german.json  ──────────────────────
 def load_or_init_de(dst: Path, es_data: list[dict], resume: bool):
     if resume and dst.exists():
-        existing = {item["offset"]: item for item in json.loads(dst.read_text("utf-8"))}
+        # Columnas + índice por offset: no hace falta un dict de dicts
+        existing = EntryStore.load(dst)
         updated = []
         for es in es_data:
-            entry = existing.get(es["offset"], {
+            row = existing.row_of(es["offset"])
+            entry = existing.entry(row) if row is not None else {
                 "offset": es["offset"],
                 "length": es["length"],
                 "text": "",
                 "text_translator": "",
                 "text_source": es.get("text_source", es["text"]),
-            })
+            }
             # Siempre actualizamos/insertamos offset_hex
             entry["offset_hex"] = f"0x{es['offset']:X}"
             entry.setdefault("text_translator", "")
@@ -273,49 +279,300 @@ def safe_translate(tr: BaseTranslator, text: str, retries: int, delay: float) ->
             backoff = delay * (2 ** attempt) + random.uniform(0, 0.2)
             time.sleep(backoff)
 
+def translate_routed(tr: BaseTranslator, text: str, retries: int, delay: float) -> tuple[str, str]:
+    """(traducción, motor que la produjo), con reintentos, para cualquier traductor."""
+    if hasattr(tr, "translate_routed"):
+        return tr.translate_routed(text, retries, delay)
+    return safe_translate(tr, text, retries, delay), tr.name
+
+def _reports(translators) -> list[str]:
+    return [f"  {line}" for tr in translators if hasattr(tr, "report") for line in tr.report()]
+
+# ──────────────────────  Peticiones duplicadas (hedging)  ────────────────────
+HEDGE_PERCENTILE = 90.0
+HEDGE_MIN_SAMPLES = 5       # latencias necesarias antes de fiarse del percentil
+HEDGE_INITIAL_WAIT = 2.0    # espera antes de duplicar mientras tanto (s)
+
+def parse_hedge(spec: str) -> tuple[str, Optional[float]]:
+    """'argos' o 'argos:95' → (proveedor, percentil o None si no se indica)."""
+    provider, _, pct = spec.partition(":")
+    if not pct:
+        return provider.lower(), None
+    try:
+        percentile = float(pct)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"percentil no válido en {spec!r}")
+    if not 0 < percentile <= 100:
+        raise argparse.ArgumentTypeError(f"el percentil de {spec!r} debe estar entre 0 y 100")
+    return provider.lower(), percentile
+
+class HedgedTranslator(BaseTranslator):
+    """Varios motores en cascada; gana la primera respuesta válida.
+
+    La frase va primero al motor principal. El motor k+1 se lanza cuando el
+    motor k lleva más que el percentil del motor k+1 (su `:PCT`) de las
+    últimas latencias del motor k, sin cancelar las peticiones en curso. Si
+    un motor falla, se pasa al siguiente sin esperar. El percentil del primer
+    motor no se usa. Las latencias se guardan por posición, así que el mismo
+    proveedor en dos niveles no mezcla sus medidas.
+    """
+    def __init__(self, tiers: list[tuple[BaseTranslator, float]]):
+        self.tiers = tiers
+        self.name = "+".join(tr.name for tr, _ in tiers)
+        self.latencies = [deque(maxlen=20) for _ in tiers]
+        self.wins: Counter[str] = Counter()
+        self.hedges = 0
+        # Las peticiones perdedoras siguen hasta terminar: hay hilos de sobra
+        self.pool = ThreadPoolExecutor(max_workers=4 * len(tiers), thread_name_prefix="hedge")
+
+    def threshold(self, tier: int) -> float:
+        """Segundos que se espera al motor `tier` antes de lanzar el siguiente."""
+        percentile = self.tiers[tier + 1][1]
+        lat = sorted(self.latencies[tier])
+        if len(lat) < HEDGE_MIN_SAMPLES:
+            return HEDGE_INITIAL_WAIT
+        return lat[min(len(lat) - 1, int(len(lat) * percentile / 100))]
+
+    def _call(self, tier: int, text: str, retries: int, delay: float) -> str:
+        tr = self.tiers[tier][0]
+        t0 = time.perf_counter()
+        out = safe_translate(tr, text, retries, delay)
+        self.latencies[tier].append(time.perf_counter() - t0)
+        if text.strip() and not (out or "").strip():
+            raise RuntimeError(f"{tr.name} devolvió una traducción vacía")
+        return out
+
+    def translate(self, text: str) -> str:
+        return self.translate_routed(text, 0, 0.5)[0]
+
+    def translate_routed(self, text: str, retries: int, delay: float) -> tuple[str, str]:
+        """(traducción, motor que la produjo)."""
+        running: dict = {}
+        launched = 0
+        deadline = 0.0
+        error: Optional[BaseException] = None
+        while True:
+            if launched < len(self.tiers) and (not running or time.perf_counter() >= deadline):
+                if launched:
+                    self.hedges += 1
+                    instrument.count("duplicadas")
+                running[self.pool.submit(self._call, launched, text, retries, delay)] = launched
+                launched += 1
+                if launched < len(self.tiers):
+                    deadline = time.perf_counter() + self.threshold(launched - 1)
+            if not running:
+                raise error
+            timeout = max(0.0, deadline - time.perf_counter()) if launched < len(self.tiers) else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = self.tiers[running.pop(future)][0].name
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # El siguiente motor se lanza ya, aunque otros sigan en curso
+                    error = e
+                    deadline = 0.0
+                    continue
+                self.wins[name] += 1
+                return result, name
+
+    def report(self) -> list[str]:
+        wins = ", ".join(f"{name} {n}" for name, n in self.wins.most_common())
+        return [f"hedging: {self.hedges} peticiones duplicadas; respuestas: {wins or 'ninguna'}",
+                *_reports(tr for tr, _ in self.tiers)]
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+# ─────────────────────────  Failover entre motores  ──────────────────────────
+DEFAULT_MAX_OUTAGE = 1800.0   # segundos seguidos sin ningún motor antes de cancelar
+
+class FailoverTranslator(BaseTranslator):
+    """Motores por orden de preferencia, cada uno con su disyuntor.
+
+    Cada frase va al primer motor con el disyuntor cerrado. Si se agotan sus
+    reintentos (o falla de cualquier otro modo) se anota el fallo y se prueba
+    el siguiente; un motor que falla seguido deja de recibir frases hasta que
+    pase su espera (ver backend_health.py). Si no queda ninguno disponible se
+    espera a que alguno admita una petición de prueba, y solo se cancela tras
+    `max_outage` segundos seguidos sin ninguna traducción.
+    """
+    def __init__(self, providers: list[BaseTranslator], max_outage: float = DEFAULT_MAX_OUTAGE):
+        self.providers = providers
+        self.name = providers[0].name
+        self.health = [Health(tr.name) for tr in providers]
+        self.max_outage = max_outage
+        self.failovers = 0
+        self.last_ok = time.monotonic()
+
+    def translate(self, text: str) -> str:
+        return self.translate_routed(text, 0, 0.5)[0]
+
+    def translate_routed(self, text: str, retries: int, delay: float) -> tuple[str, str]:
+        error: Optional[BaseException] = None
+        while True:
+            for i, (tr, health) in enumerate(zip(self.providers, self.health)):
+                if not health.acquire():
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    result = translate_routed(tr, text, retries, delay)
+                except Exception as e:
+                    opened = health.opened
+                    health.failure()
+                    error = e
+                    if health.opened > opened:
+                        print(f"\n⚠ {tr.name} desactivado {health.cooldown:.0f} s tras varios fallos: {e}")
+                    continue
+                health.success(time.perf_counter() - t0)
+                if i:
+                    self.failovers += 1
+                    instrument.count("failover")
+                self.last_ok = time.monotonic()
+                return result
+            wait_s = max(min(h.retry_in() for h in self.health), delay)
+            down = time.monotonic() - self.last_ok
+            if down + wait_s > self.max_outage:
+                raise RuntimeError(f"Ningún motor responde desde hace {down:.0f} s "
+                                   f"(último error: {error}); cancelo la ejecución.")
+            print(f"\n⏸ Ningún motor disponible; reintento en {wait_s:.1f} s")
+            time.sleep(wait_s)
+
+    def report(self) -> list[str]:
+        lines = [f"motor {h.summary()}" for h in self.health]
+        if self.failovers:
+            lines.append(f"failover: {self.failovers} frases traducidas por un motor de reserva")
+        return lines + _reports(self.providers)
+
+    def close(self) -> None:
+        for tr in self.providers:
+            if hasattr(tr, "close"):
+                tr.close()
+
 # ────────────────────────────  Bucle principal  ─────────────────────────────
-from tqdm import tqdm
+def _progress(iterable=None, **kwargs):
+    # tqdm se importa solo al mostrar una barra: --mode check (y quien importe
+    # este módulo, como traysia.py) no paga su coste de arranque
+    from tqdm import tqdm
+    return tqdm(iterable, **kwargs)
+
+def _store_translation(es_it: dict, de_it: dict, de_raw: str, translit: bool,
+                       rules: FormatRules, shortener: Optional[Shortener],
+                       glossary: Optional[Glossary] = None, provider: str = "") -> None:
+    de_fmt = apply_formatting(es_it["text"], de_raw, rules)
+    limit  = es_it["length"]
+    de_it.update(text_translator=de_raw, **build_block(de_fmt, limit, translit, shortener))
+    if provider:
+        de_it["provider"] = provider  # motor (o "memory") que dio text_translator
+    de_it["length"] = limit  # mantener valor original
+    instrument.count("frases")
+    # términos del glosario que el motor perdió o cambió
+    if glossary and glossary.missing(es_it["text"], de_raw):
+        de_it["review"] = True
+
+def _masked(glossary: Optional[Glossary], text: str) -> tuple[str, list[str]]:
+    return glossary.mask(text) if glossary else (text, [])
+
+def _unmasked(glossary: Optional[Glossary], es_text: str, de_raw: str,
+              replacements: list[str]) -> str:
+    if not glossary:
+        return de_raw
+    return glossary.enforce(es_text, glossary.unmask(de_raw, replacements))
+
+def _translate_batches(es_items: list[dict], de_items: list[dict], dst: Path,
+                       tr: BaseTranslator, save_every: int, translit: bool,
+                       rules: FormatRules, shortener: Optional[Shortener],
+                       glossary: Optional[Glossary] = None) -> None:
+    # Traductores locales por lotes (argos-worker): sin pausas entre
+    # peticiones; el tamaño de lote lo decide el propio traductor.
+    pending = [i for i, de_it in enumerate(de_items) if not de_it.get("text_translator")]
+    done = 0
+    with _progress(total=len(es_items), initial=len(es_items) - len(pending),
+              desc="Traduciendo", unit="frase") as bar:
+        while done < len(pending):
+            batch = pending[done:done + tr.batch_size]
+            masked = [_masked(glossary, es_items[i]["text"]) for i in batch]
+            outputs = tr.translate_batch([text for text, _ in masked])
+            instrument.count("peticiones")
+            for i, de_raw, (_, repl) in zip(batch, outputs, masked):
+                de_raw = _unmasked(glossary, es_items[i]["text"], de_raw, repl)
+                _store_translation(es_items[i], de_items[i], de_raw, translit, rules,
+                                   shortener, glossary, provider=tr.name)
+            bar.update(len(batch))
+            before, done = done, done + len(batch)
+            # guardado parcial (cada vez que se cruza un múltiplo de save_every)
+            if save_every and done // save_every != before // save_every:
+                save_entries(dst, de_items)
+
+def _apply_memory(es_items: list[dict], de_items: list[dict], memory: TranslationMemory,
+                  translit: bool, rules: FormatRules, shortener: Optional[Shortener],
+                  glossary: Optional[Glossary] = None) -> int:
+    # Frases con traducción en la memoria: quedan con text_translator y los
+    # bucles de traducción las saltan como si vinieran de un --resume
+    before = memory.hits
+    for es_it, de_it in zip(es_items, de_items):
+        if de_it.get("text_translator"):
+            continue
+        found = memory.get(es_it["text"])
+        if found is not None:
+            _store_translation(es_it, de_it, found, translit, rules, shortener, glossary,
+                               provider="memory")
+    used = memory.hits - before
+    instrument.count("memoria", used)
+    return used
 
 def translate_file(src: Path, dst: Path, tr: BaseTranslator,
                    retries: int, resume: bool, save_every: int,
-                   translit: bool = True):
-    es_items = json.loads(src.read_text("utf-8"))
+                   translit: bool = True, rules: FormatRules = DEFAULT_RULES,
+                   shortener: Optional[Shortener] = None,
+                   glossary: Optional[Glossary] = None,
+                   memory: Optional[TranslationMemory] = None):
+    es_items = load_entries(src)
+    instrument.add_read(src)
     de_items = load_or_init_de(dst, es_items, resume)
+    if memory:
+        used = _apply_memory(es_items, de_items, memory, translit, rules, shortener, glossary)
+        print(f"  memoria: {used} frases traducidas sin consultar el motor")
 
     delay = 0.5
     latencies: deque[float] = deque(maxlen=20)
 
     try:
-        for idx, (es_it, de_it) in enumerate(tqdm(zip(es_items, de_items),
-                                                  total=len(es_items),
-                                                  desc="Traduciendo",
-                                                  unit="frase")):
-            # saltar si ya hay traducción cruda
-            if de_it.get("text_translator"):
-                continue
-
-            es_text = es_it["text"]
-
-            t0 = time.perf_counter()
-            de_raw = safe_translate(tr, es_text, retries, delay)
-            lat = time.perf_counter() - t0
-            latencies.append(lat)
-
-            de_fmt = apply_formatting(es_text, de_raw)
-            limit  = es_it["length"]
-            de_it.update(text_translator=de_raw, **build_block(de_fmt, limit, translit))
-            de_it["length"] = limit  # mantener valor original
-
-            # ─ auto‑ajuste de la pausa ─
-            avg = sum(latencies) / len(latencies)
-            if avg < 0.7:
-                delay = max(delay / 2, 0.25)
-            elif avg > 2.0:
-                delay = min(delay * 1.5, 8.0)
-
-            # guardado parcial
-            if save_every and (idx + 1) % save_every == 0:
-                dst.write_text(json.dumps(de_items, ensure_ascii=False, indent=2), "utf-8")
+        if hasattr(tr, "translate_batch"):
+            _translate_batches(es_items, de_items, dst, tr, save_every,
+                               translit, rules, shortener, glossary)
+        else:
+            for idx, (es_it, de_it) in enumerate(_progress(zip(es_items, de_items),
+                                                           total=len(es_items),
+                                                           desc="Traduciendo",
+                                                           unit="frase")):
+                # saltar si ya hay traducción cruda
+                if de_it.get("text_translator"):
+                    continue
+
+                es_text = es_it["text"]
+                masked, repl = _masked(glossary, es_text)
+
+                t0 = time.perf_counter()
+                de_raw, provider = translate_routed(tr, masked, retries, delay)
+                lat = time.perf_counter() - t0
+                instrument.count("peticiones")
+                latencies.append(lat)
+
+                de_raw = _unmasked(glossary, es_text, de_raw, repl)
+                _store_translation(es_it, de_it, de_raw, translit, rules, shortener, glossary,
+                                   provider=provider)
+
+                # ─ auto‑ajuste de la pausa ─
+                avg = sum(latencies) / len(latencies)
+                if avg < 0.7:
+                    delay = max(delay / 2, 0.25)
+                elif avg > 2.0:
+                    delay = min(delay * 1.5, 8.0)
+
+                # guardado parcial
+                if save_every and (idx + 1) % save_every == 0:
+                    save_entries(dst, de_items)
     
     except KeyboardInterrupt:
         print("\n⏹ Traducción interrumpida por el usuario. Guardando y saliendo…")
@@ -327,93 +584,216 @@ def translate_file(src: Path, dst: Path, tr: BaseTranslator,
 
     finally:
         # siempre guarda al salir (cancelación o fin)
-        dst.write_text(json.dumps(de_items, ensure_ascii=False, indent=2), "utf-8")
+        save_entries(dst, de_items)
+        instrument.add_written(dst)
+        if hasattr(tr, "report"):
+            print("\n".join(f"  {line}" for line in tr.report()))
+        if hasattr(tr, "close"):
+            tr.close()
 
     print(f"✔ Traducción completa → {dst}")
 
 # ─────────────────────────────  Re‑formateo  ────────────────────────────────
-def format_file(src: Path, de_in: Path, de_out: Path, translit: bool = True):
-    es = json.loads(src.read_text("utf-8"))
-    de = json.loads(de_in.read_text("utf-8"))
-    if len(es) != len(de):
-        raise SystemExit("❌ Los archivos no tienen el mismo número de frases.")
-
-    for es_it, de_it in tqdm(zip(es, de), total=len(es), desc="Formateando", unit="frase"):
-        # Si no hay text_translator, no hay nada que formatear
-        if not de_it.get("text_translator"):
-            continue
-
-        # Si el campo 'review' es False, asumimos que fue revisado manualmente y no tocamos
-        if de_it.get("review") is False:
-            continue
-
-        candidate = de_it["text_translator"]
-        de_fmt = apply_formatting(es_it["text"], candidate)
-        limit = es_it["length"]
-        de_it.update(**build_block(de_fmt, limit, translit))
-        de_it["length"] = limit  # asegúrate de que se mantenga sincronizado
+DEFAULT_FORMAT_CACHE = ".cache/format-cache.json"
+
+def format_file(src: Path, de_in: Path, de_out: Path, translit: bool = True,
+                rules: FormatRules = DEFAULT_RULES,
+                cache_path: Optional[str] = DEFAULT_FORMAT_CACHE,
+                shortener: Optional[Shortener] = None,
+                glossary: Optional[Glossary] = None):
+    # Ambos archivos se recorren en streaming y la salida se genera entrada a
+    # entrada: la memoria no depende del tamaño del guion.
+    counter = {"items": 0, "glossary": 0}
+    formatter = Formatter(rules, cache_path)
+
+    def formatted():
+        es_iter, de_iter = iter_entries(src), iter_entries(de_in)
+        for es_it in es_iter:
+            de_it = next(de_iter, None)
+            if de_it is None:
+                raise SystemExit("❌ Los archivos no tienen el mismo número de frases.")
+            counter["items"] += 1
+            yield _format_entry(es_it, de_it, translit, formatter, shortener, glossary, counter)
+        if next(de_iter, None) is not None:
+            raise SystemExit("❌ Los archivos no tienen el mismo número de frases.")
+
+    items = _progress(formatted(), desc="Formateando", unit="frase")
+    changed = save_entries(de_out, items)
+    formatter.save()
+    instrument.add_read(src)
+    instrument.add_read(de_in)
+    instrument.count("frases", counter["items"])
+    if changed:
+        instrument.add_written(de_out)
+    print(f"  formato: {formatter.computed} recalculadas, {formatter.hits} desde cache")
+    if glossary:
+        print(f"  glosario: {counter['glossary']} frases con términos a revisar")
+    if changed:
+        print(f"✔ Formateadas {counter['items']} frases → {de_out}")
+    else:
+        print(f"✓ {counter['items']} frases ya formateadas; {de_out} no cambia")
+
+
+def _format_entry(es_it: dict, de_it: dict, translit: bool, formatter: Formatter,
+                  shortener: Optional[Shortener] = None,
+                  glossary: Optional[Glossary] = None,
+                  counter: Optional[dict] = None) -> dict:
+    # Si no hay text_translator, no hay nada que formatear
+    if not de_it.get("text_translator"):
+        return de_it
+
+    # Si el campo 'review' es False, asumimos que fue revisado manualmente y no tocamos
+    if de_it.get("review") is False:
+        return de_it
+
+    candidate = de_it["text_translator"]
+    if glossary:
+        # términos que el motor dejó sin traducir → su traducción fijada
+        candidate = glossary.enforce(es_it["text"], candidate)
+    de_fmt = formatter.format(es_it["text"], candidate)
+    limit = es_it["length"]
+    de_it.update(**build_block(de_fmt, limit, translit, shortener))
+    de_it["length"] = limit  # asegúrate de que se mantenga sincronizado
+    if glossary and glossary.missing(es_it["text"], candidate):
+        de_it["review"] = True
+        if counter is not None:
+            counter["glossary"] += 1
+    return de_it
 
-    de_out.write_text(json.dumps(de, ensure_ascii=False, indent=2), "utf-8")
-    print(f"✔ Formateadas {len(de)} frases → {de_out}")
 
 def check_format(dst: Path):
-    import re
-    data = json.loads(dst.read_text("utf-8"))
+    # Primera pasada en streaming: solo se reescribe el archivo si hay
+    # incidencias que aún no estaban marcadas para revisión.
     issues = []
-    for item in data:
+    pending = set()
+    for item in iter_entries(dst):
         txt = item.get("text", "")
-        found = False
-        if "@@" in txt:
-            found = True
-        if re.search(r"@[^\s@]", txt):
-            found = True
-        if re.search(r"[^\s@]@[a-zA-Z]", txt):
-            found = True
-        if found:
-            item["review"] = True
+        if format_issue(txt):
             issues.append((item.get("offset", -1), txt))
+            if item.get("review") is not True:
+                pending.add(item.get("offset", -1))
+    if pending:
+        def marked():
+            for item in iter_entries(dst):
+                if item.get("offset", -1) in pending and format_issue(item.get("text", "")):
+                    item["review"] = True
+                yield item
+        save_entries(dst, marked())
+    instrument.add_read(dst)
+    instrument.count("incidencias", len(issues))
     if issues:
-        print(f"⚠ Detectadas {len(issues)} posibles incidencias. Archivo actualizado.")
+        state = "Archivo actualizado." if pending else "Ya estaban marcadas para revisión."
+        print(f"⚠ Detectadas {len(issues)} posibles incidencias. {state}")
         for off, txt in issues:
             print(f"  Offset 0x{off:X}: \"{txt}\"")
     else:
         print("✓ Sin problemas de formato detectados.")
-    dst.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")   
 
 # ───────────────────────────────  CLI  ───────────────────────────────────────
-def cli():
+def cli(argv: list[str] | None = None):
     parser = argparse.ArgumentParser(description="Traductor de JSON [ES]→[DE/EN]")
     parser.add_argument("src", help="spanish.json original")
     parser.add_argument("dst", help="JSON destino (lectura/escritura)")
     parser.add_argument("--mode", choices=["translate", "format", "check"], default="translate")
-    parser.add_argument("--provider", choices=["googletrans", "deepl", "argos"],
-                        default="googletrans")
+    parser.add_argument("--provider", choices=PROVIDERS, default="googletrans")
     parser.add_argument("--target", choices=["de", "en"], default="de",
                         help="idioma de destino (por defecto: de)")
+    parser.add_argument("--hedge", type=parse_hedge, action="append", default=[],
+                        metavar="PROVIDER[:PCT]",
+                        help="motor secundario: recibe una copia de la petición si el anterior tarda "
+                             "más que el percentil PCT de sus latencias (por defecto --hedge-percentile); "
+                             "gana la primera respuesta (repetible)")
+    parser.add_argument("--hedge-percentile", type=float, default=HEDGE_PERCENTILE,
+                        help=f"percentil de los --hedge que no indican :PCT (por defecto {HEDGE_PERCENTILE:g})")
     parser.add_argument("--api-key", help="Clave API DeepL", default=None)
+    parser.add_argument("--server-url", metavar="URL", action="append",
+                        help="envía las peticiones de googletrans y DeepL a este servidor "
+                             "(p.ej. http://127.0.0.1:8765 de translate_standin.py); con varios, "
+                             "googletrans los usa como endpoints y DeepL el primero")
+    parser.add_argument("--fallback", action="append", default=[], metavar="PROVIDER",
+                        help="motor de reserva si el principal falla seguido (repetible, por orden)")
+    parser.add_argument("--max-outage", type=float, default=DEFAULT_MAX_OUTAGE,
+                        help="segundos seguidos sin ningún motor disponible antes de cancelar "
+                             f"(por defecto {DEFAULT_MAX_OUTAGE:g})")
     parser.add_argument("--max-retries", type=int, default=5, help="reintentos por frase")
     parser.add_argument("--resume", action="store_true", help="reanudar archivo existente")
     parser.add_argument("--save-every", type=int, default=DEFAULT_SAVE_EVERY,
                         help="guardar cada N frases (0 = solo al finalizar)")
-
-    args = parser.parse_args()
+    parser.add_argument("--upper-ratio", type=float, default=DEFAULT_RULES.upper_ratio,
+                        help="ratio de mayúsculas a partir del cual un segmento va en MAYÚSCULAS")
+    parser.add_argument("--glue-limit", type=int, default=DEFAULT_RULES.glue_limit,
+                        help="longitud de un segmento sin espacios que se considera palabras pegadas")
+    parser.add_argument("--shorten", metavar="JSON",
+                        help="abreviaturas/sinónimos para acortar antes de recortar "
+                             '({"abbreviations": {...}, "synonyms": {...}})')
+    parser.add_argument("--glossary", metavar="JSON",
+                        help="glosario de términos fijos (nombres, lugares, objetos) "
+                             "que se protegen al traducir y se validan al formatear")
+    parser.add_argument("--memory", metavar="JSON",
+                        help="memoria de traducción (text_source → text), p.ej. el corpus de align_bilingual.py")
+    parser.add_argument("--memory-max-cost", type=float, default=DEFAULT_MAX_COST,
+                        help="coste de alineamiento máximo de las entradas de la memoria")
+    parser.add_argument("--format-cache", default=DEFAULT_FORMAT_CACHE,
+                        help="cache del modo format ('' para desactivarla)")
+    instrument.add_arguments(parser)
+
+    args = parser.parse_args(argv)
+    with instrument.session(args, f"translate_spanish_to_german {args.mode}"):
+        _run(args)
+
+def _secondary(provider: str, option: str, args: argparse.Namespace) -> BaseTranslator:
+    if provider == "argos-worker" or provider not in PROVIDERS:
+        raise SystemExit(f"{option}: motor no válido: {provider}")
+    return get_translator(provider, args.api_key, args.target, args.server_url)
+
+def _run(args: argparse.Namespace) -> None:
     src, dst = Path(args.src), Path(args.dst)
     translit = args.target == "de"
+    rules = FormatRules(upper_ratio=args.upper_ratio, glue_limit=args.glue_limit)
+    shortener = Shortener.from_file(args.shorten) if args.shorten else None
+    glossary = Glossary.from_file(args.glossary, args.target) if args.glossary else None
 
     if args.mode == "format":
-        format_file(src, dst, dst, translit=translit)
+        with instrument.phase("formatear"):
+            format_file(src, dst, dst, translit=translit, rules=rules,
+                        cache_path=args.format_cache or None, shortener=shortener,
+                        glossary=glossary)
         return
     if args.mode == "check":
-        check_format(dst)
+        with instrument.phase("check"):
+            check_format(dst)
         return
 
-    translator = get_translator(args.provider, args.api_key, args.target)
+    memory = None
+    if args.memory:
+        memory = TranslationMemory.from_file(args.memory, args.target, args.memory_max_cost)
+        instrument.add_read(args.memory)
+    with instrument.phase("iniciar motor"):
+        translator = get_translator(args.provider, args.api_key, args.target, args.server_url)
+        batch = hasattr(translator, "translate_batch")
+        if batch and (args.hedge or args.fallback):
+            raise SystemExit("--hedge y --fallback no se pueden usar con un motor por lotes (argos-worker)")
+        if args.hedge:
+            tiers = [(translator, args.hedge_percentile)]
+            for provider, percentile in args.hedge:
+                if percentile is None:
+                    percentile = args.hedge_percentile
+                tiers.append((_secondary(provider, "--hedge", args), percentile))
+            translator = HedgedTranslator(tiers)
+        if not batch:
+            fallbacks = [_secondary(provider.lower(), "--fallback", args) for provider in args.fallback]
+            translator = FailoverTranslator([translator, *fallbacks], args.max_outage)
     try:
-        translate_file(src, dst, translator,
-                      retries=args.max_retries,
-                      resume=args.resume,
-                      save_every=args.save_every,
-                      translit=translit)
+        with instrument.phase("traducir"):
+            translate_file(src, dst, translator,
+                          retries=args.max_retries,
+                          resume=args.resume,
+                          save_every=args.save_every,
+                          translit=translit,
+                          rules=rules,
+                          shortener=shortener,
+                          glossary=glossary,
+                          memory=memory)
     except KeyboardInterrupt:
         print("\n⏹ Ejecución cancelada por el usuario. ¡Hasta luego!")
         return
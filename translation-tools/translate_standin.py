@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""Servidor local que imita a Google Translate y DeepL, para pruebas de carga.
+
+Los motores googletrans y DeepL de translate_spanish_to_german.py solo se
+pueden probar contra los servicios reales, así que los reintentos, la espera
+exponencial y la pausa adaptable no se pueden medir ni comprobar sin gastar
+cuota ni arriesgarse a un bloqueo. Este servidor (solo librería estándar)
+habla lo justo de los dos protocolos para que los clientes reales funcionen:
+
+  - googletrans 4.0.0rc1: POST /_/TranslateWebserverUi/data/batchexecute
+    (y el antiguo GET /translate_a/single);
+  - DeepL (librería oficial `deepl`): POST /v2/translate y GET /v2/usage.
+
+La "traducción" es el texto original con el idioma delante ("[de] Hola").
+El comportamiento del servicio se configura con:
+
+  - `--latency`: distribución de la latencia de cada respuesta
+    (fixed:S, uniform:A,B, lognormal:MEDIANA,SIGMA o exp:MEDIA, en segundos);
+  - `--rate-429`, `--rate-5xx`, `--rate-captcha`: probabilidad de responder
+    429, 503 o una página HTML de CAPTCHA con código 200 (lo que hace Google
+    cuando detecta tráfico automático);
+  - `--max-rps`: peticiones por segundo admitidas; el exceso recibe 429;
+  - `--max-concurrent`: peticiones atendidas a la vez; el resto espera turno.
+
+`load` arranca el servidor en segundo plano (o usa `--url`) y traduce el mismo
+lote de frases con cada configuración de cliente (`--client PROVEEDOR:HILOS`)
+a través de `safe_translate`, con los reintentos de la CLI. Para cada una
+muestra frases/s, latencia p50/p99 por frase (reintentos incluidos), los
+errores que llegan al usuario y las respuestas que dio el servidor.
+
+Uso:
+    python translation-tools/translate_standin.py serve --port 8765 --latency lognormal:0.3,0.6 --rate-captcha 0.02
+    python translation-tools/translate_spanish_to_german.py spanish.json german.json --server-url http://127.0.0.1:8765
+
+    python translation-tools/translate_standin.py load --client googletrans:1 --client deepl:4 --rate-429 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+# Evita errores de codificacion en consolas que no son UTF-8 (p.ej. cp1252)
+try:
+    sys.stdout.reconfigure(errors="replace")
+except AttributeError:
+    pass
+
+DEFAULT_PORT = 8765
+DEFAULT_LATENCY = "lognormal:0.25,0.5"
+DEFAULT_STRINGS = 200
+DEFAULT_CLIENTS = ("googletrans:1", "googletrans:4", "deepl:1", "deepl:4")
+API_KEY = "standin:fx"          # DeepL exige una clave; el servidor acepta cualquiera
+
+RPC_PATH = "/_/TranslateWebserverUi/data/batchexecute"
+RPC_ID = "MkEWBc"               # identificador de la llamada de traducción de googletrans
+
+CAPTCHA_PAGE = b"""<html><head><title>Sorry...</title></head><body>
+<div>Our systems have detected unusual traffic from your computer network.
+Please solve the CAPTCHA below to continue.</div><form id="captcha-form"></form>
+</body></html>"""
+
+# ───────────────────────────  Comportamiento  ────────────────────────────────
+class Latency:
+    """Distribución de latencias: 'fixed:S', 'uniform:A,B', 'lognormal:MEDIANA,SIGMA', 'exp:MEDIA'."""
+
+    KINDS = {"fixed": 1, "uniform": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        try:
+            values = [float(v) for v in params.split(",")] if params else []
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"latencia no válida: {spec!r}")
+        if self.KINDS.get(kind) != len(values) or any(v < 0 for v in values):
+            raise argparse.ArgumentTypeError(
+                f"latencia no válida: {spec!r} (fixed:S, uniform:A,B, lognormal:MEDIANA,SIGMA o exp:MEDIA)")
+        self.spec, self.kind, self.values = spec, kind, values
+
+    def sample(self, rng: random.Random) -> float:
+        v = self.values
+        if self.kind == "fixed":
+            return v[0]
+        if self.kind == "uniform":
+            return rng.uniform(v[0], v[1])
+        if self.kind == "lognormal":
+            return v[0] * math.exp(rng.gauss(0.0, v[1])) if v[0] else 0.0
+        return rng.expovariate(1 / v[0]) if v[0] else 0.0
+
+
+class Faults:
+    """Latencia, errores inyectados y límites de capacidad del servidor."""
+
+    __slots__ = ("latency", "rate_429", "rate_5xx", "rate_captcha", "max_rps", "max_concurrent")
+
+    def __init__(self, latency: Latency, rate_429: float = 0.0, rate_5xx: float = 0.0,
+                 rate_captcha: float = 0.0, max_rps: float = 0.0, max_concurrent: int = 0):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.rate_captcha = rate_captcha
+        # 0 = sin límite
+        self.max_rps = max_rps
+        self.max_concurrent = max_concurrent
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "Faults":
+        return cls(args.latency, args.rate_429, args.rate_5xx, args.rate_captcha,
+                   args.max_rps, args.max_concurrent)
+
+    def describe(self) -> str:
+        parts = [f"latencia {self.latency.spec}"]
+        for label, rate in (("429", self.rate_429), ("5xx", self.rate_5xx), ("CAPTCHA", self.rate_captcha)):
+            if rate:
+                parts.append(f"{label} {rate:.0%}")
+        if self.max_rps:
+            parts.append(f"máx. {self.max_rps:g} pet/s")
+        if self.max_concurrent:
+            parts.append(f"máx. {self.max_concurrent} a la vez")
+        return ", ".join(parts)
+
+
+class StandIn:
+    """Decide cómo responde el servidor a cada petición y lleva la cuenta."""
+
+    def __init__(self, faults: Faults, seed: int = 0):
+        self.faults = faults
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats: Counter[str] = Counter()
+        # Caracteres servidos por /v2/translate, como el contador de DeepL
+        self.characters = 0
+        self.slots = threading.BoundedSemaphore(faults.max_concurrent) if faults.max_concurrent else None
+        # Cubo de fichas para --max-rps: admite ráfagas de hasta un segundo
+        self.tokens = faults.max_rps
+        self.refilled = time.monotonic()
+
+    def _admit(self) -> bool:
+        if not self.faults.max_rps:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.faults.max_rps, self.tokens + (now - self.refilled) * self.faults.max_rps)
+        self.refilled = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def outcome(self) -> str:
+        """'ok', '429', '5xx' o 'captcha', tras la latencia simulada."""
+        faults = self.faults
+        with self.lock:
+            if not self._admit():
+                self.stats["429 (límite)"] += 1
+                return "429"
+            latency = faults.latency.sample(self.rng)
+            roll = self.rng.random()
+        if self.slots:
+            with self.slots:
+                time.sleep(latency)
+        else:
+            time.sleep(latency)
+        if roll < faults.rate_429:
+            result = "429"
+        elif roll < faults.rate_429 + faults.rate_5xx:
+            result = "5xx"
+        elif roll < faults.rate_429 + faults.rate_5xx + faults.rate_captcha:
+            result = "captcha"
+        else:
+            result = "ok"
+        with self.lock:
+            self.stats[result] += 1
+        return result
+
+    def bill(self, texts: list[str]) -> None:
+        with self.lock:
+            self.characters += sum(map(len, texts))
+
+    def reset(self) -> Counter[str]:
+        with self.lock:
+            stats, self.stats = self.stats, Counter()
+        return stats
+
+
+def pseudo_translate(text: str, target: str) -> str:
+    return f"[{target.lower()}] {text}"
+
+# ─────────────────────────────  Protocolos  ──────────────────────────────────
+def google_rpc_body(text: str, source: str, target: str) -> bytes:
+    """Respuesta de batchexecute con la forma que analiza googletrans 4.0.0rc1."""
+    translated = pseudo_translate(text, target)
+    detected = "es" if source == "auto" else source
+    parsed = [[None, None, detected],
+              [[[None, None, None, True, None, [[translated, None, None, None, [[translated, [1]]]]]]],
+               target, 1, detected, [text, source, target, True]],
+              detected]
+    envelope = json.dumps([["wrb.fr", RPC_ID, json.dumps(parsed, ensure_ascii=False),
+                            None, None, None, "generic"], ["di", 38]], ensure_ascii=False)
+    return f")]}}'\n\n{len(envelope)}\n{envelope}\n".encode("utf-8")
+
+
+def google_legacy_body(text: str, source: str, target: str) -> bytes:
+    """Respuesta de /translate_a/single (clientes gtx y versiones antiguas)."""
+    data = [[[pseudo_translate(text, target), text, None, None, 10]], None,
+            "es" if source == "auto" else source]
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def _rpc_request(form: dict[str, list[str]]) -> tuple[str, str, str]:
+    """(texto, origen, destino) del campo f.req de googletrans."""
+    outer = json.loads(form["f.req"][0])
+    text, source, target = json.loads(outer[0][0][1])[0][:3]
+    return text, source, target
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # conexiones persistentes, como los servicios reales
+    disable_nagle_algorithm = True      # cabeceras y cuerpo van en escrituras separadas
+    standin: StandIn
+    verbose = False
+
+    def log_message(self, fmt: str, *args) -> None:
+        if self.verbose:
+            super().log_message(fmt, *args)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json; charset=utf-8") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, data: object) -> None:
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _fault(self, outcome: str, deepl: bool) -> bool:
+        """Envía la respuesta de error de `outcome`; False si la petición sigue."""
+        if outcome == "ok":
+            return False
+        if outcome == "captcha":
+            self._send(200, CAPTCHA_PAGE, "text/html; charset=utf-8")
+        elif deepl:
+            status, message = (429, "Too many requests") if outcome == "429" else (503, "Service unavailable")
+            self._json(status, {"message": message})
+        else:
+            status = 429 if outcome == "429" else 503
+            self._send(status, CAPTCHA_PAGE if status == 429 else b"<html>Error 503</html>",
+                       "text/html; charset=utf-8")
+        return True
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/_stats":
+            return self._json(200, dict(self.standin.stats))
+        if url.path == "/v2/usage":
+            return self._json(200, {"character_count": self.standin.characters,
+                                    "character_limit": 500000})
+        if url.path == "/translate_a/single":
+            if self._fault(self.standin.outcome(), deepl=False):
+                return
+            return self._send(200, google_legacy_body(query.get("q", [""])[0], query.get("sl", ["auto"])[0],
+                                                      query.get("tl", ["en"])[0]))
+        if url.path == "/":
+            # googletrans 3.x busca aquí el valor TKK para firmar las peticiones
+            return self._send(200, b"<html><script>tkk:'0.0'</script></html>", "text/html; charset=utf-8")
+        self._json(404, {"message": "Not found"})
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        body = self._body()
+        if url.path == "/_reset":
+            return self._json(200, dict(self.standin.reset()))
+        if url.path == RPC_PATH:
+            try:
+                text, source, target = _rpc_request(parse_qs(body.decode("utf-8")))
+            except (KeyError, IndexError, ValueError):
+                return self._send(400, b"<html>Bad Request</html>", "text/html; charset=utf-8")
+            if self._fault(self.standin.outcome(), deepl=False):
+                return
+            return self._send(200, google_rpc_body(text, source, target),
+                              "application/json; charset=utf-8")
+        if url.path == "/v2/translate":
+            if not self.headers.get("Authorization", "").startswith("DeepL-Auth-Key "):
+                return self._json(403, {"message": "Wrong endpoint or missing auth key"})
+            # Las versiones recientes de `deepl` envían JSON; las antiguas, un formulario
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                request = json.loads(body or b"{}")
+            else:
+                request = {k: v if k == "text" else v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+            texts = request.get("text") or []
+            texts = [texts] if isinstance(texts, str) else texts
+            target = str(request.get("target_lang", ""))
+            if not texts or not target:
+                return self._json(400, {"message": "Value for 'text' and 'target_lang' not provided"})
+            if self._fault(self.standin.outcome(), deepl=True):
+                return
+            source = str(request.get("source_lang") or "ES").upper()
+            self.standin.bill(texts)
+            return self._json(200, {"translations": [
+                {"detected_source_language": source, "text": pseudo_translate(t, target.split("-")[0]),
+                 "billed_characters": len(t)} for t in texts]})
+        self._json(404, {"message": "Not found"})
+
+
+def make_server(standin: StandIn, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                verbose: bool = False) -> ThreadingHTTPServer:
+    handler = type("StandInHandler", (Handler,), {"standin": standin, "verbose": verbose})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_background(standin: StandIn) -> tuple[ThreadingHTTPServer, str]:
+    """Servidor en un puerto libre y en un hilo aparte; devuelve (servidor, URL)."""
+    server = make_server(standin, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+# ─────────────────────────────  Carga  ───────────────────────────────────────
+def parse_client(spec: str) -> tuple[str, int]:
+    """'deepl' o 'deepl:4' → (proveedor, hilos)."""
+    provider, _, threads = spec.partition(":")
+    if provider not in ("googletrans", "deepl"):
+        raise argparse.ArgumentTypeError(f"cliente no válido: {provider!r} (googletrans o deepl)")
+    try:
+        n = int(threads) if threads else 1
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"número de hilos no válido en {spec!r}")
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"número de hilos no válido en {spec!r}")
+    return provider, n
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, max(0, math.ceil(len(values) * pct / 100) - 1))]
+
+
+def load_texts(src: Optional[str], count: int, seed: int) -> list[str]:
+    """Frases de un JSON de traducción o, sin él, de una ROM sintética."""
+    if src:
+        from translation_io import iter_entries
+        texts = [e["text"] for e in iter_entries(src) if e.get("text")]
+    else:
+        import synth_rom
+        import translate_spanish
+        rom = bytes(synth_rom.make_rom(seed=seed))
+        texts = [s["text"] for start, end in translate_spanish.BLOCKS
+                 for s in translate_spanish.extract_strings(rom, start, end, "latin-1")]
+    return texts[:count]
+
+
+def run_client(provider: str, threads: int, texts: list[str], url: str, target: str,
+               retries: int, delay: float) -> dict:
+    """Traduce `texts` con `threads` hilos (un cliente por hilo) y mide cada frase."""
+    import translate_spanish_to_german as tsg
+
+    local = threading.local()
+    latencies: list[float] = []
+    errors: Counter[str] = Counter()
+    lock = threading.Lock()
+
+    def one(text: str) -> None:
+        if not hasattr(local, "tr"):
+            local.tr = tsg.get_translator(provider, API_KEY, target, [url])
+        t0 = time.perf_counter()
+        try:
+            tsg.safe_translate(local.tr, text, retries, delay)
+        except Exception as e:     # se cuenta: es lo que vería el usuario
+            with lock:
+                errors[type(e).__name__] += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, texts))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {"client": provider, "threads": threads, "strings": len(texts), "ok": len(latencies),
+            "seconds": round(wall, 3), "strings_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+            "p50": round(percentile(latencies, 50), 4), "p99": round(percentile(latencies, 99), 4),
+            "errors": dict(errors)}
+
+
+def _server_stats(url: str, reset: bool) -> dict:
+    from urllib.request import Request, urlopen
+    request = Request(url + ("/_reset" if reset else "/_stats"), data=b"" if reset else None)
+    with urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def load_test(args: argparse.Namespace) -> None:
+    server = None
+    url = args.url
+    if not url:
+        server, url = start_background(StandIn(Faults.from_args(args), args.seed))
+        print(f"Servidor de pruebas en {url}: {server.RequestHandlerClass.standin.faults.describe()}")
+    texts = load_texts(args.src, args.strings, args.seed)
+    print(f"{len(texts)} frases por cliente, {args.max_retries} reintentos\n")
+    print(f"  {'cliente':<12} {'hilos':>5} {'frases/s':>9} {'p50':>8} {'p99':>8}  errores / respuestas del servidor")
+    results = []
+    try:
+        for provider, threads in args.client or [parse_client(c) for c in DEFAULT_CLIENTS]:
+            _server_stats(url, reset=True)
+            try:
+                result = run_client(provider, threads, texts, url, args.target, args.max_retries, args.delay)
+            except ImportError as e:
+                print(f"  {provider:<12} {threads:>5}  (sin la librería del cliente: {e.name})")
+                continue
+            result["server"] = _server_stats(url, reset=True)
+            results.append(result)
+            errors = ", ".join(f"{k} {v}" for k, v in result["errors"].items()) or "sin errores"
+            served = ", ".join(f"{k} {v}" for k, v in sorted(result["server"].items()))
+            print(f"  {provider:<12} {threads:>5} {result['strings_per_s']:>9.2f} "
+                  f"{result['p50'] * 1000:>6.0f}ms {result['p99'] * 1000:>6.0f}ms  {errors} / {served}")
+    finally:
+        if server:
+            server.shutdown()
+    if args.json:
+        path = Path(args.json)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"faults": args.url or server.RequestHandlerClass.standin.faults.describe(),
+                                    "results": results}, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n✔ Resultados → {path}")
+
+# ───────────────────────────────  CLI  ───────────────────────────────────────
+def _add_fault_arguments(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--latency", type=Latency, default=Latency(DEFAULT_LATENCY),
+                   help=f"distribución de la latencia en segundos (por defecto {DEFAULT_LATENCY})")
+    p.add_argument("--rate-429", type=float, default=0.0, help="probabilidad de responder 429")
+    p.add_argument("--rate-5xx", type=float, default=0.0, help="probabilidad de responder 503")
+    p.add_argument("--rate-captcha", type=float, default=0.0,
+                   help="probabilidad de responder una página HTML de CAPTCHA (código 200)")
+    p.add_argument("--max-rps", type=float, default=0.0,
+                   help="peticiones por segundo admitidas; el exceso recibe 429 (0 = sin límite)")
+    p.add_argument("--max-concurrent", type=int, default=0,
+                   help="peticiones atendidas a la vez; el resto espera (0 = sin límite)")
+    p.add_argument("--seed", type=int, default=0, help="semilla de latencias y errores")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Servidor local que imita a Google Translate y DeepL")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_serve = sub.add_parser("serve", help="arranca el servidor en primer plano")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--verbose", action="store_true", help="muestra cada petición")
+    _add_fault_arguments(p_serve)
+
+    p_load = sub.add_parser("load", help="mide frases/s y latencias de cada configuración de cliente")
+    p_load.add_argument("--client", type=parse_client, action="append", metavar="PROVEEDOR[:HILOS]",
+                        help="googletrans o deepl con N hilos (repetible; por defecto "
+                             f"{' '.join(DEFAULT_CLIENTS)})")
+    p_load.add_argument("--url", help="usar un servidor ya en marcha en vez de arrancar uno")
+    p_load.add_argument("--src", help="JSON de traducción con las frases (por defecto, ROM sintética)")
+    p_load.add_argument("--strings", type=int, default=DEFAULT_STRINGS, help="frases por cliente")
+    p_load.add_argument("--target", choices=["de", "en"], default="de")
+    p_load.add_argument("--max-retries", type=int, default=5, help="reintentos por frase (como la CLI)")
+    p_load.add_argument("--delay", type=float, default=0.5, help="espera inicial entre reintentos")
+    p_load.add_argument("--json", help="guardar los resultados en este JSON")
+    _add_fault_arguments(p_load)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "serve":
+        server = make_server(StandIn(Faults.from_args(args), args.seed), args.host, args.port, args.verbose)
+        print(f"Servidor de pruebas en http://{args.host}:{server.server_address[1]} "
+              f"({server.RequestHandlerClass.standin.faults.describe()}); Ctrl+C para salir")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    else:
+        load_test(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""Servidor local de traducción offline (Argos Translate) con modelos residentes.
+
+Con `--provider argos` cada ejecución de translate_spanish_to_german.py carga
+el modelo ES→destino desde cero y traduce frase a frase en un solo núcleo, así
+que una sesión corta de `--resume` se pasa casi todo el tiempo cargando.
+
+Este servidor mantiene los modelos cargados entre ejecuciones:
+
+  - Un proceso por núcleo (`--workers`), cada uno con su copia del modelo,
+    cargada una sola vez al arrancar. Cada proceso usa un único hilo de
+    CTranslate2 para no competir con los demás.
+  - Recibe lotes de frases; las reparte entre los procesos equilibrando la
+    longitud total de cada parte y devuelve las traducciones en orden.
+  - Escucha en un socket Unix (una tubería con nombre en Windows) y se cierra
+    solo tras `--idle-timeout` segundos sin peticiones.
+
+El cliente (`WorkerClient`, proveedor `argos-worker`) arranca el servidor en
+segundo plano si no está en marcha y elige solo el tamaño de lote a partir de
+la velocidad medida, para que cada lote tarde unos `BATCH_SECONDS` segundos.
+
+Uso:
+    python translation-tools/translate_worker.py serve --target de   # primer plano
+    python translation-tools/translate_worker.py status
+    python translation-tools/translate_worker.py stop
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import secrets
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Optional
+
+if sys.platform == "win32":
+    DEFAULT_ADDRESS = r"\\.\pipe\traysia-translate"
+else:
+    DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), f"traysia-translate-{os.getuid()}.sock")
+KEY_BYTES = 32
+SOURCE = "es"
+DEFAULT_IDLE_TIMEOUT = 1800      # segundos sin peticiones antes de cerrarse
+STARTUP_TIMEOUT = 60.0
+# Tamaño de lote automático: cada lote debería tardar unos BATCH_SECONDS
+BATCH_SECONDS = 2.0
+MIN_BATCH = 4
+MAX_BATCH = 512
+
+# ─────────────────────────────────  Clave  ───────────────────────────────────
+def key_path(address: str) -> Path:
+    """Archivo con la clave del servidor: junto al socket (en Windows, en el temporal del usuario)."""
+    if sys.platform == "win32":
+        return Path(tempfile.gettempdir()) / (address.rsplit("\\", 1)[-1] + ".key")
+    return Path(address + ".key")
+
+
+def authkey(address: str = DEFAULT_ADDRESS) -> bytes:
+    """Clave aleatoria del usuario para autenticar cliente y servidor.
+
+    Tras la autenticación, multiprocessing.connection deserializa (pickle) lo
+    que recibe: la clave no puede ser pública. Se genera al primer arranque
+    en un archivo 0600 y se rechaza si es de otro usuario o la pueden leer
+    otros (alguien podría haberla dejado preparada en el directorio temporal).
+    """
+    path = key_path(address)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "wb") as f:
+            f.write(secrets.token_bytes(KEY_BYTES))
+    if sys.platform != "win32":
+        info = os.stat(path)
+        if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+            raise RuntimeError(f"La clave {path} es de otro usuario o la pueden leer otros; bórrela")
+    key = path.read_bytes()
+    if len(key) < KEY_BYTES:
+        # Otro proceso la está creando en este momento
+        time.sleep(0.1)
+        key = path.read_bytes()
+    if len(key) < KEY_BYTES:
+        raise RuntimeError(f"La clave {path} está incompleta; bórrela")
+    return key
+
+
+# ───────────────────────────  Procesos de trabajo  ───────────────────────────
+_MODEL = None
+_MODEL_ERROR: Optional[str] = None
+
+
+def _load_model(source: str, target: str) -> None:
+    """Inicializador de cada proceso: carga el modelo una sola vez."""
+    global _MODEL, _MODEL_ERROR
+    # Un hilo por proceso: el paralelismo lo dan los procesos
+    os.environ.setdefault("ARGOS_INTER_THREADS", "1")
+    os.environ.setdefault("ARGOS_INTRA_THREADS", "1")
+    import argostranslate.translate as at
+    src = tgt = None
+    for lang in at.get_installed_languages():
+        if lang.code == source: src = lang
+        if lang.code == target: tgt = lang
+    if not (src and tgt):
+        # Si el inicializador lanzara la excepción el pool quedaría roto sin
+        # explicar por qué; se informa en cada petición
+        _MODEL_ERROR = f"Falta el modelo {source.upper()}→{target.upper()} en Argos Translate."
+        return
+    _MODEL = src.get_translation(tgt)
+
+
+def _translate_chunk(texts: list[str]) -> list[str]:
+    if _MODEL is None:
+        raise RuntimeError(_MODEL_ERROR)
+    return [_MODEL.translate(t) if t.strip() else t for t in texts]
+
+
+def _ready() -> bool:
+    return _MODEL is not None
+
+
+def split_balanced(texts: list[str], parts: int) -> list[list[int]]:
+    """Reparte los índices de `texts` en `parts` grupos de longitud total parecida."""
+    parts = max(1, min(parts, len(texts)))
+    groups: list[list[int]] = [[] for _ in range(parts)]
+    loads = [0] * parts
+    # De mayor a menor, cada frase al grupo menos cargado
+    for i in sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True):
+        k = loads.index(min(loads))
+        groups[k].append(i)
+        loads[k] += len(texts[i]) + 1
+    return [g for g in groups if g]
+
+
+# ───────────────────────────────  Servidor  ──────────────────────────────────
+class TranslateServer:
+    def __init__(self, address: str = DEFAULT_ADDRESS, workers: Optional[int] = None,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.address = address
+        self.workers = workers or os.cpu_count() or 1
+        self.idle_timeout = idle_timeout
+        self.pools: dict[str, ProcessPoolExecutor] = {}
+        self.translated = 0
+        self._lock = threading.Lock()
+        self._last = time.monotonic()
+        self._stopping = threading.Event()
+
+    def pool(self, target: str) -> ProcessPoolExecutor:
+        with self._lock:
+            pool = self.pools.get(target)
+            if pool is None:
+                pool = ProcessPoolExecutor(self.workers, initializer=_load_model,
+                                           initargs=(SOURCE, target))
+                self.pools[target] = pool
+            return pool
+
+    def warm(self, target: str) -> None:
+        # Fuerza el arranque de todos los procesos (y la carga del modelo)
+        pool = self.pool(target)
+        for future in [pool.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+
+    def translate(self, target: str, texts: list[str]) -> list[str]:
+        pool = self.pool(target)
+        groups = split_balanced(texts, self.workers)
+        futures = [pool.submit(_translate_chunk, [texts[i] for i in g]) for g in groups]
+        out: list[str] = [""] * len(texts)
+        for group, future in zip(groups, futures):
+            for i, text in zip(group, future.result()):
+                out[i] = text
+        self.translated += len(texts)
+        return out
+
+    def _handle(self, request: dict):
+        op = request.get("op")
+        if op == "translate":
+            return self.translate(request["target"], request["texts"])
+        if op == "status":
+            return {"pid": os.getpid(), "workers": self.workers,
+                    "targets": sorted(self.pools), "translated": self.translated}
+        if op == "stop":
+            self.stop()
+            return True
+        raise ValueError(f"Operación desconocida: {op!r}")
+
+    def _serve_client(self, conn) -> None:
+        with conn:
+            while not self._stopping.is_set():
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                self._last = time.monotonic()
+                try:
+                    reply = ("ok", self._handle(request))
+                except Exception as exc:
+                    reply = ("error", f"{type(exc).__name__}: {exc}")
+                self._last = time.monotonic()
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+
+    def _watch_idle(self) -> None:
+        while not self._stopping.wait(min(self.idle_timeout, 30)):
+            if time.monotonic() - self._last > self.idle_timeout:
+                print("⏹ Sin peticiones; cerrando el servidor de traducción.")
+                self.stop()
+
+    def stop(self) -> None:
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        # Despierta al accept() del bucle principal
+        try:
+            Client(self.address, authkey=authkey(self.address)).close()
+        except (OSError, AuthenticationError):
+            pass
+
+    def serve(self, warm: tuple[str, ...] = ()) -> None:
+        if is_running(self.address):
+            raise SystemExit(f"❌ Ya hay un servidor escuchando en {self.address}")
+        if sys.platform != "win32" and os.path.exists(self.address):
+            os.unlink(self.address)    # socket de un servidor que no se cerró bien
+        listener = Listener(self.address, authkey=authkey(self.address))
+        print(f"🟢 Servidor de traducción en {self.address} ({self.workers} procesos)")
+        for target in warm:
+            threading.Thread(target=self.warm, args=(target,), daemon=True).start()
+        if self.idle_timeout:
+            threading.Thread(target=self._watch_idle, daemon=True).start()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    conn = listener.accept()
+                except Exception:
+                    # autenticación fallida o conexión rota: seguir escuchando
+                    continue
+                threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+            for pool in self.pools.values():
+                pool.shutdown(cancel_futures=True)
+            print(f"✔ Servidor detenido ({self.translated} frases traducidas).")
+
+
+# ───────────────────────────────  Cliente  ───────────────────────────────────
+def is_running(address: str = DEFAULT_ADDRESS) -> bool:
+    try:
+        Client(address, authkey=authkey(address)).close()
+        return True
+    except AuthenticationError:
+        return True        # escucha alguien, pero con otra clave
+    except OSError:
+        return False
+
+
+def spawn_server(target: str, address: str = DEFAULT_ADDRESS,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> subprocess.Popen:
+    """Arranca el servidor en segundo plano, desligado de la consola actual."""
+    cmd = [sys.executable, str(Path(__file__).resolve()), "serve", "--target", target,
+           "--address", address, "--idle-timeout", str(idle_timeout)]
+    kwargs: dict = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL,
+                    "stderr": subprocess.DEVNULL}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    return subprocess.Popen(cmd, **kwargs)
+
+
+class WorkerClient:
+    """Traductor que delega en el servidor local; arranca uno si hace falta."""
+
+    def __init__(self, target: str, address: str = DEFAULT_ADDRESS, autostart: bool = True):
+        self.target = target
+        self.address = address
+        self.autostart = autostart
+        self.batch_size = MIN_BATCH
+        self.key = authkey(address)
+        self.conn = self._connect()
+
+    def _connect(self):
+        try:
+            return Client(self.address, authkey=self.key)
+        except AuthenticationError:
+            raise RuntimeError(f"El servidor de {self.address} usa otra clave ({key_path(self.address)}); "
+                               "deténgalo y vuelva a intentarlo")
+        except OSError:
+            if not self.autostart:
+                raise RuntimeError(f"No hay servidor de traducción en {self.address}")
+            return self._start()
+
+    def _start(self):
+        proc = spawn_server(self.target, self.address)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError("El servidor de traducción no arrancó "
+                                   f"(pruebe: python {Path(__file__).name} serve --target {self.target})")
+            try:
+                return Client(self.address, authkey=self.key)
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"El servidor de traducción no respondió en {STARTUP_TIMEOUT:.0f} s")
+
+    def request(self, op: str, **kwargs):
+        message = {"op": op, **kwargs}
+        try:
+            self.conn.send(message)
+            status, payload = self.conn.recv()
+        except (EOFError, OSError) as exc:
+            # Traducir se puede repetir: si el servidor se cerró (p.ej. por
+            # inactividad entre lotes) se reconecta, o arranca otro, una vez
+            if op != "translate" or not self.autostart:
+                raise RuntimeError(f"Se perdió la conexión con el servidor de traducción: {exc}")
+            self.conn.close()
+            self.conn = self._connect()
+            try:
+                self.conn.send(message)
+                status, payload = self.conn.recv()
+            except (EOFError, OSError) as exc:
+                raise RuntimeError(f"Se perdió la conexión con el servidor de traducción: {exc}")
+        if status != "ok":
+            raise RuntimeError(f"Servidor de traducción: {payload}")
+        return payload
+
+    def translate_batch(self, texts: list[str]) -> list[str]:
+        t0 = time.perf_counter()
+        out = self.request("translate", target=self.target, texts=list(texts))
+        self._adjust(len(texts), time.perf_counter() - t0)
+        return out
+
+    def translate(self, text: str) -> str:
+        return self.request("translate", target=self.target, texts=[text])[0]
+
+    def _adjust(self, count: int, elapsed: float) -> None:
+        # Lotes que tarden ~BATCH_SECONDS: bastante grandes para ocupar todos
+        # los procesos, bastante pequeños para que el progreso y el autoguardado
+        # sigan siendo frecuentes. Crece como mucho al doble por lote.
+        if count < self.batch_size or elapsed <= 0:
+            return
+        ideal = int(count / elapsed * BATCH_SECONDS)
+        self.batch_size = max(MIN_BATCH, min(MAX_BATCH, ideal, self.batch_size * 2))
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# ─────────────────────────────────  CLI  ─────────────────────────────────────
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor local de traducción offline (Argos)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="arrancar el servidor en primer plano")
+    serve.add_argument("--target", action="append", default=[],
+                       help="modelo a precargar (repetible, p.ej. --target de --target en)")
+    serve.add_argument("-j", "--workers", type=int, default=None,
+                       help="procesos de traducción (por defecto: uno por núcleo)")
+    serve.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                       help="segundos sin peticiones antes de cerrarse (0 = nunca)")
+    for name, help_text in (("status", "mostrar el estado del servidor"),
+                            ("stop", "detener el servidor")):
+        sub.add_parser(name, help=help_text)
+    for p in sub.choices.values():
+        p.add_argument("--address", default=DEFAULT_ADDRESS, help="socket/tubería del servidor")
+    args = parser.parse_args()
+    # authkey() y el cliente avisan con RuntimeError (clave ajena, legible por
+    # otros o incompleta; servidor caído): mensaje, no traceback
+    try:
+        run(args)
+    except RuntimeError as exc:
+        raise SystemExit(f"❌ {exc}")
+
+
+def run(args: argparse.Namespace) -> None:
+    if args.command == "serve":
+        TranslateServer(args.address, args.workers, args.idle_timeout).serve(tuple(args.target))
+        return
+    if not is_running(args.address):
+        print(f"⚪ No hay servidor en {args.address}")
+        return
+    client = WorkerClient("", args.address, autostart=False)
+    if args.command == "status":
+        st = client.request("status")
+        print(f"🟢 PID {st['pid']}: {st['workers']} procesos, modelos {st['targets'] or '—'}, "
+              f"{st['translated']} frases traducidas")
+    else:
+        client.request("stop")
+        print("✔ Servidor detenido")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Lectura y escritura de archivos de traducción (JSON y JSONL).
+
+Todas las herramientas de traducción comparten el mismo formato: una lista de
+entradas con `offset`, `length`, `text`... Este módulo centraliza su E/S:
+
+  - `.json`: la lista completa con `indent=2`, como hasta ahora. Se puede
+    recorrer de forma perezosa (`iter_entries`) sin cargar el archivo entero.
+  - `.jsonl`: una entrada por línea. Es el formato recomendado para archivos
+    grandes: se lee y se escribe en streaming con memoria constante.
+
+Las escrituras son atómicas (archivo temporal + rename, así una interrupción
+nunca deja un JSON a medias) y no tocan el archivo si el contenido no cambia.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+
+CHUNK_SIZE = 1 << 16
+_WS = " \t\r\n"
+
+
+def is_jsonl(path: Path | str) -> bool:
+    return Path(path).suffix.lower() == ".jsonl"
+
+
+def _iter_json_array(fh) -> Iterator[dict]:
+    """Decodifica un array JSON elemento a elemento leyendo por bloques."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = fh.read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip(chars: str) -> str | None:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return None
+
+    if skip(_WS) != "[":
+        raise ValueError("Se esperaba una lista JSON de entradas")
+    pos += 1
+    while True:
+        ch = skip(_WS + ",")
+        if ch is None:
+            raise ValueError("Lista JSON sin cerrar")
+        if ch == "]":
+            return
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                # Entrada cortada por el final del bloque: leer más
+                if eof or not fill():
+                    raise
+        pos = end
+        yield obj
+
+
+def iter_entries(path: Path | str) -> Iterator[dict]:
+    """Recorre las entradas de un archivo sin cargarlo entero en memoria."""
+    with open(path, encoding="utf-8") as fh:
+        if is_jsonl(path):
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(fh)
+
+
+def load_entries(path: Path | str) -> list[dict]:
+    """Carga todas las entradas (para las herramientas que necesitan indexarlas)."""
+    if is_jsonl(path):
+        return list(iter_entries(path))
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _serialize(entries: Iterable[dict], jsonl: bool) -> Iterator[str]:
+    if jsonl:
+        for entry in entries:
+            yield json.dumps(entry, ensure_ascii=False) + "\n"
+        return
+    # Mismo resultado que json.dumps(lista, indent=2), pero entrada a entrada
+    first = True
+    for entry in entries:
+        body = json.dumps(entry, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        yield ("[\n  " if first else ",\n  ") + body
+        first = False
+    yield "[]" if first else "\n]"
+
+
+def _file_digest(path: Path) -> str | None:
+    h = hashlib.sha1()
+    try:
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                h.update(block)
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+
+def save_entries(path: Path | str, entries: Iterable[dict]) -> bool:
+    """Escribe las entradas en streaming; devuelve False si el archivo no cambia.
+
+    `entries` puede ser cualquier iterable (p.ej. un generador sobre
+    `iter_entries`), así que un filtro archivo → archivo no necesita tener
+    todas las entradas en memoria.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    h = hashlib.sha1()
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as fh:
+            for piece in _serialize(entries, is_jsonl(path)):
+                fh.write(piece)
+                h.update(piece.encode("utf-8"))
+        if _file_digest(path) == h.hexdigest():
+            tmp.unlink()
+            return False
+        os.replace(tmp, path)
+        return True
+    finally:
+        if tmp.exists():
+            tmp.unlink()
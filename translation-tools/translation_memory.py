@@ -0,0 +1,54 @@
+"""Memoria de traducción: frases ya traducidas que no hace falta enviar al motor.
+
+Se carga de un archivo de traducción (JSON o JSONL, ver translation_io) con
+`text_source` (original en castellano) y `text` (traducción), como el corpus
+EN-ES que genera align_bilingual.py a partir del guion inglés de la ROM. Las
+búsquedas usan el texto normalizado de align_translations (sin distinguir
+mayúsculas, espacios ni saltos '@').
+
+De un corpus alineado solo se usan los grupos con una sola cadena castellana
+(`bead` "1-1" o "1-2") y un coste de alineamiento bajo: un grupo 2-1 no
+corresponde a ninguna entrada concreta y los de coste alto suelen estar mal
+emparejados. Las entradas con `lang` solo sirven para ese idioma de destino.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+from align_translations import normalize
+from translation_io import iter_entries
+
+DEFAULT_MAX_COST = 1.0
+
+
+class TranslationMemory:
+    def __init__(self, pairs: dict[str, str]):
+        self.pairs = pairs
+        self.hits = 0
+
+    @classmethod
+    def from_file(cls, path: Path | str, target: str,
+                  max_cost: float = DEFAULT_MAX_COST) -> "TranslationMemory":
+        pairs: dict[str, str] = {}
+        for entry in iter_entries(path):
+            source, text = entry.get("text_source", ""), entry.get("text", "")
+            if not source or not text or entry.get("lang", target) != target:
+                continue
+            if not str(entry.get("bead", "1-1")).startswith("1-"):
+                continue
+            if entry.get("cost", 0.0) > max_cost:
+                continue
+            # Si el original se repite, vale la primera traducción
+            pairs.setdefault(normalize(source), text)
+        return cls(pairs)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def get(self, text: str) -> Optional[str]:
+        found = self.pairs.get(normalize(text))
+        if found is not None:
+            self.hits += 1
+        return found
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Punto de entrada único para los scripts de TraysiaROMFix.
+
+Cada subcomando ejecuta el script correspondiente con los mismos
+argumentos que acepta por separado:
+
+    traysia analyze    tools/traysia_rom_analyzer.py
+    traysia patch      tools/fix_rom_traysia_shinyuden_anticrash.py
+    traysia sram       tools/sram_diff.py
+    traysia dump       dump_text_blocks.py
+    traysia tiles      md_tiles.py
+    traysia export     translate_spanish.py export
+    traysia import     translate_spanish.py import
+    traysia switch     switch_to_english.py
+    traysia switch-all batch_switch_to_english.py
+    traysia translate  translate_spanish_to_german.py
+    traysia fitcheck   translate_spanish_checkfit.py
+    traysia codes      escape_codes.py
+    traysia align      align_bilingual.py
+    traysia build      build_rom.py
+
+El módulo de cada subcomando se importa solo cuando se usa, y los motores de
+traducción y tqdm solo cuando hacen falta: `traysia patch` o
+`traysia translate --mode check` arrancan sin cargarlos.
+
+Uso:
+    python translation-tools/traysia.py export "roms/Traysia (W).bin" spanish.json
+    python translation-tools/traysia.py patch --ips
+    python translation-tools/traysia.py translate spanish.json german.json --mode check
+    traysia patch --ips        # con el proyecto instalado (pip install -e .)
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import sys
+from typing import Optional
+
+import tools_path
+tools_path.enable()
+
+# subcomando → (módulo, función, argumentos fijos, descripción)
+COMMANDS: dict[str, tuple[str, str, tuple[str, ...], str]] = {
+    "analyze": ("traysia_rom_analyzer", "main", (), "resume y compara las ROMs de roms/"),
+    "patch": ("fix_rom_traysia_shinyuden_anticrash", "main", (), "aplica el parche Anticrash SRAM"),
+    "sram": ("sram_diff", "main", (), "compara instantáneas .srm y marca escrituras fuera de zona"),
+    "dump": ("dump_text_blocks", "cli", (), "lista los bloques de texto ASCII de una ROM"),
+    "tiles": ("md_tiles", "main", (), "exporta/importa tiles gráficos como hojas PNG"),
+    "export": ("translate_spanish", "main", ("export",), "extrae las cadenas a JSON"),
+    "import": ("translate_spanish", "main", ("import",), "inserta un JSON de traducción en la ROM"),
+    "switch": ("switch_to_english", "main", (), "re-apunta el texto al guion inglés"),
+    "switch-all": ("batch_switch_to_english", "main", (), "cambio a inglés de todos los bloques"),
+    "translate": ("translate_spanish_to_german", "cli", (), "traduce, formatea o revisa un JSON"),
+    "fitcheck": ("translate_spanish_checkfit", "main", (), "comprueba que las traducciones caben"),
+    "codes": ("escape_codes", "main", (), "estadística y propuestas de los códigos 0x81"),
+    "align": ("align_bilingual", "main", (), "corpus paralelo EN-ES de los dos guiones"),
+    "build": ("build_rom", "main", (), "construye una ROM de release con cache"),
+}
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="traysia",
+        description="Herramientas de TraysiaROMFix",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="subcomandos:\n" + "\n".join(f"  {name:<11} {info[3]}" for name, info in COMMANDS.items())
+               + "\n\n'traysia SUBCOMANDO -h' muestra las opciones de cada uno.",
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="SUBCOMANDO")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    module_name, func_name, fixed, _help = COMMANDS[args.command]
+    # Los mensajes de uso de argparse salen como "traysia SUBCOMANDO"
+    sys.argv[0] = "traysia" if fixed else f"traysia {args.command}"
+    entry = getattr(importlib.import_module(module_name), func_name)
+    entry([*fixed, *args.args])
+
+
+if __name__ == "__main__":
+    main()